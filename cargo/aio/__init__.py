@@ -8,3 +8,4 @@
 """
 from cargo.aio.clients import *
 from cargo.aio.orm import *
+from cargo.aio.loader import *
@@ -10,13 +10,14 @@ import aiopg
 import asyncio
 from collections import defaultdict
 from multiprocessing import cpu_count
+from weakref import WeakKeyDictionary
 
 from vital.tools.dicts import merge_dict
 from vital.debug import prepr
 
 from cargo.cursors import CNamedTupleCursor
 from cargo.clients import BasePostgresClient, PostgresPool, Postgres,\
-                          PostgresPoolConnection, local_client, _db
+                          PostgresPoolConnection, CacheStats, local_client, _db
 
 
 __all__ = (
@@ -55,6 +56,17 @@ class AioPostgresPoolConnection(Postgres):
         return await cursor.execute('SET search_path TO %s' %
                                     ", ".join(schemas))
 
+    async def set_search_path(self, *schemas):
+        """ :see::meth:Postgres.set_search_path """
+        connection = self._connection
+        if self._search_path_is_current(connection, schemas):
+            return False
+        cursor = await connection.cursor()
+        await self.apply_schema(cursor, *schemas)
+        cursor.close()
+        self._search_path_state[connection] = schemas
+        return True
+
     def __aenter__(self):
         return self
 
@@ -75,7 +87,8 @@ class AioPostgresPoolConnection(Postgres):
 class AioPostgresPool(BasePostgresClient):
     __slots__ = ('_dsn', '_connection_options', '_schema', 'encoding',
                  '_cursor_factory', 'minconn', 'maxconn', '_pool', '_cache',
-                 '_search_paths', '_events', 'autocommit', 'loop')
+                 '_search_paths', '_events', 'autocommit', 'loop',
+                 '_search_path_state', 'search_path_stats')
 
     def __init__(self, minconn=1, maxconn=1, dsn=None,
                  cursor_factory=CNamedTupleCursor, pool=None,
@@ -102,6 +115,9 @@ class AioPostgresPool(BasePostgresClient):
         self.maxconn = maxconn
         self.autocommit = True
         self.loop = loop or asyncio.get_event_loop()
+        #: Search paths last applied to each connection in the pool
+        self._search_path_state = WeakKeyDictionary()
+        self.search_path_stats = CacheStats()
 
         # Cursor options
         self._cursor_factory = cursor_factory
@@ -142,7 +158,7 @@ class AioPostgresPool(BasePostgresClient):
         return self._pool
 
     async def get(self, *args, **kwargs):
-        return PostgresPoolConnection(
+        return AioPostgresPoolConnection(
             pool=self, connection=(await self.pool.acquire()))
 
     def put(self, poolconn):
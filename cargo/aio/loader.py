@@ -0,0 +1,151 @@
+"""
+
+  `Cargo Aio Loader`
+  ``Coalesces concurrent get-by-key lookups into batched queries``
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   The MIT License (MIT) © 2016 Jared Lunde
+   http://github.com/jaredlunde/cargo-orm
+
+"""
+import asyncio
+
+from vital.debug import preprX
+
+from cargo.relationships import _any_of, _as_key, _get_value
+
+
+__all__ = ('AioLoader',)
+
+
+class AioLoader(object):
+    """ ======================================================================
+        ``Usage Example``
+        ..
+            users = Users().loader()
+            a, b, c = await asyncio.gather(users.load(1),
+                                           users.load(2),
+                                           users.load(1))
+        ..
+        |SELECT * FROM users WHERE users.uid = ANY(ARRAY[1, 2]::bigint[])|
+
+        ======================================================================
+        Buffers the keys requested with :meth:load during one iteration of
+        the event loop and selects them all with a single
+        |WHERE field = ANY(%s::type[])| query once the coroutines which
+        requested them yield. Each awaiting future is resolved with the
+        record of its key, or |None| if there is none.
+
+        Results are memoized by key for the lifetime of the loader, so a
+        loader should live no longer than the request it serves.
+    """
+    __slots__ = ('model', 'field_name', 'max_batch_size', 'cache', 'loop',
+                 '_field', '_queue', '_futures', '_scheduled')
+
+    def __init__(self, model, field=None, max_batch_size=1000, cache=True,
+                 loop=None):
+        """`Aio Loader`
+            ==================================================================
+            @model: (:class:AioModel) model to select records from. The
+                model itself is not modified, copies of it run the queries.
+            @field: (:class:Field) unique field of @model to look records
+                up by, defaults to the :prop:best_index
+            @max_batch_size: (#int) max number of keys selected in one
+                query, the buffer is sent early when it fills up
+            @cache: (#bool) |False| to query every key again rather than
+                memoizing results
+            @loop: (:class:asyncio.BaseEventLoop) defaults to the running
+                event loop
+        """
+        field = field if field is not None else model.best_index
+        if field is None or isinstance(field, tuple):
+            raise ValueError('Loaders require a single unique field to look '
+                             'records up by.')
+        self.model = model
+        self.field_name = field.field_name
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self.loop = loop
+        #: Casts the requested keys so that equal keys share futures
+        self._field = field.clear_copy()
+        self._queue = []
+        self._futures = {}
+        self._scheduled = False
+
+    __repr__ = preprX('model', 'field_name')
+
+    def load(self, key):
+        """ Requests the record whose field equals @key
+
+            -> (:class:asyncio.Future) resolved with the record or |None|
+        """
+        field = self._field
+        field.clear()
+        key = _as_key(field, field(key))
+        if self.cache:
+            try:
+                return self._futures[key]
+            except KeyError:
+                pass
+        loop = self.loop or asyncio.get_event_loop()
+        future = loop.create_future()
+        if self.cache:
+            self._futures[key] = future
+        self._queue.append((key, future))
+        if len(self._queue) >= self.max_batch_size:
+            self.dispatch()
+        elif not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self.dispatch)
+        return future
+
+    def load_many(self, keys):
+        """ Requests the records whose field equals each of @keys
+
+            -> (:class:asyncio.Future) resolved with a #list of the records
+                or |None| in the order of @keys
+        """
+        return asyncio.gather(*map(self.load, keys))
+
+    def dispatch(self):
+        """ Sends the buffered keys to the server now rather than at the end
+            of the current iteration of the event loop
+        """
+        self._scheduled = False
+        queue, self._queue = self._queue, []
+        if queue:
+            return asyncio.ensure_future(self._load(queue),
+                                         loop=self.loop)
+
+    async def _load(self, queue):
+        model = self.model.clear_copy()
+        field = getattr(model, self.field_name)
+        keys = list({key for key, _ in queue})
+        model.where(_any_of(field, keys))
+        try:
+            results = await model.select()
+        except Exception as e:
+            for key, future in queue:
+                #: Failures are not memoized
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+        found = {_as_key(field, _get_value(result, self.field_name)): result
+                 for result in results or []}
+        for key, future in queue:
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def clear(self, *keys):
+        """ Forgets the memoized results of @keys, or of every key if none
+            are given
+        """
+        if not keys:
+            self._futures.clear()
+            return self
+        field = self._field
+        for key in keys:
+            field.clear()
+            self._futures.pop(_as_key(field, field(key)), None)
+        return self
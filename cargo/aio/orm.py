@@ -9,12 +9,16 @@
 """
 import asyncio
 import psycopg2
+from weakref import WeakKeyDictionary
 
 from vital.cache import cached_property
+from vital.security import randhex
 from vital.tools.lists import grouped
-from vital.debug import prepr
+from vital.debug import prepr, preprX
 
 from cargo.aio.clients import *
+from cargo.aio.loader import AioLoader
+from cargo.cursors import ModelCursor
 from cargo.etc.types import *
 from cargo.exceptions import *
 from cargo.expressions import *
@@ -26,7 +30,124 @@ from cargo.orm import ORM, Model
 __all__ = (
     "AioORM",
     "AioModel",
-    "AioRestModel")
+    "AioRestModel",
+    "AioStream",
+    "AioTransaction")
+
+
+#: The innermost :class:AioTransaction of each running task
+_transactions = WeakKeyDictionary()
+
+try:
+    _current_task = asyncio.current_task
+except AttributeError:
+    #: Python < 3.7
+    _current_task = asyncio.Task.current_task
+
+
+def _get_transaction():
+    """ -> the innermost :class:AioTransaction of the running task, or
+            |None|
+    """
+    task = _current_task()
+    if task is not None:
+        return _transactions.get(task)
+
+
+class AioTransaction(object):
+    """ ======================================================================
+        ``Usage Example``
+        ..
+            async with model.transaction():
+                await model.add(username='foo')
+                async with model.transaction():  # SAVEPOINT
+                    await model.add(username='bar')
+        ..
+
+        ======================================================================
+        Pins one connection of the pool to the running task and wraps it
+        in a |BEGIN| ... |COMMIT| transaction block. Every query executed by
+        an :class:AioORM with the same client within the block, and within
+        the coroutines it awaits, runs on the pinned connection. Tasks
+        spawned within the block do not share the transaction. Leaving the
+        block with an exception rolls the transaction back.
+
+        Nested transactions are |SAVEPOINT|s which are released on success
+        or rolled back to on failure, without affecting the outer
+        transaction.
+
+        The pinned connection runs one query at a time, so the queries of
+        a transaction must be awaited in turn rather than gathered.
+    """
+    __slots__ = ('db', 'conn', 'savepoint', '_task', '_parent')
+
+    def __init__(self, db):
+        """ @db: (:class:AioPostgresPool) client to pin a connection of """
+        self.db = db
+        self.conn = None
+        #: Name of the |SAVEPOINT| if this transaction is nested
+        self.savepoint = None
+        self._task = None
+        #: Transaction of the task which was open when this one began
+        self._parent = None
+
+    __repr__ = preprX('db', 'savepoint')
+
+    async def _execute(self, statement):
+        cursor = await self.conn.cursor()
+        try:
+            await cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    async def _rollback(self, statement):
+        """ Rolls back with @statement, any search path set within the
+            transaction is undone with it
+        """
+        try:
+            await self._execute(statement)
+        finally:
+            self.db._forget_search_path(self.conn._connection)
+
+    async def __aenter__(self):
+        self._task = _current_task()
+        self._parent = parent = _transactions.get(self._task)
+        if parent is not None and parent.db is self.db:
+            self.conn = parent.conn
+            self.savepoint = 'cargo_%s' % randhex(12)
+            await self._execute('SAVEPOINT %s' % self.savepoint)
+        else:
+            self.conn = await self.db.get()
+            try:
+                await self._execute('BEGIN')
+            except:
+                self.db.put(self.conn)
+                raise
+        _transactions[self._task] = self
+        return self
+
+    async def __aexit__(self, type=None, value=None, tb=None):
+        if self._parent is not None:
+            _transactions[self._task] = self._parent
+        else:
+            _transactions.pop(self._task, None)
+        savepoint = self.savepoint
+        try:
+            if type is None:
+                await self._execute('RELEASE SAVEPOINT %s' % savepoint
+                                    if savepoint else 'COMMIT')
+            else:
+                await self._rollback('ROLLBACK TO SAVEPOINT %s' % savepoint
+                                     if savepoint else 'ROLLBACK')
+        except Psycopg2QueryErrors as e:
+            if savepoint is None:
+                await self._rollback('ROLLBACK')
+            raise QueryError(e.args[0].strip(),
+                             code=ERROR_CODES.COMMIT,
+                             root=e)
+        finally:
+            if savepoint is None:
+                self.db.put(self.conn)
 
 
 class AioORM(ORM):
@@ -66,43 +187,107 @@ class AioORM(ORM):
         """
         return await self.db.connect(**options)
 
+    # ``Transactions``
+
+    def transaction(self):
+        """ Runs the queries of this and any other :class:AioORM with the
+            same client in one transaction on a single connection until the
+            block is left. Nested blocks are |SAVEPOINT|s.
+            :see::class:AioTransaction
+
+            -> (:class:AioTransaction) asynchronous context manager
+            ..
+                async with model.transaction():
+                    for user in users:
+                        await model.add(**user)
+            ..
+        """
+        return AioTransaction(self.db)
+
+    def multi(self, *queries):
+        """ Starts chaining multiple queries which :meth:run executes
+            atomically in one transaction. Queries declared in multi mode
+            are queued rather than executed, so they are not awaited.
+            :see::meth:ORM.multi
+
+            -> @self
+            ..
+                model.multi()
+                model.insert(model.username)
+                model.where(model.uid == 1761).update(model.username)
+                results = await model.run()
+            ..
+        """
+        return super().multi(*queries)
+
+    def _transaction_conn(self):
+        """ -> the connection pinned by the :meth:transaction the running
+                task is within, or |None|
+        """
+        transaction = _get_transaction()
+        if transaction is not None and transaction.db is self.db:
+            return transaction.conn
+
     # ``Query execution``
 
     async def run_iter(self, *queries):
-        """ Runs all of the queries in @*qs or in :prop:queries atomically
-            and fetches all of the results if there are any
+        """ Runs all of the queries in @*qs or in :prop:queries and fetches
+            all of the results if there are any. The queries of a
+            :meth:multi run are wrapped in a transaction of their own
+            unless they are already within a :meth:transaction.
 
             @*queries: (:class:cargo.Query) one or several objects
 
             -> (#list) results of the queries
         """
-        #: Gets the client connection from a pool or client object
-        conn = await self.db.get()
+        #: Gets the client connection from a transaction, pool or client
+        #  object
+        conn = self._transaction_conn()
+        pinned = conn is not None
+        if not pinned:
+            conn = await self.db.get()
+        atomic = self._multi and not pinned
         results = []
-        for q in queries or self.queries:
-            #: Executes the query with its parameters
-            try:
-                result = await self.execute(q.query,
-                                            q.params,
-                                            conn=conn)
-            except QueryError:
-                if not queries:
-                    self.queries.remove(q)
-                    self.reset_state()
-                raise
-            try:
-                #: Fetches the result
-                result = await result.__getattribute__('fetchone'
-                                                       if q.one else
-                                                       'fetchall')()
-            except psycopg2.ProgrammingError:
-                #: No results to fetch
-                pass
-            results.append(result)
-        self._reset_accordingly(queries, conn)
+        try:
+            if atomic:
+                await self._execute_statement(conn, 'BEGIN')
+            for q in queries or self.queries:
+                #: Executes the query with its parameters
+                try:
+                    result = await self.execute(q.query,
+                                                q.params,
+                                                conn=conn)
+                except QueryError:
+                    if not queries:
+                        self.queries.remove(q)
+                        self.reset_state()
+                    raise
+                try:
+                    #: Fetches the result
+                    result = await result.__getattribute__('fetchone'
+                                                           if q.one else
+                                                           'fetchall')()
+                except psycopg2.ProgrammingError:
+                    #: No results to fetch
+                    pass
+                results.append(result)
+            if atomic:
+                await self._execute_statement(conn, 'COMMIT')
+        except:
+            if atomic:
+                try:
+                    await self._execute_statement(conn, 'ROLLBACK')
+                finally:
+                    #: Any search path set by the queries was rolled back
+                    self.db._forget_search_path(conn._connection)
+            raise
+        finally:
+            if not pinned:
+                self.db.put(conn)
+        self._reset_accordingly(queries)
         return results
 
-    def _reset_accordingly(self, queries, conn):
+    def _reset_accordingly(self, queries):
         if queries:
             #: Explicit 'run', the user is in control of everything except
             #  for the query state and client connection
@@ -110,7 +295,19 @@ class AioORM(ORM):
         else:
             #: Implicit 'run', the ORM is in control
             self.reset(multi=True)
-        self.db.put(conn)
+
+    @staticmethod
+    async def _execute_statement(conn, statement):
+        """ Executes the transaction control @statement in @conn """
+        cursor = await conn.cursor()
+        try:
+            await cursor.execute(statement)
+        except Psycopg2QueryErrors as e:
+            raise QueryError(e.args[0].strip(),
+                             code=ERROR_CODES.COMMIT,
+                             root=e)
+        finally:
+            cursor.close()
 
     async def run(self, *queries):
         """ Runs all of the queries in @*qs or in :prop:queries,
@@ -134,8 +331,15 @@ class AioORM(ORM):
         return await conn.cursor(*args, cursor_factory=self._cursor_factory,
                                  **kwargs)
 
+    async def _set_search_path(self, conn):
+        """ :see::meth:ORM._set_search_path """
+        search_path = self.db.get_search_paths(self.schema)
+        if search_path:
+            await conn.set_search_path(*search_path)
+
     async def execute(self, query, params=None, conn=None):
-        """ Executes @query with @params in the cursor and autocommits.
+        """ Executes @query with @params in the cursor and autocommits,
+            unless it is within a :meth:transaction.
 
             @query: (#str) query string
             @params: (#tuple|#dict|#list) of params referenced in @query
@@ -147,13 +351,14 @@ class AioORM(ORM):
             -> :mod:psycopg2 cursor or None
         """
         #: Gets a client connection if one wasn't passed as an argument
-        _conn = conn or await self.db.get()
+        _conn = conn or self._transaction_conn() or await self.db.get()
         cursor = await self.get_cursor(_conn)
-        #: Sets the search path to the locally defined schema
-        query = self._prepend_search_path_to(query)
+        query, params = self._normalize_params(query, params)
         #: For debug mode
         self.debug(cursor, query, params)
         try:
+            #: Sets the search path to the locally defined schema
+            await self._set_search_path(_conn)
             #: Executes the cursor
             await cursor.execute(query, params or tuple())
         except (psycopg2.ProgrammingError,
@@ -164,10 +369,162 @@ class AioORM(ORM):
         #: Puts a client connection away if it is a pool and no connection
         #  was passed in arguments. If a connection object is passed,
         #  it's the user's responsibility to put it away.
-        if conn is None:
+        if conn is None and _conn is not self._transaction_conn():
             self.db.put(_conn)
         return cursor
 
+    def stream(self, query, params=None, buffer=100, conn=None):
+        """ Declares a server-side cursor (|DECLARE ... CURSOR|) for @query
+            with @params and yields its results @buffer rows at a time.
+            The next page is only fetched once the consumer asks for it, so
+            no more than one page is held in memory.
+            :see::class:AioStream
+
+            @query: (#str) query string
+            @params: (#tuple|#dict|#list) of params referenced in @query
+                with |%s| or |%(name)s|
+            @buffer: (#int) number of rows to fetch from the server in each
+                round trip
+            @conn: (:class:AioPostgresPoolConnection) if a connection
+                object is provided, it must already be in a transaction
+                block and it is your responsibility to put it away. The
+                connection of the :meth:transaction the running task is
+                within is used by default.
+
+            -> (:class:AioStream) asynchronous iterator of #list(s) of up
+                to @buffer results of the cursor factory
+            ..
+                async for results in orm.stream('SELECT * FROM foo'):
+                    print(len(results))
+            ..
+        """
+        return AioStream(self, query, params, buffer=buffer, conn=conn)
+
+
+class AioStream(object):
+    """ ======================================================================
+        ``Usage Example``
+        ..
+            async with orm.stream('SELECT * FROM foo', buffer=500) as pages:
+                async for results in pages:
+                    print(len(results))
+        ..
+
+        ======================================================================
+        Asynchronous iterator of the pages of a server-side cursor.
+        :mod:aiopg connections cannot open named cursors, so the cursor is
+        declared, fetched from and closed with SQL statements the first
+        time a page is requested.
+
+        If no connection is given, the cursor lives in a transaction of its
+        own on a connection which is held until the results are exhausted
+        or the stream is closed, at which point the transaction is committed
+        or rolled back and the connection is put away. Streams which are
+        left before they are exhausted are closed when they are garbage
+        collected, use them as context managers or :meth:aclose them to
+        put the connection away right away.
+    """
+    __slots__ = ('orm', 'query', 'params', 'buffer', 'conn', 'closed',
+                 '_conn', '_cursor', '_name', '_loop')
+
+    def __init__(self, orm, query, params=None, buffer=100, conn=None):
+        """ @orm: (:class:AioORM) to execute @query with
+            :see::meth:AioORM.stream
+        """
+        self.orm = orm
+        self.query, self.params = orm._normalize_params(query, params)
+        self.buffer = buffer
+        self.conn = conn or orm._transaction_conn()
+        self.closed = False
+        self._conn = None
+        self._cursor = None
+        self._name = 'cargo_%s' % randhex(12)
+        self._loop = None
+
+    __repr__ = preprX('query', 'buffer')
+
+    def __aiter__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, type=None, value=None, tb=None):
+        await self.aclose()
+
+    def __del__(self):
+        if not self.closed and self._cursor is not None and \
+           not self._loop.is_closed():
+            #: The consumer stopped iterating without closing the stream
+            self._loop.create_task(self.aclose())
+
+    async def _declare(self):
+        orm = self.orm
+        self._loop = asyncio.get_event_loop()
+        self._conn = conn = self.conn or await orm.db.get()
+        self._cursor = cursor = await orm.get_cursor(conn)
+        #: For debug mode
+        orm.debug(cursor, self.query, self.params)
+        #: Sets the search path to the locally defined schema
+        await orm._set_search_path(conn)
+        if self.conn is None:
+            await cursor.execute('BEGIN')
+        await cursor.execute('DECLARE %s NO SCROLL CURSOR FOR %s' %
+                             (self._name, self.query),
+                             self.params or tuple())
+
+    async def __anext__(self):
+        """ -> #list of up to :prop:buffer results of the cursor factory """
+        if self.closed:
+            raise StopAsyncIteration
+        try:
+            if self._cursor is None:
+                await self._declare()
+            await self._cursor.execute('FETCH FORWARD %d FROM %s' %
+                                       (int(self.buffer), self._name))
+            results = await self._cursor.fetchall()
+        except Psycopg2QueryErrors as e:
+            #: Rolls back the transaction in the event of a failure
+            await self._close(failed=True)
+            raise QueryError(e.args[0].strip(),
+                             code=ERROR_CODES.EXECUTE,
+                             root=e)
+        except BaseException:
+            await self._close(failed=True)
+            raise
+        if not results:
+            await self._close(commit=True)
+            raise StopAsyncIteration
+        return results
+
+    async def aclose(self):
+        """ Closes the cursor before its results are exhausted. The
+            transaction of the stream's own connection is rolled back and
+            the connection is put away.
+        """
+        await self._close()
+
+    async def _close(self, commit=False, failed=False):
+        if self.closed:
+            return
+        self.closed = True
+        cursor, conn = self._cursor, self._conn
+        try:
+            if cursor is not None:
+                if self.conn is None:
+                    await cursor.execute('COMMIT' if commit else 'ROLLBACK')
+                    if not commit:
+                        self.orm.db._forget_search_path(conn._connection)
+                elif not failed:
+                    #: Cursors can't be closed in an aborted transaction,
+                    #  which must be rolled back by its owner
+                    await cursor.execute('CLOSE %s' % self._name)
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if self.conn is None and conn is not None:
+                self.orm.db.put(conn)
+
 
 #
 #  ``Models``
@@ -176,9 +533,9 @@ class AioORM(ORM):
 
 class AioModel(AioORM, Model):
 
-    def __iter__(self):
-        """ -> iterates through records in the model """
-        return self.iter()
+    def __aiter__(self):
+        """ -> asynchronously iterates through records in the model """
+        return self.aiter()
 
     async def approx_size(self, alias=None):
         """ Selects the approximate size of the model.
@@ -217,7 +574,8 @@ class AioModel(AioORM, Model):
         if not self._is_naked():
             cursor = await conn.cursor(*args, cursor_factory=ModelCursor,
                                        **kwargs)
-            cursor._cargo_model = self
+            #: :mod:aiopg cursors wrap the :class:ModelCursor at |_impl|
+            cursor._impl._cargo_model = self
             return cursor
         else:
             return await conn.cursor(*args,
@@ -231,7 +589,29 @@ class AioModel(AioORM, Model):
         """
         if self._multi:
             self.new()
-        return (x for x in await super().run_iter(*queries, **kwargs))
+        return list(await super().run_iter(*queries, **kwargs))
+
+    def loader(self, field=None, max_batch_size=1000, cache=True):
+        """ Coalesces the lookups of single records by @field made by
+            concurrent coroutines into one |WHERE field = ANY(%s)| query
+            per iteration of the event loop, rather than one query per
+            lookup. Create one loader per request, results are memoized.
+
+            @field: (:class:Field) unique field to look records up by,
+                defaults to the :prop:best_index
+            @max_batch_size: (#int) max number of keys in each query
+            @cache: (#bool) |False| to disable memoization of results
+
+            -> (:class:AioLoader)
+            ..
+                users = User().loader()
+                user = await users.load(1761)
+            ..
+        """
+        return AioLoader(self,
+                         field=field,
+                         max_batch_size=max_batch_size,
+                         cache=cache)
 
     async def pull_all(self, *args, dry=False, **kwargs):
         """ Pulls all the relationships in the model.
@@ -246,28 +626,29 @@ class AioModel(AioORM, Model):
                                                                   **kwargs)
         return d
 
-    '''async def iternaked(self, offset=0, limit=0, buffer=100, order_field=None,
-                        reverse=False):
+    def aiternaked(self, offset=0, limit=0, buffer=100, order_field=None,
+                   reverse=False, fields=None):
         """ Yields cursor factory until there are no more results to fetch.
-
-            @offset: (#int) cursor start position
-            @limit: (#int) total number of results to fetch
-            @buffer: (#int) cursor max results to fetch in one page
-            @reverse: (#bool) True if returning in descending order
-            @order_field: (:class:cargo.Field) object to order the
-                query by
+            :see::meth:aiter
         """
-        return (item for item in await self.naked().iter(
-            offset=offset,
-            limit=limit,
-            buffer=buffer,
-            order_field=order_field,
-            reverse=reverse))
-
-    async def iter(self, offset=0, limit=0, buffer=100, order_field=None,
-                   reverse=False):
-        """ Yields populated models until there are no more
-            results to fetch.
+        return self.naked().aiter(offset=offset,
+                                  limit=limit,
+                                  buffer=buffer,
+                                  order_field=order_field,
+                                  reverse=reverse,
+                                  fields=fields)
+
+    def aiter(self, offset=0, limit=0, buffer=100, order_field=None,
+              reverse=False, fields=None):
+        """ Yields populated models until there are no more results to
+            fetch. The results are fetched @buffer rows at a time through a
+            server-side cursor and each page is only fetched once the
+            previous one was consumed. :see::class:AioStream
+
+            Breaking out of the loop leaves the cursor's connection checked
+            out until the stream is garbage collected. Use the stream as a
+            context manager, or close it, to put the connection away right
+            away.
 
             @offset: (#int) cursor start position
             @limit: (#int) total number of results to fetch
@@ -275,24 +656,51 @@ class AioModel(AioORM, Model):
             @reverse: (#bool) True if returning in descending order
             @order_field: (:class:cargo.Field) object to order the
                 query by
+            @fields: (#tuple) of :class:Field to select, defaults to all
+
+            -> (:class:AioStream) asynchronous iterator of the results
+            ..
+                async with User().aiter(buffer=500) as users:
+                    async for user in users:
+                        if user.uid.value == 1761:
+                            break
+            ..
         """
         if not self.state.has('WHERE'):
             self.where(self.best_available_index or True)
-        field = getattr(self, order_field) if order_field else self.best_index
+        field = getattr(self, order_field) if order_field else \
+            self.best_index
         if field is not None:
             order = field.asc() if not reverse else field.desc()
             self.order_by(order)
         self.offset(offset)
         if limit:
             self.limit(limit)
-        q = await super().dry().select().execute()
+        q = super().dry().select(*fields or [])
+        #: The results are hydrated from a copy of the model, so that the
+        #  model is reset before the stream is consumed, if ever
+        model = self.copy()
+        model._naked = self._naked
+        self.reset()
+        return _AioModelStream(model, q.query, q.params, buffer=buffer)
+
+
+class _AioModelStream(AioStream):
+    """ :class:AioStream of the results of an :class:AioModel one at a
+        time
+    """
+    __slots__ = ('_page',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._page = iter(())
+
+    async def __anext__(self):
         while True:
-            results = q.fetchmany(buffer)
-            if not results:
-                break
-            for result in results:
-                yield result
-        self.reset()'''
+            try:
+                return next(self._page)
+            except StopIteration:
+                self._page = iter(await super().__anext__())
 
 
 class AioRestModel(AioModel):
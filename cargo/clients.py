@@ -6,23 +6,30 @@
    http://github.com/jaredlunde/cargo-orm
 
 """
+import re
+from math import isfinite
 try:
     import ujson as json
 except ImportError:
     import json
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from uuid import UUID
+from weakref import WeakKeyDictionary
 
 import psycopg2
 import psycopg2.pool
 import psycopg2.extras
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 
 from multiprocessing import cpu_count
 
 from vital.cache import DictProperty, local_property
 from vital.tools.dicts import merge_dict
 from vital.tools.lists import unique_list
-from vital.security import randkey
+from vital.security import randkey, randhex
 from vital.debug import preprX
 
 from cargo.cursors import CNamedTupleCursor, ModelCursor
@@ -41,8 +48,97 @@ __all__ = (
 )
 
 
+class CacheStats(object):
+    """ Hit, miss and eviction counters for the per-connection client
+        caches
+    """
+    __slots__ = ('hits', 'misses', 'evictions')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    __repr__ = preprX('hits', 'misses', 'evictions', address=False)
+
+    def reset(self):
+        """ Sets all of the counters back to |0| """
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        return self
+
+
+class PreparedStatements(OrderedDict):
+    """ Least-recently-used mapping of |(statement, types)| to the names of
+        the statements prepared on a connection. Statements which could not
+        be prepared map to |None|.
+    """
+    __slots__ = ('search_path',)
+
+    def __init__(self):
+        super().__init__()
+        #: Search path the statements were prepared with
+        self.search_path = None
+
+
+#: Statement types which may be |PREPARE|d
+_preparable_re = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|VALUES|WITH)\b',
+                            re.I)
+_named_placeholder_re = re.compile(r'%(?:%|\(([^)]+)\)s)')
+_positional_placeholder_re = re.compile(r'%[%s]')
+
+
+def _get_numeric_type(literal):
+    """ -> (#str) the type Postgres gives the numeric constant @literal """
+    if '.' in literal or 'e' in literal.lower():
+        return 'numeric'
+    value = int(literal)
+    if -2 ** 31 <= value < 2 ** 31:
+        return 'integer'
+    elif -2 ** 63 <= value < 2 ** 63:
+        return 'bigint'
+    return 'numeric'
+
+
+def _get_param_type(value):
+    """ -> (#str) the Postgres type @value is declared as when a statement
+            is |PREPARE|d, |unknown| leaves it to the server to infer.
+            Numbers are declared as the type the server gives the literal
+            :mod:psycopg2 adapts them to, so that they are compared and
+            assigned just as they would be without the cache.
+            |None| if @value is adapted to something other than a plain
+            literal (e.g. an |ARRAY| or |bytea|), statements with such
+            params are not prepared.
+    """
+    if value is None or isinstance(value, str):
+        return 'unknown'
+    elif isinstance(value, bool):
+        return 'boolean'
+    elif isinstance(value, int):
+        return _get_numeric_type(str(value))
+    elif isinstance(value, float):
+        #: Infinity and NaN are adapted to |'Infinity'::float|
+        return _get_numeric_type(repr(value)) if isfinite(value) else None
+    elif isinstance(value, Decimal):
+        return _get_numeric_type(str(value)) if value.is_finite() else \
+            'numeric'
+    elif isinstance(value, datetime):
+        return 'timestamp' if value.tzinfo is None else 'timestamptz'
+    elif isinstance(value, date):
+        return 'date'
+    elif isinstance(value, time):
+        return 'time'
+    elif isinstance(value, timedelta):
+        return 'interval'
+    elif isinstance(value, UUID):
+        return 'uuid'
+    return None
+
+
 class BasePostgresClient(object):
-    __slots__ = tuple()
+    #: Compiled :class:Model layouts hold weak references to clients
+    __slots__ = ('__weakref__',)
 
     def get_type_OID(self, typname):
         """ -> (#tuple) |(OID, ARRAY_OID)| """
@@ -51,8 +147,8 @@ class BasePostgresClient(object):
                WHERE t.typname IN(%s, %s)
                ORDER BY name DESC;"""
         conn = self.get()
+        conn.set_search_path(*self.get_search_paths())
         cur = conn.cursor(cursor_factory=CNamedTupleCursor)
-        self.apply_schema(cur, *self.get_search_paths())
         cur.execute(q, ('_%s' % typname, typname))
         res = cur.fetchall()
         conn.put()
@@ -162,6 +258,99 @@ class BasePostgresClient(object):
         schemas = schemas
         return cursor.execute('SET search_path TO %s' % ", ".join(schemas))
 
+    def _search_path_is_current(self, connection, schemas):
+        """ -> (#bool) |True| if @schemas is the search path which was last
+                applied to @connection. Hits and misses are counted in
+                :prop:search_path_stats.
+        """
+        if self._search_path_state.get(connection) == schemas:
+            self.search_path_stats.hits += 1
+            return True
+        self.search_path_stats.misses += 1
+        return False
+
+    def _forget_search_path(self, connection):
+        """ Forgets the search path applied to @connection, the next
+            :meth:set_search_path will send a |SET| regardless.
+        """
+        self._search_path_state.pop(connection, None)
+
+    @staticmethod
+    def _to_prepared(query, params):
+        """ Translates the |%s| or |%(name)s| placeholders in @query to
+            the |$n| placeholders of a prepared statement.
+
+            -> (#tuple) |(statement, args)|
+        """
+        if not params:
+            return query.replace('%%', '%'), tuple()
+        elif isinstance(params, dict):
+            keys = []
+
+            def replace(match):
+                key = match.group(1)
+                if key is None:
+                    return '%'
+                try:
+                    return '$%d' % (keys.index(key) + 1)
+                except ValueError:
+                    keys.append(key)
+                    return '$%d' % len(keys)
+
+            statement = _named_placeholder_re.sub(replace, query)
+            return statement, tuple(params[key] for key in keys)
+        else:
+            n = iter(range(1, len(params) + 1))
+            statement = _positional_placeholder_re.sub(
+                lambda match: '%' if match.group(0) == '%%'
+                else '$%d' % next(n),
+                query)
+            return statement, tuple(params)
+
+    def _prepare(self, connection, cursor, statement, types):
+        """ |PREPARE|s @statement on @connection, inside of a savepoint if
+            a transaction is open so that a statement which cannot be
+            prepared doesn't abort the transaction.
+
+            -> (#str) name of the prepared statement or |None| if it could
+                not be prepared
+        """
+        name = 'cargo_%s' % randhex(12)
+        prepare = 'PREPARE %s %sAS %s' % (
+            name, '(%s) ' % ', '.join(types) if types else '', statement)
+        if connection.autocommit:
+            try:
+                cursor.execute(prepare)
+            except psycopg2.Error:
+                name = None
+            return name
+        cursor.execute('SAVEPOINT cargo_prepare')
+        try:
+            cursor.execute(prepare)
+        except psycopg2.Error:
+            cursor.execute('ROLLBACK TO SAVEPOINT cargo_prepare')
+            name = None
+        cursor.execute('RELEASE SAVEPOINT cargo_prepare')
+        return name
+
+    def _forget_statements(self, connection):
+        """ Forgets the statements prepared on @connection without
+            deallocating them
+        """
+        self._statement_cache.pop(connection, None)
+
+    def _invalidate_statements(self, connection, schemas):
+        """ Deallocates the statements prepared on @connection if they
+            were prepared with a search path other than @schemas
+        """
+        statements = self._statement_cache.get(connection)
+        if statements and statements.search_path != schemas:
+            cursor = connection.cursor()
+            cursor.execute('DEALLOCATE ALL')
+            cursor.close()
+            self.statement_cache_stats.evictions += len(statements)
+            statements.clear()
+
     @staticmethod
     def to_dsn(opt):
         """ Converts @opt to a string if it isn't one already.
@@ -247,12 +436,14 @@ class Postgres(BasePostgresClient):
     """
     __slots__ = ('_dsn', 'autocommit', '_connection', '_connection_options',
                  '_schema', 'encoding', '_cursor_factory', '_cache',
-                 '_search_paths', '_events')
+                 '_search_paths', '_events', '_search_path_state',
+                 'search_path_stats', 'statement_cache_size',
+                 '_statement_cache', 'statement_cache_stats')
 
     def __init__(self, dsn=None, cursor_factory=CNamedTupleCursor,
                  connection=None, autocommit=False, encoding=None,
                  schema=None, search_paths=None, events=None,
-                 **connection_options):
+                 statement_cache_size=0, **connection_options):
         """`Postgres Client`
             ==================================================================
             This is a thin wrapper for the :mod:psycopg2 connection object
@@ -286,6 +477,10 @@ class Postgres(BasePostgresClient):
                         }
                     })
                 ..
+            @statement_cache_size: (#int) maximum number of statements
+                kept |PREPARE|d on each connection, the least recently
+                used statement is deallocated when the limit is exceeded.
+                |0| disables the statement cache. :see::meth:execute
             @**connection_options: |key=value| arguments to pass to
                 :func:psycopg2.connect
         """
@@ -303,6 +498,13 @@ class Postgres(BasePostgresClient):
         except TypeError:
             self._search_paths = ['public']
         self.encoding = encoding
+        #: Search path last applied to the connection
+        self._search_path_state = WeakKeyDictionary()
+        self.search_path_stats = CacheStats()
+        #: Statements prepared on the connection
+        self.statement_cache_size = statement_cache_size
+        self._statement_cache = WeakKeyDictionary()
+        self.statement_cache_stats = CacheStats()
 
         # Cursor options
         self._cursor_factory = cursor_factory
@@ -397,14 +599,119 @@ class Postgres(BasePostgresClient):
         """ Rolls back a transaction """
         self._apply_before('rollback')
         self._connection.rollback()
+        #: A SET within the transaction is rolled back along with it
+        self._forget_search_path(self._connection)
         self._apply_after('rollback')
 
+    def set_search_path(self, *schemas):
+        """ Sets @schemas to the search path of this connection. The |SET|
+            is only sent when @schemas differ from the search path which
+            was last applied to the connection.
+
+            @schemas: (#str) one or several schema search paths
+
+            -> (#bool) |True| if the search path was sent to the server
+        """
+        connection = self.connection
+        if self._search_path_is_current(connection, schemas):
+            return False
+        cursor = connection.cursor()
+        self.apply_schema(cursor, *schemas)
+        cursor.close()
+        self._search_path_state[connection] = schemas
+        self._invalidate_statements(connection, schemas)
+        return True
+
+    def execute(self, cursor, query, params=None):
+        """ Executes @query with @params in @cursor. If the statement cache
+            is enabled with :prop:statement_cache_size, |SELECT|, |INSERT|,
+            |UPDATE|, |DELETE|, |VALUES| and |WITH| queries are |PREPARE|d
+            the first time they are seen on the connection and |EXECUTE|d
+            thereafter. Statements are keyed by their text, so queries
+            should have their placeholders normalized beforehand.
+            :see::func:cargo.expressions.normalize_params
+
+            Hits, misses and evictions are counted in
+            :prop:statement_cache_stats.
+
+            @cursor: (:mod:psycopg2 cursor) an unnamed cursor of this
+                connection
+            @query: (#str) query string
+            @params: (#tuple|#dict|#list) of params referenced in @query
+                with |%s| or |%(name)s|
+
+            -> @cursor
+        """
+        if not self.statement_cache_size or ';' in query or \
+           not _preparable_re.match(query):
+            cursor.execute(query, params or tuple())
+            return cursor
+        connection = self.connection
+        statement, args = self._to_prepared(query, params)
+        types = tuple(map(_get_param_type, args))
+        if None in types:
+            cursor.execute(query, params)
+            return cursor
+        key = (statement, types)
+        try:
+            statements = self._statement_cache[connection]
+        except KeyError:
+            statements = PreparedStatements()
+            self._statement_cache[connection] = statements
+        try:
+            name = statements[key]
+            statements.move_to_end(key)
+            self.statement_cache_stats.hits += 1
+        except KeyError:
+            self.statement_cache_stats.misses += 1
+            if not statements:
+                statements.search_path = \
+                    self._search_path_state.get(connection)
+            name = self._prepare(connection, cursor, statement, types)
+            statements[key] = name
+            if len(statements) > self.statement_cache_size:
+                _, evicted = statements.popitem(last=False)
+                if evicted is not None:
+                    cursor.execute('DEALLOCATE %s' % evicted)
+                self.statement_cache_stats.evictions += 1
+        if name is None:
+            cursor.execute(query, params or tuple())
+        elif args:
+            cursor.execute('EXECUTE %s (%s)' %
+                           (name, ', '.join(['%s'] * len(args))),
+                           args)
+        else:
+            cursor.execute('EXECUTE %s' % name)
+        return cursor
+
+    def deallocate(self):
+        """ Deallocates every statement prepared on this connection and
+            empties its statement cache
+        """
+        connection = self.connection
+        self._forget_statements(connection)
+        cursor = connection.cursor()
+        cursor.execute('DEALLOCATE ALL')
+        cursor.close()
+
+    def reset(self):
+        """ Resets the connection session to its defaults, rolling back
+            any open transaction and deallocating its prepared statements
+        """
+        connection = self.connection
+        connection.reset()
+        self._forget_search_path(connection)
+        self.deallocate()
+        if not connection.autocommit:
+            connection.rollback()
+
     def close(self):
         """ Closes the psycopg2 cursor and connection """
         self._apply_before('close')
         try:
+            self._forget_statements(self._connection)
             self._connection.close()
-        except AttributeError:
+        except (AttributeError, TypeError):
             pass
         self._apply_after('close')
 
@@ -452,12 +759,15 @@ class PostgresPoolConnection(Postgres):
 class PostgresPool(BasePostgresClient):
     __slots__ = ('_dsn', 'autocommit',  '_connection_options', '_schema',
                  'encoding', '_cursor_factory', 'minconn', 'maxconn', '_pool',
-                 '_cache', '_search_paths', '_events')
+                 '_cache', '_search_paths', '_events', '_search_path_state',
+                 'search_path_stats', 'statement_cache_size',
+                 '_statement_cache', 'statement_cache_stats')
 
     def __init__(self, minconn=1, maxconn=1, dsn=None,
                  cursor_factory=CNamedTupleCursor, pool=None,
                  autocommit=False, encoding=None, schema=None,
-                 search_paths=None, events=None, **connection_options):
+                 search_paths=None, events=None, statement_cache_size=0,
+                 **connection_options):
         """`Postgres Pool`
             ==================================================================
             @minconn: (#int) minimum number of connections to establish
@@ -484,6 +794,13 @@ class PostgresPool(BasePostgresClient):
         self._pool = pool
         self.minconn = minconn
         self.maxconn = maxconn
+        #: Search paths last applied to each connection in the pool
+        self._search_path_state = WeakKeyDictionary()
+        self.search_path_stats = CacheStats()
+        #: Statements prepared on each connection in the pool
+        self.statement_cache_size = statement_cache_size
+        self._statement_cache = WeakKeyDictionary()
+        self.statement_cache_stats = CacheStats()
 
         # Cursor options
         self._cursor_factory = cursor_factory
@@ -541,6 +858,11 @@ class PostgresPool(BasePostgresClient):
             poolconn = poolconn._connection
         except AttributeError:
             pass
+        if not poolconn.closed and \
+           poolconn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            #: The pool rolls back open transactions when connections are
+            #  put away
+            self._forget_search_path(poolconn)
         self.pool.putconn(poolconn, *args, **kwargs)
 
     def close(self):
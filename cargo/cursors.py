@@ -7,7 +7,8 @@
 
 """
 import copy
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from functools import lru_cache
 
 try:
     from cnamedtuple import namedtuple as nt
@@ -17,14 +18,35 @@ except ImportError:
 from psycopg2.extensions import cursor as _cursor
 from vital.cache import cached_property
 
+from cargo.fields.field import Field
+
 
 __all__ = (
     'CNamedTupleCursor',
     'OrderedDictCursor',
-    'ModelCursor'
+    'ModelCursor',
+    'Row',
+    'RowCursor',
+    'make_record',
+    'make_row'
 )
 
 
+@lru_cache(maxsize=1024)
+def make_record(names, typename='Record', rename=True):
+    """ Creating a :class:namedtuple class is expensive, so the classes are
+        shared by every cursor in the process and the 1024 most recently
+        used are kept.
+
+        @names: (#tuple) of field names
+        @typename: (#str) name of the class
+        @rename: (#bool) |True| to replace invalid field names with
+            positional names
+        -> :class:namedtuple class with @names as its fields
+    """
+    return nt(typename, names, rename=rename)
+
+
 class CNamedTupleCursor(_cursor):
     """ Copyright (C) 2003-2010 Federico Di Gregorio  <fog@debian.org> """
     Record = None
@@ -77,8 +99,126 @@ class CNamedTupleCursor(_cursor):
             yield nt._make(next(it))
 
     def _make_nt(self):
-        return nt("Record", (d for d, *_ in self.description or []),
-                  rename=True)
+        return make_record(tuple(d for d, *_ in self.description or []))
+
+
+class Row(tuple):
+    """ ======================================================================
+        ``Usage Example``
+        ..
+            row = cursor.fetchone()
+            row.uid, row['uid'], row[0]
+        ..
+        |(1, 1, 1)|
+
+        ======================================================================
+        A result row which is a plain #tuple of its values, readable by
+        index, by column name as a key and by column name as an attribute.
+        The column names are kept in a map shared by every row with the
+        same columns, so a row takes no more memory than a #tuple of its
+        values: 40 bytes plus 8 per column on 64-bit CPython 3.9, as
+        reported by |sys.getsizeof|.
+
+        Fetching 100,000 rows of six columns (see unit_bench/cursors.py)
+        takes about 264 bytes per row including the values, the same as
+        plain tuples and :class:CNamedTupleCursor records, against about
+        326 for :class:psycopg2.extras.DictCursor and 910 for
+        :class:psycopg2.extras.RealDictCursor and :class:OrderedDictCursor.
+    """
+    __slots__ = tuple()
+    #: (#dict) |{column name: index}| shared by the rows of a result set
+    _index = {}
+    #: (#tuple) of the column names
+    _names = tuple()
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise KeyError(key)
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def __reduce__(self):
+        return (_make_row, (self._names, tuple(self)))
+
+    def keys(self):
+        """ -> (#tuple) of the column names """
+        return self._names
+
+    def _asdict(self):
+        """ -> (:class:OrderedDict) of |{column name: value}| """
+        return OrderedDict(zip(self._names, self))
+
+
+@lru_cache(maxsize=1024)
+def make_row(names):
+    """ -> :class:Row class for the column @names (#tuple), shared by every
+            cursor in the process. :see::func:make_record
+    """
+    index = {}
+    for i, name in enumerate(names):
+        index.setdefault(name, i)
+    return type('Row', (Row,), {'__slots__': tuple(),
+                                '_index': index,
+                                '_names': names})
+
+
+def _make_row(names, values):
+    return make_row(names)(values)
+
+
+class RowCursor(_cursor):
+    """ Returns rows as :class:Row objects which support attribute, key and
+        index access at the memory cost of a plain #tuple per row
+    """
+    Row = None
+
+    def execute(self, query, vars=None):
+        self.Row = None
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars):
+        self.Row = None
+        return super().executemany(query, vars)
+
+    def callproc(self, procname, vars=None):
+        self.Row = None
+        return super().callproc(procname, vars)
+
+    def _make_row(self):
+        self.Row = make_row(tuple(d for d, *_ in self.description or []))
+        return self.Row
+
+    def fetchone(self):
+        t = super().fetchone()
+        if t is not None:
+            return (self.Row or self._make_row())(t)
+
+    def fetchmany(self, size=None):
+        ts = super().fetchmany(size)
+        return list(map(self.Row or self._make_row(), ts))
+
+    def fetchall(self):
+        ts = super().fetchall()
+        return list(map(self.Row or self._make_row(), ts))
+
+    def __iter__(self):
+        it = super().__iter__()
+        try:
+            t = next(it)
+        except StopIteration:
+            return
+        row = self.Row or self._make_row()
+        yield row(t)
+        for t in iter(it.__next__, None):
+            yield row(t)
 
 
 class OrderedDictCursor(_cursor):
@@ -116,21 +256,257 @@ class OrderedDictCursor(_cursor):
             yield self._to_od(next(it))
 
 
+class _Pending(object):
+    """ Raw column value held by a lazily decoded :class:Field """
+    __slots__ = ('value', 'loaded')
+
+    def __init__(self, value, loaded):
+        """ @value: the column value as returned by :mod:psycopg2
+            @loaded: (#dict) the :prop:Model._loaded_values of the model
+                the field belongs to
+        """
+        self.value = value
+        self.loaded = loaded
+
+
+class _LazyField(object):
+    """ Mixin for :class:Field(s) which hold a :class:_Pending column value.
+        The field is decoded and restored to its own class the first time
+        it is accessed.
+    """
+    __slots__ = tuple()
+
+    def __getattribute__(self, name):
+        materialize(self)
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        materialize(self)
+        object.__setattr__(self, name, value)
+
+    def __call__(self, *args, **kwargs):
+        materialize(self)
+        return self.__call__(*args, **kwargs)
+
+
+_lazy_classes = {}
+
+
+def _get_lazy_class(cls):
+    """ -> lazily decoded version of the :class:Field @cls """
+    try:
+        return _lazy_classes[cls]
+    except KeyError:
+        lazy_cls = _lazy_classes[cls] = type(
+            cls.__name__, (_LazyField, cls),
+            {'__slots__': tuple(), '__module__': cls.__module__,
+             '__qualname__': cls.__qualname__})
+        return lazy_cls
+
+
+def defer(field, value, loaded):
+    """ Stores the raw @value in @field without decoding it. The field's
+        cast runs the first time the field is accessed.
+
+        @field: (:class:Field)
+        @value: the column value as returned by :mod:psycopg2
+        @loaded: (#dict) the :prop:Model._loaded_values of the model
+            @field belongs to
+        -> the :class:_Pending value stored in @field, or the
+            :prop:Field._tracked_value of fields which are decoded now
+    """
+    cls = type(field)
+    if isinstance(getattr(cls, 'value', None), property):
+        #: Fields which get their value from other attributes, i.e.
+        #  :class:Encrypted, would be decoded by reading them
+        field(value)
+        return field._tracked_value
+    pending = _Pending(value, loaded)
+    if issubclass(cls, _LazyField):
+        #: Replaces the previous value of a recycled field without
+        #  decoding it
+        object.__setattr__(field, 'value', pending)
+    else:
+        field.value = pending
+        field.__class__ = _get_lazy_class(cls)
+    return pending
+
+
+def materialize(field):
+    """ Decodes the value of @field if it was deferred with :func:defer.
+        The field is marked unchanged if it was unchanged when deferred.
+
+        @field: (:class:Field)
+    """
+    cls = type(field)
+    if not issubclass(cls, _LazyField):
+        return
+    pending = object.__getattribute__(field, 'value')
+    object.__setattr__(field, '__class__', cls.__bases__[1])
+    field.value = field.empty
+    field(pending.value)
+    loaded = pending.loaded
+    if loaded.get(field.field_name) is pending:
+        loaded[field.field_name] = field._tracked_value
+
+
 class ModelCursor(_cursor):
+    #: Number of models which are refilled in turn for each row rather than
+    #  copying the model for every row, |True| recycles a single model.
+    #  The ring grows to hold every row of a single fetch, rows are only
+    #  valid until the cursor has returned as many more rows as there are
+    #  models in the ring, so they must not be retained.
+    reuse = 0
+    #: Hydration plan for the current :prop:description,
+    #  :see::meth:_make_plan
+    _plan = None
+    #: Names of the fields in the model which are not in the plan
+    _unfilled = tuple()
+    #: |((alias, parent alias, foreign key name, model), columns)| of the
+    #  models joined by :meth:Model.select_related where |columns| are
+    #  |(column index, field name)| pairs
+    _related = tuple()
+    #: Recycled models, :see::attr:reuse
+    _ring = None
+
+    def _make_plan(self, model):
+        """ Resolves the columns in :prop:description to the fields of
+            @model once per result set.
+
+            -> (#tuple) |(fields, others)| where |fields| are
+                |(column index, field name)| pairs of columns which
+                are fields in @model and |others| are the remaining
+                |(column index, column name)| pairs
+        """
+        attrs = model.__dict__
+        related = self._cargo_model._related
+        columns = {alias: [] for alias, *_ in related}
+        fields, others = [], []
+        for i, (name, *_) in enumerate(self.description or []):
+            if isinstance(attrs.get(name), Field):
+                fields.append((i, name))
+                continue
+            alias, _, field_name = name.rpartition('.')
+            if alias in columns:
+                columns[alias].append((i, field_name))
+            else:
+                others.append((i, name))
+        self._plan = tuple(fields), tuple(others)
+        self._related = tuple((join, tuple(columns[join[0]]))
+                              for join in related)
+        filled = set(name for _, name in fields)
+        self._unfilled = tuple(name for name in model.field_names
+                               if name not in filled)
+        return self._plan
+
+    def _grow_ring(self, size):
+        """ Adds models to the ring of recycled models until it holds
+            @size models
+        """
+        ring = self._ring
+        if ring is None:
+            ring = self._ring = deque()
+        while len(ring) < size:
+            ring.appendleft(self._cargo_model.clear_copy())
+        return ring
+
+    def _recycle(self):
+        """ -> the next model in the ring of :attr:reuse models, cleared
+                of the values which the current plan does not fill
+        """
+        ring = self._ring or self._grow_ring(int(self.reuse))
+        model = ring[0]
+        ring.rotate(-1)
+        if self._plan is None:
+            self._make_plan(model)
+        attrs = model.__dict__
+        for name in self._unfilled:
+            attrs[name].clear()
+        return model
 
     def _fill_model(self, tup, new=True):
-        model = self._cargo_model.clear_copy() if new else self._cargo_model
-        for (k, *_), v in zip(self.description, tup):
-            model[k] = v
+        if not new:
+            model = self._cargo_model
+        elif self.reuse:
+            model = self._recycle()
+        else:
+            model = self._cargo_model.clear_copy()
+        fields, others = self._plan or self._make_plan(model)
+        attrs = model.__dict__
+        if self._cargo_model._lazy:
+            model = self._defer_model(model, tup, fields, others)
+        else:
+            for i, name in others:
+                model[name] = tup[i]
+            #: Marks the fields unchanged as they are filled
+            model._loaded_values = loaded = {
+                name: attrs[name]._tracked_value for name in self._unfilled}
+            for i, name in fields:
+                field = attrs[name]
+                field(tup[i])
+                loaded[name] = field._tracked_value
+        if self._related:
+            self._fill_related(model, tup)
+        return model
+
+    def _fill_related(self, model, tup):
+        """ Splits the columns of the tables joined by
+            :meth:Model.select_related out of @tup into copies of the
+            referenced models and attaches them to the foreign keys of
+            @model, or of the referenced model they were joined through.
+            The foreign keys are given a new :class:Reference holding
+            the model, which is |None| when the |LEFT JOIN| found no row.
+        """
+        models = {None: model}
+        for (alias, parent, name, proto), columns in self._related:
+            owner = models.get(parent)
+            related = None
+            if owner is not None:
+                fkey = owner.__dict__[name]
+                if fkey.value_is_not_null:
+                    if any(tup[i] is not None for i, _ in columns):
+                        related = proto.clear_copy()
+                        attrs = related.__dict__
+                        related._loaded_values = loaded = {}
+                        for i, field_name in columns:
+                            field = attrs[field_name]
+                            field(tup[i])
+                            loaded[field_name] = field._tracked_value
+                    ref = fkey.ref.with_prefetched(fkey.value, related)
+                    if related is not None:
+                        ref.model = related
+                    fkey.ref = ref
+            models[alias] = related
+
+    def _defer_model(self, model, tup, fields, others):
+        """ Fills @model with the raw column values of @tup, the fields
+            are decoded when they are first accessed.
+            :see::meth:Model.set_lazy
+        """
+        attrs = model.__dict__
+        for i, name in others:
+            model[name] = tup[i]
+        model._loaded_values = loaded = {
+            name: attrs[name]._tracked_value for name in self._unfilled}
+        for i, name in fields:
+            value = tup[i]
+            if value is None:
+                attrs[name](value)
+                loaded[name] = attrs[name]._tracked_value
+            else:
+                loaded[name] = defer(attrs[name], value, loaded)
         return model
 
     def execute(self, query, vars=None):
+        self._plan = None
         return super().execute(query, vars)
 
     def executemany(self, query, vars):
+        self._plan = None
         return super().executemany(query, vars)
 
     def callproc(self, procname, vars=None):
+        self._plan = None
         return super().callproc(procname, vars)
 
     def fetchone(self):
@@ -140,10 +516,14 @@ class ModelCursor(_cursor):
 
     def fetchmany(self, size=None):
         ts = super().fetchmany(size)
+        if self.reuse:
+            self._grow_ring(len(ts))
         return list(map(self._fill_model, ts))
 
     def fetchall(self):
         ts = super().fetchall()
+        if self.reuse:
+            self._grow_ring(len(ts))
         return list(map(self._fill_model, ts))
 
     def __iter__(self):
@@ -0,0 +1,120 @@
+"""
+
+  `Cargo Columns`
+  ``Typed NumPy column arrays for query results``
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   The MIT License (MIT) © 2016 Jared Lunde
+   http://github.com/jaredlunde/cargo-orm
+
+"""
+from datetime import timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from vital.debug import preprX
+
+from cargo.etc.types import *
+
+
+__all__ = ('ColumnArray', 'get_dtype')
+
+
+#: NumPy dtypes of the column type OIDs, any other type is an |object|
+#  column
+_dtypes = {
+    SMALLINT: 'int16',
+    INT: 'int32',
+    BIGINT: 'int64',
+    FLOAT: 'float32',
+    DOUBLE: 'float64',
+    BOOL: 'bool',
+    DATE: 'datetime64[D]',
+    TIMESTAMP: 'datetime64[us]',
+    TIMESTAMPTZ: 'datetime64[us]'
+}
+#: dtypes which cannot hold |NULL| and the dtype they become when a column
+#  contains one
+_nullable = {
+    'int16': 'float64',
+    'int32': 'float64',
+    'int64': 'float64',
+    'bool': 'object'
+}
+
+
+def get_dtype(oid):
+    """ -> (#str) NumPy dtype of the column type @oid """
+    return _dtypes.get(oid, 'object')
+
+
+def _utc(value):
+    """ -> naive UTC #datetime of the aware #datetime @value, NumPy
+            datetimes have no time zone
+    """
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class ColumnArray(object):
+    """ Appends chunks of column values to a typed :class:numpy.ndarray,
+        growing it geometrically rather than keeping the values around.
+
+        Integer columns which contain |NULL| become |float64| columns with
+        |NaN| in place of |NULL|, boolean columns become |object| columns.
+        |NULL| is |NaN| in float columns and |NaT| in datetime columns.
+    """
+    __slots__ = ('name', 'dtype', 'array', 'size', '_convert')
+
+    def __init__(self, name, oid, capacity=1024):
+        """ @name: (#str) name of the column
+            @oid: (#int) type OID of the column
+            @capacity: (#int) number of values to allocate to begin with
+        """
+        if np is None:
+            raise ImportError('NumPy is required for columnar results, '
+                              'install it with `pip install '
+                              'cargo-orm[columns]`.')
+        self.name = name
+        self.dtype = get_dtype(oid)
+        self.array = np.empty(capacity, dtype=self.dtype)
+        self.size = 0
+        self._convert = _utc if oid == TIMESTAMPTZ else None
+
+    __repr__ = preprX('name', 'dtype', 'size')
+
+    def _reserve(self, size):
+        capacity = len(self.array)
+        if size > capacity:
+            while capacity < size:
+                capacity *= 2
+            self.array.resize(capacity, refcheck=False)
+
+    def _upcast(self, dtype):
+        self.dtype = dtype
+        self.array = self.array.astype(dtype)
+
+    def extend(self, values):
+        """ Appends the #tuple of @values to the array """
+        size = len(values)
+        if not size:
+            return
+        if self._convert is not None:
+            values = tuple(map(self._convert, values))
+        if self.dtype in _nullable and None in values:
+            self._upcast(_nullable[self.dtype])
+        if self.dtype == 'object':
+            chunk = np.fromiter(values, dtype=object, count=size)
+        else:
+            chunk = np.array(values, dtype=self.dtype)
+        self._reserve(self.size + size)
+        self.array[self.size:self.size + size] = chunk
+        self.size += size
+
+    def to_array(self):
+        """ -> (:class:numpy.ndarray) of the values appended to the column """
+        self.array.resize(self.size, refcheck=False)
+        return self.array
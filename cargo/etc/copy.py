@@ -0,0 +1,585 @@
+"""
+
+  `Cargo COPY`
+  ``Encoders for streaming rows through Postgres COPY``
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   The MIT License (MIT) © 2016 Jared Lunde
+   http://github.com/jaredlunde/cargo-orm
+
+"""
+import re
+try:
+    import ujson as json
+except ImportError:
+    import json
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from struct import Struct
+from uuid import UUID
+
+from psycopg2.extensions import adapt, adapters, encodings, ISQLQuote
+from psycopg2.extras import Range
+
+from cargo.etc.types import *
+
+
+__all__ = ('BinaryCopyIn', 'CopyIn', 'copy_to', 'encode_text',
+           'get_binary_encoder')
+
+
+#: Quoted literals returned by :mod:psycopg2 adapters, i.e. |'foo'::inet|
+_literal_re = re.compile(r"^(E)?'((?:[^']|'')*)'(?:::[\w\s\"\[\]]+)?$",
+                         re.S)
+#: Characters which must be escaped in the COPY text format
+_copy_escapes = str.maketrans({'\\': '\\\\',
+                               '\n': '\\n',
+                               '\r': '\\r',
+                               '\t': '\\t'})
+NULL = '\\N'
+#: Types whose adapters are superseded by the encoder
+_builtin_types = {str, bool, int, float, Decimal, bytes, bytearray, memoryview,
+                  date, datetime, time, timedelta, list, tuple, dict}
+#: Options of |COPY ... TO STDOUT| for each output format. JSON lines are
+#  copied as single CSV columns quoted by and delimited with control
+#  characters, which JSON strings always escape, so the lines are never
+#  quoted or escaped the way the text format would escape backslashes.
+_copy_to_options = {
+    'text': ['FORMAT text'],
+    'csv': ['FORMAT csv'],
+    'binary': ['FORMAT binary'],
+    'json': ['FORMAT csv', "QUOTE E'\\x01'", "DELIMITER E'\\x02'"]
+}
+
+
+def _array_element(value, conn=None):
+    """ -> (#str) @value formatted as an element of an array literal """
+    if value is None:
+        return 'NULL'
+    elif isinstance(value, (list, tuple)):
+        return _array_literal(value, conn)
+    value = _to_text(value, conn=conn)
+    return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _array_literal(value, conn=None):
+    """ -> (#str) |{"a","b"}| array literal for the #list @value """
+    return '{%s}' % ','.join(_array_element(x, conn) for x in value)
+
+
+def _hstore_literal(value, conn=None):
+    """ -> (#str) |"a"=>"b"| hstore literal for the #dict @value """
+    def quote(x):
+        if x is None:
+            return 'NULL'
+        return '"%s"' % str(x).replace('\\', '\\\\').replace('"', '\\"')
+    return ', '.join('%s=>%s' % (quote(k), quote(v))
+                     for k, v in value.items())
+
+
+def _range_literal(value, conn=None):
+    """ -> (#str) |[1,5)| range literal for the :class:Range @value """
+    if value.isempty:
+        return 'empty'
+    return '%s%s,%s%s' % (
+        value.lower_inc and '[' or '(',
+        '' if value.lower is None else _array_element(value.lower, conn),
+        '' if value.upper is None else _array_element(value.upper, conn),
+        value.upper_inc and ']' or ')')
+
+
+def _adapted_text(value, conn=None):
+    """ -> (#str) the text of the SQL literal @value is quoted as by its
+            registered :mod:psycopg2 adapter
+    """
+    adapter = adapt(value)
+    try:
+        adapter.prepare(conn)
+    except (AttributeError, TypeError):
+        pass
+    literal = adapter.getquoted()
+    if isinstance(literal, bytes):
+        literal = literal.decode(encodings.get(conn.encoding, 'utf8')
+                                 if conn is not None else 'utf8')
+    literal = literal.strip()
+    match = _literal_re.match(literal)
+    if match is None:
+        #: Unquoted literals i.e. numbers and booleans
+        return str(value) if literal.endswith(')') else literal
+    escaped, literal = match.groups()
+    literal = literal.replace("''", "'")
+    if escaped:
+        literal = literal.replace('\\\\', '\\')
+    return literal
+
+
+def _to_text(value, oid=None, conn=None):
+    """ -> (#str) the Postgres text representation of @value """
+    typ = type(value)
+    if oid in {JSON, JSONB}:
+        return json.dumps(value)
+    elif typ is str:
+        return value
+    elif typ is bool:
+        return 't' if value else 'f'
+    elif typ in {int, float}:
+        return repr(value)
+    elif typ not in _builtin_types and (typ, ISQLQuote) in adapters and \
+            not isinstance(value, Range) and \
+            not hasattr(value, '__cargotype__'):
+        #: Values with adapters of their own, i.e. encrypted values
+        return _adapted_text(value, conn)
+    elif isinstance(value, dict):
+        if oid == HSTORE:
+            return _hstore_literal(value, conn)
+        return json.dumps(value)
+    elif isinstance(value, (list, tuple)):
+        return _array_literal(value, conn)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\x' + bytes(value).hex()
+    elif isinstance(value, (date, time)):
+        return value.isoformat()
+    elif isinstance(value, timedelta):
+        return '%d days %d seconds %d microseconds' % (
+            value.days, value.seconds, value.microseconds)
+    elif isinstance(value, Range):
+        return _range_literal(value, conn)
+    return _adapted_text(value, conn)
+
+
+def encode_text(value, oid=None, conn=None):
+    """ Encodes @value as a column of the |COPY| text format
+
+        @value: the value to encode, |None| is encoded as |\\N|
+        @oid: (#int) :mod:cargo.etc.types OID of the column, used to tell
+            |json| from |hstore| and |array| columns
+        @conn: (:mod:psycopg2 connection) passed to the adapters of values
+            which aren't natively understood by the encoder
+
+        -> (#str) escaped text
+    """
+    if value is None:
+        return NULL
+    return _to_text(value, oid, conn).translate(_copy_escapes)
+
+
+def copy_to(query, format='csv', header=False):
+    """ -> (#str) |COPY (@query) TO STDOUT| statement writing the results
+            of @query in @format
+
+        @query: (#str) mogrified query, |COPY| does not accept parameters
+        @format: (#str) |text|, |csv|, |binary| or |json|. The |json|
+            format expects @query to select a single |json| column.
+        @header: (#bool) |True| to write a header line with the column
+            names, only available to the |csv| format
+    """
+    try:
+        options = list(_copy_to_options[format])
+    except KeyError:
+        raise ValueError('Unknown COPY format `%s`' % format)
+    if header:
+        if format != 'csv':
+            raise ValueError('Only the `csv` COPY format has a header')
+        options.append('HEADER true')
+    return 'COPY (%s) TO STDOUT WITH (%s)' % (query, ', '.join(options))
+
+
+class CopyIn(object):
+    """ A file-like object which lazily encodes rows for |COPY ... FROM
+        STDIN|, only @chunk_size bytes worth of rows are ever held in
+        memory at a time.
+
+        ``Usage Example``
+        ..
+            f = CopyIn(((1, 'foo'), (2, 'bar')), (encode_text, encode_text))
+            cursor.copy_expert('COPY foo (uid, textfield) FROM STDIN', f)
+        ..
+    """
+    __slots__ = ('rows', 'encoders', 'chunk_size', 'rowcount', 'error')
+
+    def __init__(self, rows, encoders, chunk_size=8192):
+        """`COPY FROM`
+            ==================================================================
+            @rows: (#iter) of #tuple or #list rows
+            @encoders: (#tuple) of callables receiving a value and returning
+                its encoded #str, one per column
+            @chunk_size: (#int) number of bytes to encode at a time
+        """
+        self.rows = iter(rows)
+        self.encoders = encoders
+        self.chunk_size = chunk_size
+        self.rowcount = 0
+        #: The exception raised while encoding the rows, :mod:psycopg2
+        #  cancels the COPY in its place
+        self.error = None
+
+    def encode(self, row):
+        """ -> (#str) @row encoded as a line of the |COPY| text format """
+        return '\t'.join(encode(value)
+                         for encode, value in zip(self.encoders, row)) + '\n'
+
+    def read(self, size=-1):
+        """ -> (#str) whole encoded rows totalling at least :prop:chunk_size
+                characters, or the remaining rows if @size is negative,
+                |''| once the rows are exhausted
+        """
+        if size is None or size < 0:
+            size = float('inf')
+        else:
+            size = self.chunk_size
+        buffer = []
+        length = 0
+        encode = self.encode
+        try:
+            for row in self.rows:
+                line = encode(row)
+                self.rowcount += 1
+                buffer.append(line)
+                length += len(line)
+                if length >= size:
+                    break
+        except Exception as e:
+            self.error = e
+            raise
+        return ''.join(buffer)
+
+
+#
+#  `` Binary COPY ``
+#
+
+
+_header = b'PGCOPY\n\xff\r\n\x00' + Struct('!ii').pack(0, 0)
+_trailer = Struct('!h').pack(-1)
+_len = Struct('!i')
+_count = Struct('!h')
+_bool = Struct('!i?')
+_int2 = Struct('!ih')
+_int4 = Struct('!ii')
+_int8 = Struct('!iq')
+_float4 = Struct('!if')
+_float8 = Struct('!id')
+_timetz = Struct('!iqi')
+_array_header = Struct('!iii')
+_array_dimension = Struct('!ii')
+_numeric_header = Struct('!hhHH')
+_NULL = _len.pack(-1)
+_POSTGRES_EPOCH = datetime(2000, 1, 1)
+_POSTGRES_EPOCH_TZ = _POSTGRES_EPOCH.replace(tzinfo=timezone.utc)
+_POSTGRES_EPOCH_DATE = _POSTGRES_EPOCH.date()
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _has_own_adapter(value):
+    """ -> (#bool) |True| if @value is of a type with a :mod:psycopg2
+            adapter of its own, i.e. an encrypted value
+    """
+    typ = type(value)
+    return typ not in _builtin_types and (typ, ISQLQuote) in adapters and \
+        not hasattr(value, '__cargotype__')
+
+
+def _write_varlena(buf, data):
+    buf += _len.pack(len(data))
+    buf += data
+
+
+def _write_bool(buf, value, conn=None):
+    buf += _bool.pack(1, value)
+
+
+def _write_int2(buf, value, conn=None):
+    buf += _int2.pack(2, value)
+
+
+def _write_int4(buf, value, conn=None):
+    buf += _int4.pack(4, value)
+
+
+def _write_int8(buf, value, conn=None):
+    buf += _int8.pack(8, value)
+
+
+def _write_float4(buf, value, conn=None):
+    buf += _float4.pack(4, value)
+
+
+def _write_float8(buf, value, conn=None):
+    buf += _float8.pack(8, value)
+
+
+def _write_numeric(buf, value, conn=None):
+    """ Packs @value as base-10000 digits, :see::file:utils/adt/numeric.c """
+    if not isinstance(value, Decimal):
+        value = Decimal(value if isinstance(value, int) else str(value))
+    if value.is_nan():
+        _write_varlena(buf, _numeric_header.pack(0, 0, 0xC000, 0))
+        return
+    if value.is_infinite():
+        raise ValueError('Infinite numerics cannot be copied')
+    sign, digits, exponent = value.as_tuple()
+    digits = ''.join(map(str, digits))
+    dscale = max(0, -exponent)
+    if exponent > 0:
+        digits += '0' * exponent
+        exponent = 0
+    point = len(digits) + exponent
+    if point < 0:
+        digits = '0' * -point + digits
+        point = 0
+    whole, fraction = digits[:point], digits[point:]
+    whole = whole.zfill(-(-len(whole) // 4) * 4)
+    fraction = fraction.ljust(-(-len(fraction) // 4) * 4, '0')
+    groups = [int(whole[i:i+4]) for i in range(0, len(whole), 4)]
+    weight = len(groups) - 1
+    groups.extend(int(fraction[i:i+4]) for i in range(0, len(fraction), 4))
+    #: Strips leading and trailing zero groups
+    while groups and not groups[0]:
+        groups.pop(0)
+        weight -= 1
+    while groups and not groups[-1]:
+        groups.pop()
+    if not groups:
+        weight = 0
+    _write_varlena(buf,
+                   _numeric_header.pack(len(groups),
+                                        weight,
+                                        0x4000 if sign else 0,
+                                        dscale) +
+                   Struct('!%dH' % len(groups)).pack(*groups))
+
+
+def _write_text(buf, value, conn=None):
+    if type(value) is not str:
+        value = _adapted_text(value, conn) if _has_own_adapter(value) else \
+            str(value)
+    encoding = encodings.get(conn.encoding, 'utf8') if conn is not None else \
+        'utf8'
+    _write_varlena(buf, value.encode(encoding))
+
+
+def _write_json(buf, value, conn=None):
+    _write_text(buf, json.dumps(value), conn)
+
+
+def _write_jsonb(buf, value, conn=None):
+    #: Version 1 of the jsonb binary format is plain text
+    data = json.dumps(value).encode('utf8')
+    buf += _len.pack(len(data) + 1)
+    buf += b'\x01'
+    buf += data
+
+
+def _write_bytea(buf, value, conn=None):
+    if _has_own_adapter(value):
+        #: i.e. |'\\x00ff'::bytea|
+        value = bytes.fromhex(_adapted_text(value, conn)[2:])
+    _write_varlena(buf, value)
+
+
+def _write_uuid(buf, value, conn=None):
+    if not isinstance(value, UUID):
+        value = UUID(str(value))
+    _write_varlena(buf, value.bytes)
+
+
+def _write_date(buf, value, conn=None):
+    if isinstance(value, datetime) or not isinstance(value, date):
+        #: Datetimes and :mod:arrow dates
+        value = value.date()
+    buf += _int4.pack(4, (value - _POSTGRES_EPOCH_DATE).days)
+
+
+def _write_time(buf, value, conn=None):
+    if not isinstance(value, time):
+        value = value.time()
+    buf += _int8.pack(8, ((value.hour * 60 + value.minute) * 60 +
+                          value.second) * 1000000 + value.microsecond)
+
+
+def _write_timetz(buf, value, conn=None):
+    if not isinstance(value, time):
+        value = value.timetz()
+    offset = value.utcoffset() or timedelta(0)
+    buf += _timetz.pack(12,
+                        ((value.hour * 60 + value.minute) * 60 +
+                         value.second) * 1000000 + value.microsecond,
+                        -int(offset.total_seconds()))
+
+
+def _write_timestamp(buf, value, conn=None):
+    if not isinstance(value, datetime):
+        #: :mod:arrow timestamps
+        value = value.datetime
+    value = value.replace(tzinfo=None)
+    buf += _int8.pack(8, (value - _POSTGRES_EPOCH) // _MICROSECOND)
+
+
+def _write_timestamptz(buf, value, conn=None):
+    if not isinstance(value, datetime):
+        value = value.datetime
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    buf += _int8.pack(8, (value - _POSTGRES_EPOCH_TZ) // _MICROSECOND)
+
+
+#: Binary writers for :mod:cargo.etc.types OIDs
+_binary_writers = {
+    BOOL: _write_bool,
+    SMALLINT: _write_int2,
+    INT: _write_int4,
+    BIGINT: _write_int8,
+    FLOAT: _write_float4,
+    DOUBLE: _write_float8,
+    NUMERIC: _write_numeric,
+    CHAR: _write_text,
+    VARCHAR: _write_text,
+    TEXT: _write_text,
+    CITEXT: _write_text,
+    USERNAME: _write_text,
+    BINARY: _write_bytea,
+    UUIDTYPE: _write_uuid,
+    JSON: _write_json,
+    JSONB: _write_jsonb,
+    DATE: _write_date,
+    TIME: _write_time,
+    TIMETZ: _write_timetz,
+    TIMESTAMP: _write_timestamp,
+    TIMESTAMPTZ: _write_timestamptz,
+}
+#: Array element OIDs which differ from the :mod:cargo.etc.types OID,
+#  |None| for types without a fixed OID
+_element_oids = {CHAR: 1042, CITEXT: None, USERNAME: None}
+
+
+def _get_array_writer(oid):
+    write_element = _binary_writers[oid]
+    element_oid = _element_oids.get(oid, oid)
+    if element_oid is None:
+        raise TypeError('Arrays of OID `%s` cannot be copied in the binary '
+                        'format' % oid)
+
+    def flatten(value, dimensions, depth=0):
+        if len(dimensions) == depth:
+            dimensions.append(len(value))
+        for element in value:
+            if isinstance(element, (list, tuple)):
+                yield from flatten(element, dimensions, depth + 1)
+            else:
+                yield element
+
+    def write_array(buf, value, conn=None):
+        dimensions = []
+        elements = list(flatten(value, dimensions))
+        start = len(buf)
+        buf += _NULL
+        if not elements:
+            buf += _array_header.pack(0, 0, element_oid)
+        else:
+            buf += _array_header.pack(len(dimensions),
+                                      None in elements,
+                                      element_oid)
+            for dimension in dimensions:
+                buf += _array_dimension.pack(dimension, 1)
+            for element in elements:
+                if element is None:
+                    buf += _NULL
+                else:
+                    write_element(buf, element, conn)
+        #: Fills in the length of the array
+        _len.pack_into(buf, start, len(buf) - start - 4)
+    return write_array
+
+
+def get_binary_encoder(oid, array=False, conn=None):
+    """ Gets the binary |COPY| writer for the :mod:cargo.etc.types @oid
+
+        @oid: (#int) OID of the column, or of the array elements if @array
+            is |True|
+        @array: (#bool) |True| if the column is an array of @oid
+        @conn: (:mod:psycopg2 connection) passed to the adapters of values
+            with adapters of their own, i.e. encrypted values
+
+        -> (#callable) receiving a #bytearray buffer and a value and packing
+            the value into the buffer
+
+        :raises:|TypeError| if there is no binary writer for @oid
+    """
+    try:
+        write = _get_array_writer(oid) if array else _binary_writers[oid]
+    except KeyError:
+        raise TypeError('OID `%s` cannot be copied in the binary format' %
+                        oid)
+
+    def encode(buf, value):
+        if value is None:
+            buf += _NULL
+        else:
+            write(buf, value, conn)
+    return encode
+
+
+class BinaryCopyIn(CopyIn):
+    """ A file-like object which lazily packs rows into the binary |COPY|
+        format. Values are packed straight into a single, reused #bytearray
+        which is flushed to the server every :prop:chunk_size bytes.
+
+        ``Usage Example``
+        ..
+            f = BinaryCopyIn(((1, 'foo'), (2, 'bar')),
+                             (get_binary_encoder(INT),
+                              get_binary_encoder(TEXT)))
+            cursor.copy_expert(
+                'COPY foo (uid, textfield) FROM STDIN WITH (FORMAT binary)',
+                f)
+        ..
+    """
+    __slots__ = ('_buffer', '_count')
+
+    def __init__(self, rows, encoders, chunk_size=65536):
+        """`COPY FROM ... WITH (FORMAT binary)`
+            ==================================================================
+            @rows: (#iter) of #tuple or #list rows
+            @encoders: (#tuple) of callables receiving a #bytearray and a
+                value and packing the value into it, one per column.
+                :see::func:get_binary_encoder
+            @chunk_size: (#int) number of bytes to pack at a time
+        """
+        super().__init__(rows, encoders, chunk_size=chunk_size)
+        self._buffer = bytearray(_header)
+        self._count = _count.pack(len(encoders))
+
+    def encode(self, row):
+        """ Packs @row into the buffer """
+        buf = self._buffer
+        buf += self._count
+        for encode, value in zip(self.encoders, row):
+            encode(buf, value)
+
+    def read(self, size=-1):
+        """ -> (#bytes) whole packed rows totalling at least
+                :prop:chunk_size bytes, or the remaining rows if @size is
+                negative, |b''| once the rows and trailer are exhausted
+        """
+        if self.rows is None:
+            return b''
+        if size is None or size < 0:
+            size = float('inf')
+        else:
+            size = self.chunk_size
+        buf = self._buffer
+        encode = self.encode
+        try:
+            for row in self.rows:
+                encode(row)
+                self.rowcount += 1
+                if len(buf) >= size:
+                    break
+            else:
+                buf += _trailer
+                self.rows = None
+        except Exception as e:
+            self.error = e
+            raise
+        data = bytes(buf)
+        del buf[:]
+        return data
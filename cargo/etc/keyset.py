@@ -0,0 +1,62 @@
+"""
+
+  `Cargo Keyset`
+  ``Continuation tokens for keyset pagination``
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   The MIT License (MIT) © 2016 Jared Lunde
+   http://github.com/jaredlunde/cargo-orm
+
+"""
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+
+__all__ = ('decode_token', 'encode_token')
+
+
+#: Types which are stored in tokens as they are, anything else is stored
+#  as its #str and cast to the type of its column by the server
+_json_types = (bool, int, float, str, type(None))
+
+
+def _encode_value(value):
+    if isinstance(value, _json_types):
+        return value
+    return str(value)
+
+
+def encode_token(names, values, reverse=False):
+    """ -> (#str) opaque, URL-safe continuation token of the last seen
+            @values of the key columns named @names
+
+        @names: (#tuple) of #str column names of the key
+        @values: (#tuple) of the last seen values of the key columns
+        @reverse: (#bool) |True| if the key is ordered descending
+    """
+    token = json.dumps([list(names),
+                        list(map(_encode_value, values)),
+                        bool(reverse)])
+    return urlsafe_b64encode(token.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """ -> (#tuple) |(names, values, reverse)| encoded in @token.
+            :see::func:encode_token
+
+        @token: (#str) continuation token
+
+        ValueError is raised if @token is malformed
+    """
+    try:
+        data = urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        names, values, reverse = json.loads(data.decode())
+        if not names or len(names) != len(values) or \
+           not all(isinstance(name, str) for name in names):
+            raise ValueError
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError('Invalid continuation token `%s`' % token)
+    return tuple(names), tuple(values), bool(reverse)
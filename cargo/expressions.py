@@ -7,6 +7,7 @@
    http://github.com/jaredlunde/cargo-orm
 
 """
+import re
 import random
 import string
 from hashlib import sha1
@@ -29,6 +30,7 @@ __all__ = (
     'WrappedClause',
     'ValuesClause',
     "parameterize",
+    "normalize_params",
     "Expression",
     "Function",
     "WindowFunctions",
@@ -2545,3 +2547,58 @@ class safe(NumericLogic, StringLogic):
 
     def compile(self):
         return self.string
+
+
+_placeholder_re = re.compile(r'%(?:%|\(([^)]+)\)s)')
+
+
+def normalize_params(query, params, positional=False):
+    """ Renames the placeholders in @query in the order in which they appear
+        so that identically-shaped queries produce byte-identical SQL,
+        regardless of the parameter keys generated by their expressions.
+        As with :mod:psycopg2, a :class:KeyError is raised if a placeholder
+        is not a key in @params.
+
+        @query: (#str) query string
+        @params: (#dict) of params referenced in @query with |%(name)s|
+        @positional: (#bool) |True| to emit positional |%s| placeholders
+            and a #tuple of params rather than |%(p0)s| placeholders and
+            a #dict of params
+
+        -> (#tuple) |(query, params)|
+
+        ===================================================================
+        ``Usage Example``
+        ..
+            q = ORM().dry().where(model.uid == 1).select()
+            normalize_params(q.query, q.params)
+        ..
+        |('SELECT * FROM foo WHERE foo.uid = %(p0)s', {'p0': 1})|
+    """
+    if positional:
+        values = []
+        add_value = values.append
+    else:
+        names = {}
+        values = {}
+
+    def rename(match):
+        key = match.group(1)
+        if key is None:
+            return match.group(0)
+        if key not in params:
+            raise KeyError('Placeholder `%s` in the query is not a key of '
+                           'its params.' % match.group(0))
+        if positional:
+            add_value(params[key])
+            return '%s'
+        try:
+            return names[key]
+        except KeyError:
+            name = 'p%d' % len(names)
+            values[name] = params[key]
+            names[key] = '%(' + name + ')s'
+            return names[key]
+
+    query = _placeholder_re.sub(rename, query)
+    return query, tuple(values) if positional else values
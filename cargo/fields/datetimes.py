@@ -7,6 +7,7 @@
 
 """
 import copy
+from datetime import datetime
 
 from psycopg2.extensions import *
 
@@ -221,6 +222,8 @@ class ArrowTimestampTZ(ArrowTime):
 
 
 def _get_arrow(typ, value):
+    if isinstance(value, datetime):
+        return typ.fromdatetime(value)
     try:
         return typ.fromdatetime(arrow.get(value))
     except TypeError:
@@ -259,10 +262,11 @@ class Time(_TimeFields, TimeLogic, DateLogic):
     def __call__(self, value=Field.empty):
         if value is not Field.empty:
             if not isinstance(value, arrow.Arrow) and value is not None:
-                try:
-                    value = dateparser.parse(str(value))
-                except ValueError:
-                    pass
+                if not isinstance(value, datetime):
+                    try:
+                        value = dateparser.parse(str(value))
+                    except ValueError:
+                        pass
                 self._arrow = _get_arrow(self._arrow_type, value)
             else:
                 self._arrow = value
@@ -428,6 +428,11 @@ class Encrypted(Field):
     def value(self, value):
         self.type.value = value
 
+    @property
+    def _tracked_value(self):
+        #: :prop:value wraps the decrypted value anew on every access
+        return self.type._tracked_value
+
     @property
     def field_name(self):
         return self.type.field_name
@@ -623,6 +628,11 @@ class Encrypted(Field):
         cls.clear()
         return cls
 
+    def _clone(self):
+        field = Field._clone(self)
+        field.type = self.type._clone()
+        return field
+
     def clear(self):
         self.type.clear()
 
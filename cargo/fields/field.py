@@ -7,6 +7,7 @@
 
 """
 import copy
+from types import MemberDescriptorType
 try:
     import ujson as json
 except:
@@ -23,6 +24,37 @@ from cargo.validators import NullValidator
 __all__ = ('Field',)
 
 
+#: |(slot accessors, validator descriptor)| of :class:Field classes,
+#  :see::func:_get_slots
+_slots = {}
+
+
+def _get_slots(cls):
+    """ -> (#tuple) |(accessors, validator)| where |accessors| are the
+            |(get, set)| methods of the slot descriptors of @cls and its
+            bases, one per slot name, and |validator| is the descriptor of
+            the |validator| slot or |None|
+    """
+    try:
+        return _slots[cls]
+    except KeyError:
+        pass
+    descriptors = {}
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            descriptor = klass.__dict__.get(name)
+            if name not in descriptors and \
+               isinstance(descriptor, MemberDescriptorType):
+                descriptors[name] = descriptor
+    accessors = tuple((descriptor.__get__, descriptor.__set__)
+                      for descriptor in descriptors.values())
+    _slots[cls] = accessors, descriptors.get('validator')
+    return _slots[cls]
+
+
 class Field(BaseLogic):
     """ =======================================================================
         This is the base field object. You can create new custom fields
@@ -156,6 +188,13 @@ class Field(BaseLogic):
     def value_is_not_null(self):
         return self.value is not None and self.value is not self.empty
 
+    @property
+    def _tracked_value(self):
+        """ -> the value held by the field, compared by identity with the
+                value it was loaded with to tell whether the field changed
+        """
+        return self.value
+
     @property
     def name(self):
         """ -> (#str) full name of the field with the name of the table
@@ -275,6 +314,31 @@ class Field(BaseLogic):
 
         return cls
 
+    def _clone(self):
+        """ -> a copy of this field made by copying its attributes rather
+                than running :meth:__init__ as :meth:clear_copy does. Used to
+                clone the cleared prototype fields compiled by
+                :class:cargo.Model, the copy gets a validator of its own.
+        """
+        cls = self.__class__
+        field = cls.__new__(cls)
+        accessors, validator = _get_slots(cls)
+        for get, set_ in accessors:
+            try:
+                set_(field, get(self, cls))
+            except AttributeError:
+                pass
+        if cls.__dictoffset__:
+            field.__dict__.update(self.__dict__)
+        if validator is not None:
+            try:
+                vc = validator.__get__(field, cls)
+            except AttributeError:
+                vc = None
+            if vc is not None:
+                validator.__set__(field, vc.__class__(field))
+        return field
+
     __copy__ = copy
 
     def clear(self):
@@ -347,3 +347,8 @@ class Array(Field, ArrayLogic):
                                 minlen=self.minlen,
                                 maxlen=self.maxlen,
                                 **kwargs)
+
+    def _clone(self):
+        field = Field._clone(self)
+        field.type = self.type._clone()
+        return field
@@ -9,36 +9,42 @@
 """
 import re
 import copy
+import gzip
 import sqlparse
-from collections import OrderedDict
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, groupby, islice
 
 try:
     from ujson import dumps, loads
 except ImportError:
     from json import dumps, loads
 
-try:
-    from cnamedtuple import namedtuple
-except ImportError:
-    from collections import namedtuple
-
 import psycopg2
-from psycopg2.extensions import cursor as _cursor
+import psycopg2.extras
+from psycopg2.extensions import AsIs, cursor as _cursor
 
 from vital.cache import cached_property
+from vital.security import randhex
 from vital.tools.strings import camel_to_underscore
 from vital.tools.lists import grouped
 from vital.debug import prepr, preprX, line, logg
 
 from cargo.clients import *
-from cargo.cursors import CNamedTupleCursor, ModelCursor
+from cargo.cursors import CNamedTupleCursor, ModelCursor, make_record,\
+    materialize
+from cargo.etc.columns import ColumnArray
+from cargo.etc.copy import BinaryCopyIn, CopyIn, copy_to, encode_text,\
+    get_binary_encoder
+from cargo.etc.keyset import decode_token, encode_token
 from cargo.etc.types import *
 from cargo.exceptions import *
 from cargo.expressions import *
 from cargo.statements import *
 from cargo.relationships import *
 from cargo.relationships import _ForeignObject
-from cargo.fields import Field
+from cargo.fields import Field, SmallSerial
 
 
 __all__ = (
@@ -52,6 +58,10 @@ __all__ = (
 class ORM(object):
     table = None
     schema = None
+    #: Placeholder style queries are normalized to before they are executed,
+    #  one of |named|, |positional| or |None| to leave the parameter keys
+    #  generated by the expressions as they are.  :see::func:normalize_params
+    paramstyle = 'named'
 
     def __init__(self, client=None, cursor_factory=None, schema=None,
                  table=None, debug=False):
@@ -142,6 +152,14 @@ class ORM(object):
         self.schema = name
         return self
 
+    def set_paramstyle(self, paramstyle):
+        """ Changes the placeholder style queries are normalized to before
+            they are executed to @paramstyle, one of |named|, |positional|
+            or |None|
+        """
+        self.paramstyle = paramstyle
+        return self
+
     # Pickling and copying
 
     def __getstate__(self):
@@ -318,28 +336,58 @@ class ORM(object):
     remove = delete
 
     def upsert(self, *fields, conflict_field=None, conflict_action=None,
-               **kwargs):
+               update_fields=None, **kwargs):
         """ !! Postgres 9.5+ only !!
-            Updates @fields if they don't already exist, otherwise the
-            fields are inserted.
+            Inserts @fields if they don't already exist, otherwise the
+            fields are updated.
 
             @*fields: (:class:Field) to insert or update
             @conflict_field: (:class:Field|#list) the unique field which will
                 determine if a conflict exists. If none is given, Postgres
                 will decide based on unique fields and primary keys.
             @conflict_action: (:class:Query or :class:Clause) action
-                to perform when the conflict arises, defaults to |DO UPDATE|
+                to perform when the conflict arises, defaults to
+                |DO UPDATE SET field = EXCLUDED.field| for each of
+                @update_fields
+            @update_fields: (:class:Field|#list) fields to update with
+                their |EXCLUDED| values when the conflict arises, defaults
+                to @fields other than @conflict_field. Fields without
+                values are never updated. If there are none to update,
+                @conflict_field is set to itself so that the existing
+                record is still returned, or without a @conflict_field the
+                conflict action is |DO NOTHING|.
             @**kwargs: additional arguments to pass to :meth:insert
+
+            ..
+                m.upsert(m.uid, m.textfield, conflict_field=m.uid)
+            ..
+            |INSERT INTO foo (uid, textfield) VALUES (1, 'bar')|
+            |ON CONFLICT (uid) DO UPDATE SET textfield = EXCLUDED.textfield|
         """
-        conflict_action = conflict_action or Clause('DO UPDATE')
+        if isinstance(conflict_field, Field):
+            conflict_field = (conflict_field,)
+        if conflict_action is None:
+            conflict_names = {getattr(field, 'field_name', field)
+                              for field in conflict_field or ()}
+            updates = [field for field in (update_fields or fields)
+                       if isinstance(field, Field) and
+                       field.field_name not in conflict_names and
+                       field.value is not field.empty]
+            if not updates and conflict_field:
+                updates = [field for field in conflict_field
+                           if isinstance(field, Field)]
+            updates = [safe('%s = EXCLUDED.%s' % (field.field_name,
+                                                   field.field_name))
+                       for field in updates]
+            if updates:
+                conflict_action = Clause('DO UPDATE',
+                                         CommaClause('SET', *updates))
+            else:
+                conflict_action = Clause('DO NOTHING')
 
         if conflict_field:
-            try:
-                cls = CommaClause('CONFLICT', *conflict_field, wrap=True)
-            except TypeError:
-                cls = CommaClause('CONFLICT', conflict_field, wrap=True)
-            self.on(cls, use_field_name=True, join_with=' ')
-            self.state.add(conflict_action)
+            cls = CommaClause('CONFLICT', *conflict_field, wrap=True)
+            self.on(cls, conflict_action, use_field_name=True, join_with=' ')
         else:
             self.on(Clause('CONFLICT', conflict_action))
 
@@ -853,6 +901,45 @@ class ORM(object):
         self.limit((page * limit) - limit, limit)
         return self
 
+    def seek(self, fields, values=None, limit=25, reverse=False):
+        """ Tells the ORM to return @limit results following the row whose
+            @fields equal @values in the order of @fields. Unlike
+            :meth:page, which makes the server read and discard every row
+            before the |OFFSET|, the |WHERE| clause added here is answered
+            by the index on @fields, so deep pages are as fast as the
+            first. @fields should be unique and |NOT NULL| together.
+
+            |WHERE|, |ORDER BY| and |LIMIT| :class:Clause(s) are added to
+            the query :prop:state.
+
+            @fields: (#tuple) of :class:Field to order the results by
+            @values: (#tuple) of the values of @fields in the last seen row,
+                or |None| for the first page
+            @limit: #int max results to return
+            @reverse: (#bool) |True| to order the results descending
+
+            -> @self
+
+            ===================================================================
+            ``Usage Example``
+            ..
+                m = Model()
+                m.seek((m.created, m.uid), (last_created, last_uid), 50)
+                m.select()
+            ..
+            |WHERE (created, uid) > (%s, %s)         |
+            |ORDER BY created ASC, uid ASC LIMIT 50  |
+        """
+        if values is not None:
+            self.where(Expression(ValuesClause('', *fields),
+                                  '<' if reverse else '>',
+                                  ValuesClause('', *values)))
+        self.order_by(*(field.desc() if reverse else field.asc()
+                        for field in fields))
+        if limit:
+            self.limit(int(limit))
+        return self
+
     def having(self, *exps, **kwargs):
         """ Sets a |HAVING| :class:Clause in the query :prop:state
 
@@ -995,12 +1082,27 @@ class ORM(object):
         else:
             return results
 
-    def _prepend_search_path_to(self, query):
+    def _normalize_params(self, query, params):
+        """ Renames the placeholders in @query according to
+            :prop:paramstyle so that identically-shaped queries are sent to
+            the server as identical SQL.
+
+            -> (#tuple) |(query, params)|
+        """
+        if self.paramstyle is None or not isinstance(params, dict):
+            return query, params
+        return normalize_params(query,
+                                params,
+                                positional=self.paramstyle == 'positional')
+
+    def _set_search_path(self, conn):
+        """ Sets the search path of @conn to the locally defined schema.
+            The client only sends the |SET| when the search path differs
+            from the one last applied to the connection.
+        """
         search_path = self.db.get_search_paths(self.schema)
         if search_path:
-            return 'SET search_path TO %s; %s;' % (", ".join(search_path),
-                                                   query)
-        return query
+            conn.set_search_path(*search_path)
 
     def get_cursor(self, conn, *args, **kwargs):
         """ Gets a database cursor from @conn
@@ -1031,13 +1133,15 @@ class ORM(object):
         if conn is None:
             _conn = self.db.get()
         cursor = self.get_cursor(_conn)
-        #: Sets the search path to the locally defined schema
-        query = self._prepend_search_path_to(query)
+        query, params = self._normalize_params(query, params)
         #: For debug mode
         self.debug(cursor, query, params)
         try:
-            #: Executes the cursor
-            cursor.execute(query, params or tuple())
+            #: Sets the search path to the locally defined schema
+            self._set_search_path(_conn)
+            #: Executes the cursor, through a prepared statement if the
+            #  client's statement cache is enabled
+            _conn.execute(cursor, query, params)
         except Psycopg2QueryErrors as e:
             #: Rolls back the transaction in the event of a failure
             _conn.rollback()
@@ -1066,6 +1170,435 @@ class ORM(object):
             _conn.put()
         return cursor
 
+    def _execute_paged(self, execute, query, argslist, conn=None,
+                       cursor_factory=None, **kwargs):
+        """ Runs one of the paged :mod:psycopg2.extras execution helpers,
+            handling the connection exactly like :meth:execute
+        """
+        _conn = conn
+        if conn is None:
+            _conn = self.db.get()
+        if cursor_factory is None:
+            cursor = self.get_cursor(_conn)
+        else:
+            cursor = _conn.cursor(cursor_factory=cursor_factory)
+        #: For debug mode
+        self.debug(cursor, query, None)
+        try:
+            #: Sets the search path to the locally defined schema
+            self._set_search_path(_conn)
+            result = execute(cursor, query, argslist, **kwargs)
+            if not _conn.autocommit:
+                _conn.commit()
+        except Psycopg2QueryErrors as e:
+            #: Rolls back the transaction in the event of a failure
+            _conn.rollback()
+            if conn is None:
+                _conn.put()
+            raise QueryError(e.args[0].strip(),
+                             code=ERROR_CODES.EXECUTE,
+                             root=e)
+        except Exception:
+            #: The arguments could not be generated, i.e. a validation error
+            _conn.rollback()
+            if conn is None:
+                _conn.put()
+            raise
+        if conn is None:
+            _conn.put()
+        return result
+
+    def execute_values(self, query, argslist, template=None, page_size=100,
+                       fetch=False, conn=None):
+        """ Executes @query, which contains a single |VALUES %s|
+            placeholder, once per @page_size rows of @argslist with
+            :func:psycopg2.extras.execute_values. The query is only composed
+            once and every page is sent to the server as a single
+            multi-row statement.
+
+            @query: (#str) query string with a single |%s| placeholder
+                for the |VALUES| list
+            @argslist: (#iter) of #tuple or #list rows
+            @template: (#str) template each row is merged into, defaults
+                to |(%s, %s, ...)|
+            @page_size: (#int) number of rows to send in each statement
+            @fetch: (#bool) |True| to return the results of every page,
+                i.e. for |RETURNING| clauses
+            @conn: (:class:Postgres|:class:PostgresPoolConnection) if
+                a connection object is provided, it is your responsibility
+                to put the connection if it is a part of a pool.
+
+            -> #list of results of the :prop:_cursor_factory if @fetch
+                is |True|, otherwise |None|
+        """
+        return self._execute_paged(psycopg2.extras.execute_values,
+                                   query,
+                                   argslist,
+                                   conn=conn,
+                                   template=template,
+                                   page_size=page_size,
+                                   fetch=fetch)
+
+    def execute_batch(self, query, argslist, page_size=100, conn=None):
+        """ Executes @query once for every set of parameters in @argslist
+            with :func:psycopg2.extras.execute_batch, sending @page_size
+            statements to the server in each round trip.
+
+            @query: (#str) query string
+            @argslist: (#iter) of #tuple|#dict params referenced in @query
+                with |%s| or |%(name)s|
+            @page_size: (#int) number of statements to send in each round
+                trip
+            @conn: (:class:Postgres|:class:PostgresPoolConnection) if
+                a connection object is provided, it is your responsibility
+                to put the connection if it is a part of a pool.
+        """
+        self._execute_paged(psycopg2.extras.execute_batch,
+                            query,
+                            argslist,
+                            conn=conn,
+                            page_size=page_size)
+
+    def stream(self, query, params=None, buffer=100, withhold=False,
+               conn=None, reuse=False):
+        """ Executes @query with @params in a named, server-side cursor
+            (|DECLARE ... CURSOR|) and yields its results @buffer rows at a
+            time. Unlike :meth:execute, the result set is never pulled into
+            memory all at once, only the page currently being fetched.
+
+            If no @conn is given, the transaction the cursor lives in is
+            committed once the results are exhausted, or rolled back if the
+            consumer stops early, and the connection is put away.
+
+            @query: (#str) query string
+            @params: (#tuple|#dict|#list) of params referenced in @query
+                with |%s| or |%(name)s|
+            @buffer: (#int) number of rows to fetch from the server in each
+                round trip
+            @withhold: (#bool) |True| to declare the cursor |WITH HOLD| so
+                that it may outlive its transaction. Cursors are always
+                declared |WITH HOLD| when the client is in |autocommit| mode.
+            @conn: (:class:Postgres|:class:PostgresPoolConnection) if
+                a connection object is provided, it is your responsibility
+                to put the connection if it is a part of a pool and to end
+                the transaction.
+            @reuse: (#bool|#int) refills a ring of at least @reuse models
+                rather than copying the model for each row when the results
+                are models. :see::attr:ModelCursor.reuse
+
+            -> yields #list of up to @buffer results of the
+                :prop:_cursor_factory
+        """
+        pages = self._stream(query, params, buffer=buffer, withhold=withhold,
+                             conn=conn, reuse=reuse)
+        try:
+            for cursor, results in pages:
+                if results:
+                    yield results
+        finally:
+            pages.close()
+
+    def _stream(self, query, params=None, buffer=100, withhold=False,
+                conn=None, reuse=False, cursor_factory=None):
+        """ :see::meth:stream
+
+            @cursor_factory: cursor factory of the named cursor, rather
+                than the one returned by :meth:get_cursor
+
+            -> yields #tuple |(cursor, results)| for each page of results
+                and one last time with an empty #list of results once they
+                are exhausted
+        """
+        _conn = conn
+        if conn is None:
+            _conn = self.db.get()
+        name = 'cargo_%s' % randhex(12)
+        withhold = withhold or _conn.autocommit
+        if cursor_factory is None:
+            cursor = self.get_cursor(_conn, name, withhold=withhold)
+        else:
+            cursor = _conn.cursor(name, cursor_factory=cursor_factory,
+                                  withhold=withhold)
+        cursor.itersize = buffer
+        if reuse and isinstance(cursor, ModelCursor):
+            cursor.reuse = reuse
+        query, params = self._normalize_params(query, params)
+        #: For debug mode
+        self.debug(cursor, query, params)
+        try:
+            #: Sets the search path to the locally defined schema
+            self._set_search_path(_conn)
+            #: Declares the cursor
+            cursor.execute(query, params or tuple())
+            while True:
+                results = cursor.fetchmany(buffer)
+                yield cursor, results
+                if not results:
+                    break
+        except Psycopg2QueryErrors as e:
+            #: Rolls back the transaction in the event of a failure
+            _conn.rollback()
+            if conn is None:
+                _conn.put()
+            raise QueryError(e.args[0].strip(),
+                             code=ERROR_CODES.EXECUTE,
+                             root=e)
+        except GeneratorExit:
+            #: The consumer stopped iterating before the results were
+            #  exhausted
+            cursor.close()
+            if conn is None:
+                if not _conn.autocommit:
+                    _conn.rollback()
+                _conn.put()
+            raise
+        cursor.close()
+        if conn is None:
+            if not _conn.autocommit:
+                _conn.commit()
+            _conn.put()
+
+    def fetch_columns(self, query, params=None, chunk_size=10000,
+                      withhold=False, conn=None):
+        """ Executes @query with @params in a named, server-side cursor and
+            appends its results @chunk_size rows at a time to a typed
+            :class:numpy.ndarray for each column. No Python objects are
+            kept for the rows, only the arrays.
+
+            The array types are chosen from the column types:
+            |int16|, |int32| and |int64| for |SMALLINT|, |INT| and
+            |BIGINT| (incl. :class:UID), |float32| and |float64| for |REAL|
+            and |DOUBLE PRECISION|, |bool| for |BOOLEAN|, |datetime64| for
+            |DATE|, |TIMESTAMP| and |TIMESTAMPTZ| (in UTC) and |object| for
+            anything else. :see::class:cargo.etc.columns.ColumnArray for
+            how |NULL|s are stored.
+
+            @query: (#str) query string
+            @params: (#tuple|#dict|#list) of params referenced in @query
+                with |%s| or |%(name)s|
+            @chunk_size: (#int) number of rows to fetch from the server in
+                each round trip
+            @withhold: (#bool) :see::meth:stream
+            @conn: (:class:Postgres|:class:PostgresPoolConnection)
+                :see::meth:stream
+
+            -> (#OrderedDict) |{column name: numpy.ndarray}|
+        """
+        columns = None
+        for cursor, results in self._stream(query, params,
+                                            buffer=chunk_size,
+                                            withhold=withhold,
+                                            conn=conn,
+                                            cursor_factory=_cursor):
+            if columns is None:
+                columns = [ColumnArray(name, oid, capacity=chunk_size)
+                           for name, oid, *_ in cursor.description]
+            for column, values in zip(columns, zip(*results)):
+                column.extend(values)
+        return OrderedDict((column.name, column.to_array())
+                           for column in columns)
+
+    @staticmethod
+    def _get_binary_encoder(field, conn):
+        """ -> (#callable) packing the values of @field into the binary
+                |COPY| format. :see::func:cargo.etc.copy.get_binary_encoder
+        """
+        try:
+            oid = field.OID
+        except AttributeError:
+            raise TypeError('Binary COPY requires typed fields, got `%s`' %
+                            field)
+        if oid == ARRAY and hasattr(field, 'dimensions'):
+            return get_binary_encoder(field.type.OID, True, conn.connection)
+        if hasattr(field, 'factory') and \
+           field.type.OID not in category.KEYVALUE:
+            #: Encrypted fields are stored as the type of their factory
+            oid = field.factory.OID
+        return get_binary_encoder(oid, conn=conn.connection)
+
+    def _get_copy_encoders(self, columns, conn, binary=False):
+        """ -> (#list) of callables encoding the values of @columns to the
+                |COPY| text format, or packing them into the binary format
+                if @binary is |True|. :see::meth:copy_in
+        """
+        if binary:
+            return [self._get_binary_encoder(col, conn) for col in columns]
+
+        def encoder(oid):
+            return lambda value: encode_text(value, oid, conn.connection)
+        return [encoder(getattr(col, 'OID', None)) for col in columns]
+
+    def copy_in(self, rows, *columns, table=None, encoders=None,
+                chunk_size=8192, returning=False, binary=False, conn=None):
+        """ Bulk inserts @rows into @table with |COPY ... FROM STDIN|. Rows
+            are lazily encoded to the |COPY| text format as they are
+            streamed to the server, so @rows may be a generator of any
+            size.
+
+            @rows: (#iter) of #tuple or #list values ordered like @columns
+            @*columns: (:class:Field|#str) columns to copy the values of
+                @rows into
+            @table: (#str) name of the table to copy into, defaults to
+                :prop:table
+            @encoders: (#tuple) of callables receiving a value and returning
+                its |COPY| text, one per column.
+                Defaults to :func:cargo.etc.copy.encode_text. If @binary is
+                |True| these receive a #bytearray and a value and pack the
+                value into it, :see::func:cargo.etc.copy.get_binary_encoder
+            @chunk_size: (#int) number of bytes of rows to send to the
+                server at a time
+            @returning: (#bool) |True| to return the inserted records.
+                This requires the rows to be staged in a temporary table
+                and inserted from there with |INSERT ... RETURNING|, so
+                it is considerably slower than the default, which only
+                returns the number of rows copied.
+            @binary: (#bool) |True| to stream the rows in the binary |COPY|
+                format, which the server parses considerably faster than
+                text. @columns must be :class:Field objects whose |OID| is
+                understood by :func:cargo.etc.copy.get_binary_encoder
+            @conn: (:class:Postgres|:class:PostgresPoolConnection) if
+                a connection object is provided, it is your responsibility
+                to put the connection if it is a part of a pool and to end
+                the transaction.
+
+            -> (#int) number of rows copied, or #list of inserted records
+                of the :prop:_cursor_factory if @returning is |True|
+        """
+        table = table or self.table
+        names = ", ".join(getattr(col, 'field_name', col) for col in columns)
+        _conn = conn
+        if conn is None:
+            _conn = self.db.get()
+        try:
+            if encoders is None:
+                encoders = self._get_copy_encoders(columns, _conn, binary)
+        except TypeError:
+            if conn is None:
+                _conn.put()
+            raise
+        if binary:
+            copy_in = BinaryCopyIn(rows, encoders, chunk_size=chunk_size)
+            copy_from = "COPY %s (%s) FROM STDIN WITH (FORMAT binary)"
+        else:
+            copy_in = CopyIn(rows, encoders, chunk_size=chunk_size)
+            copy_from = "COPY %s (%s) FROM STDIN"
+        cursor = self.get_cursor(_conn)
+        try:
+            #: Sets the search path to the locally defined schema
+            self._set_search_path(_conn)
+            if not returning:
+                cursor.copy_expert(copy_from % (table, names),
+                                   copy_in,
+                                   size=chunk_size)
+                result = copy_in.rowcount
+            else:
+                #: Stages the rows in a temporary table without any of the
+                #  constraints of @table
+                staging = 'cargo_copy_%s' % randhex(12)
+                cursor.execute("CREATE TEMP TABLE %s AS SELECT %s FROM %s "
+                               "WITH NO DATA" % (staging, names, table))
+                cursor.copy_expert(copy_from % (staging, names),
+                                   copy_in,
+                                   size=chunk_size)
+                cursor.execute("INSERT INTO %s (%s) SELECT %s FROM %s "
+                               "RETURNING *" %
+                               (table, names, names, staging))
+                result = cursor.fetchall()
+                cursor.execute("DROP TABLE %s" % staging)
+        except Psycopg2QueryErrors as e:
+            #: Rolls back the transaction in the event of a failure
+            _conn.rollback()
+            if conn is None:
+                _conn.put()
+            raise QueryError(e.args[0].strip(),
+                             code=ERROR_CODES.EXECUTE,
+                             root=e)
+        except Exception:
+            _conn.rollback()
+            if conn is None:
+                _conn.put()
+            if copy_in.error is not None:
+                #: The rows could not be encoded
+                raise copy_in.error
+            raise
+        if conn is None:
+            if not _conn.autocommit:
+                _conn.commit()
+            _conn.put()
+        return result
+
+    def copy_out(self, fileobj, query, params=None, format='csv',
+                 header=False, compress=False, conn=None):
+        """ Writes the results of @query to @fileobj with |COPY (...) TO
+            STDOUT|. Rows are written to @fileobj as they arrive from the
+            server, so only one row is ever held in memory.
+
+            @fileobj: (#file-like) object with a |write| method, i.e. an
+                open file or |socket.makefile('wb')|. Text files receive
+                #str, anything else receives #bytes.
+            @query: (#str) query string
+            @params: (#tuple|#dict|#list) of params referenced in @query
+                with |%s| or |%(name)s|
+            @format: (#str) |csv|, |text| or |binary| |COPY| formats, or
+                |json| to write one JSON object per row and line, built by
+                the server with |row_to_json|
+            @header: (#bool) |True| to write a header line with the column
+                names, only available to the |csv| format
+            @compress: (#bool|#int) |True| or a compression level from |1|
+                to |9| to gzip the output on its way to @fileobj
+            @conn: (:class:Postgres|:class:PostgresPoolConnection) if
+                a connection object is provided, it is your responsibility
+                to put the connection if it is a part of a pool and to end
+                the transaction.
+
+            -> (#int) number of rows written
+        """
+        if format == 'json':
+            query = "SELECT %s FROM (%s) cargo_row" % (
+                F.row_to_json(safe('cargo_row')), query)
+        _conn = conn
+        if conn is None:
+            _conn = self.db.get()
+        cursor = self.get_cursor(_conn)
+        if compress:
+            fileobj = gzip.GzipFile(
+                fileobj=fileobj,
+                mode='wb',
+                compresslevel=9 if compress is True else compress)
+        try:
+            copy_query = copy_to(
+                cursor.mogrify(query, params).decode(),
+                format=format,
+                header=header)
+            #: For debug mode
+            self.debug(cursor, copy_query, None)
+            #: Sets the search path to the locally defined schema
+            self._set_search_path(_conn)
+            cursor.copy_expert(copy_query, fileobj)
+            result = cursor.rowcount
+        except Psycopg2QueryErrors as e:
+            #: Rolls back the transaction in the event of a failure
+            _conn.rollback()
+            if conn is None:
+                _conn.put()
+            raise QueryError(e.args[0].strip(),
+                             code=ERROR_CODES.EXECUTE,
+                             root=e)
+        except Exception:
+            _conn.rollback()
+            if conn is None:
+                _conn.put()
+            raise
+        finally:
+            if compress:
+                #: Writes the gzip trailer, leaving @fileobj open
+                fileobj.close()
+        if conn is None:
+            if not _conn.autocommit:
+                _conn.commit()
+            _conn.put()
+        return result
+
     def subquery(self, alias=None):
         """ Interprets the query :prop:state as a subquery. This query will
             not be executed and can be passed around like other
@@ -1480,6 +2013,21 @@ class Joins(object):
         raise ValueError('Could not find join field for ' +
                          'model `{}`'.format(a.__class__.__name__))
 
+    def with_reference(self, a, alias, parent_alias=None):
+        """ 'a' is a :class:ForeignKey field, the table it references is
+            joined as @alias. The foreign key is qualified with
+            @parent_alias, the alias of a table joined before this one,
+            so that references of references can be joined in turn.
+
+            -> (#tuple) |(table, ON clause)|
+        """
+        fkey = a.copy()
+        fkey.set_alias(table=parent_alias or getattr(self.orm, '_alias', None))
+        ref = a.ref.field.copy()
+        ref.set_alias(table=alias)
+        on = Expression(aliased(fkey), '=', aliased(ref))
+        return a.ref.model.table, Clause('ON', on)
+
     def with_expression(self, a, alias):
         """ 'a' was a :class:Expression object, so we use that
             as the ON clause and the left or right field's table
@@ -1562,6 +2110,47 @@ _adapted_fields = set()
 _registered_fields = set()
 
 
+class _ModelSchema(object):
+    """ The compiled layout of a :class:Model class. Built the first time a
+        model class is initialized so that subsequent instances clone
+        prototype :class:Field(s) rather than walking the class
+        hierarchy and rebuilding the layout.
+    """
+    __slots__ = ('table', 'fields', 'relationships', 'field_names',
+                 'primary_key', 'unique_indexes', 'best_indexes',
+                 'registered')
+
+    def __init__(self, model, fields):
+        """ @model: (:class:Model) the first compiled instance of the class
+            @fields: (#list) of all the :class:Field(s) added to @model,
+                in the order they were added
+        """
+        #: Default table name of the model class
+        self.table = camel_to_underscore(model.__class__.__name__)
+        #: Named, tabled and cleared prototype fields
+        self.fields = tuple(field.clear_copy() for field in fields)
+        #: (attribute, :class:Relationship) pairs forged on each instance
+        self.relationships = tuple((rel._owner_attr, rel)
+                                   for rel in model._relationships)
+        self.field_names = tuple(field.field_name for field in model.fields)
+        self.primary_key = self._names(model.primary_key)
+        self.unique_indexes = self._names(model.unique_indexes)
+        self.best_indexes = self._names(model.best_indexes)
+        #: Clients the field types were already registered with, held
+        #  weakly so that closed clients can be collected
+        self.registered = weakref.WeakSet()
+
+    __repr__ = preprX('table', 'field_names')
+
+    @staticmethod
+    def _names(fields):
+        if fields is None:
+            return None
+        if isinstance(fields, Field):
+            return fields.field_name
+        return tuple(field.field_name for field in fields)
+
+
 class Model(ORM):
     """ ===================================================================
         ``Usage Examples``
@@ -1625,6 +2214,9 @@ class Model(ORM):
     table = None
     ORDINAL = []  # The order of the fields within the DB
     PRIVATE = set()  # Fields which should not be exposed by :meth:for_json
+    #: |(alias, parent alias, foreign key name, model)| of the tables
+    #  joined by :meth:select_related
+    _related = ()
 
     def __init__(self, client=None, cursor_factory=None, naked=None,
                  schema=None, debug=False, **field_data):
@@ -1636,17 +2228,24 @@ class Model(ORM):
             =======================================================================
             :see::class:ORM
         """
+        compiled = self.__class__.__dict__.get('_compiled')
         super().__init__(client,
                          cursor_factory=cursor_factory,
                          schema=schema,
-                         table=self.table or camel_to_underscore(
-                            self.__class__.__name__),
+                         table=self.table or (
+                            compiled.table if compiled is not None else
+                            camel_to_underscore(self.__class__.__name__)),
                          debug=debug)
         self._fields = []
         self._relationships = []
         self._alias = None
         self._always_naked = naked or False
-        self._compile()
+        #: Defers decoding of the fields in query results,
+        #  :see::meth:set_lazy
+        self._lazy = False
+        #: Values of the fields as of the last load or save
+        self._loaded_values = {}
+        self._compile(compiled)
 
     __repr__ = preprX('field_names', keyless=True)
 
@@ -1716,10 +2315,20 @@ class Model(ORM):
         #     for items in mro[x].__dict__.items():
         #         yield items
 
-    def _compile(self):
+    def _compile(self, compiled=None):
         """ Sets :class:Field, :class:Relationship and :class:ForeignKey
             attributes
+
+            The first instance of a model class walks the class members and
+            stores the resulting layout in :class:_ModelSchema at
+            |_compiled| on the class. Later instances clone the prototype
+            fields of @compiled instead.
+
+            @compiled: (:class:_ModelSchema) compiled layout of the class
         """
+        if compiled is not None:
+            return self._compile_from(compiled)
+
         for field_name, field in self._getmembers():
             if isinstance(field, Field):
                 field = field.clear_copy()
@@ -1728,18 +2337,61 @@ class Model(ORM):
             elif isinstance(field, (ForeignKey, Relationship)):
                 field.forge(self, field_name)
 
+        fields = self._fields
         self._order_fields()
+        compiled = _ModelSchema(self, fields)
+        compiled.registered.add(self.db)
+        self.__class__._compiled = compiled
+
+    def _compile_from(self, compiled):
+        """ Sets the :class:Field and :class:Relationship attributes by
+            cloning the prototypes in @compiled (:class:_ModelSchema)
+        """
+        table = self.table
+        add_field = self._fields.append
+        for proto in compiled.fields:
+            field = proto._clone()
+            field.table = table
+            setattr(self, field.field_name, field)
+            add_field(field)
+
+        db = self.db
+        if db not in compiled.registered:
+            for field in self._fields:
+                self._register_field(field)
+            compiled.registered.add(db)
+
+        for field_name, relationship in compiled.relationships:
+            relationship.forge(self, field_name)
+
+        self._order_fields()
+
+    def _from_compiled(self, attr):
+        """ -> the fields of this model named at @attr in the compiled
+                class layout, or :attr:Field.empty if the fields of this
+                model differ from the class layout
+        """
+        compiled = self.__class__.__dict__.get('_compiled')
+        if compiled is None or \
+           len(self._fields) != len(compiled.field_names):
+            return Field.empty
+        names = getattr(compiled, attr)
+        if names is None:
+            return None
+        if isinstance(names, str):
+            return self.__getattribute__(names)
+        return tuple(map(self.__getattribute__, names))
 
     def _make_nt(self):
         """ Makes a :class:namedtuple object with :prop:field names
             as its field names, and stores it in self.ModelNameRecord
             i.e., if your model is named Users, self.UsersRecord
         """
-        cname = self.__class__.__name__
+        cname = self.__class__.__name__ + 'Record'
         if not hasattr(self, cname):
             setattr(self,
-                    cname + 'Record',
-                    namedtuple(cname + 'Record', self.field_names))
+                    cname,
+                    make_record(self.field_names, cname, rename=False))
 
     def naked(self):
         """ Causes the ORM to return the default cursor factory as results
@@ -1748,6 +2400,25 @@ class Model(ORM):
         self._naked = True
         return self
 
+    def set_lazy(self, lazy=True):
+        """ Causes the models returned by queries to keep the raw column
+            values and decode each field the first time it is accessed
+            rather than when the row is fetched. This saves the casting
+            of columns which are selected but never read.
+
+            @lazy: (#bool) |False| to decode every column on fetch again
+        """
+        self._lazy = lazy
+        return self
+
+    def materialize(self):
+        """ Decodes the values of the fields in the model which were
+            deferred by :meth:set_lazy
+        """
+        for field in self._fields:
+            materialize(field)
+        return self
+
     def new(self, **kwargs):
         """ Causes the ORM to create an exact copy of this model and reset
             this  model. Calling this will NOT add the new record to the
@@ -2064,6 +2735,9 @@ class Model(ORM):
     @cached_property
     def unique_indexes(self):
         """ -> (#tuple) of all unique indexes within the model """
+        unique_indexes = self._from_compiled('unique_indexes')
+        if unique_indexes is not Field.empty:
+            return unique_indexes
         return tuple(field for field in self.indexes if field.unique)
 
     @cached_property
@@ -2076,6 +2750,9 @@ class Model(ORM):
         """ -> the model's primary key as :class:Field or
                 #tuple of :class:Field if the primary key is spanned
         """
+        primary_key = self._from_compiled('primary_key')
+        if primary_key is not Field.empty:
+            return primary_key
         primaries = tuple(field for field in self.fields if field.primary)
         if len(primaries) == 1:
             return primaries[0]
@@ -2088,6 +2765,9 @@ class Model(ORM):
         """ -> (#tuple) of best indexes in the model in order, first best and
                 worst last
         """
+        best_indexes = self._from_compiled('best_indexes')
+        if best_indexes is not Field.empty:
+            return best_indexes
         indexes = []
         add_index = indexes.append
         if self.primary_key is not None:
@@ -2220,9 +2900,34 @@ class Model(ORM):
             relationship.clear()
         return self
 
+    @property
+    def changed_fields(self):
+        """ -> (#tuple) of the :class:Field(s) which were assigned values
+                since the model was last loaded from or saved to the DB.
+                Changes made to values in place, i.e. appending to an
+                :class:Array, are not tracked unless the value is assigned
+                to the field again.
+        """
+        loaded = self._loaded_values
+        empty = Field.empty
+        return tuple(field for field in self.fields
+                     if field.value is not empty and
+                     (field.field_name not in loaded or
+                      field._tracked_value is not loaded[field.field_name]))
+
+    def reset_changed(self):
+        """ Marks the current values of the fields as unchanged, i.e. as
+            they are in the DB. This is done automatically when records
+            are loaded into the model.
+        """
+        self._loaded_values = {field.field_name: field._tracked_value
+                               for field in self.fields}
+        return self
+
     def reset(self, *args, **kwargs):
         """ :see::meth:ORM.reset """
         self._alias = None
+        self.__dict__.pop('_related', None)
         return super().reset(*args, **kwargs)
 
     def clear(self):
@@ -2232,6 +2937,7 @@ class Model(ORM):
         self.reset()
         self.reset_fields()
         self.reset_relationships()
+        self._loaded_values = {}
         return self
 
     def _is_naked(self):
@@ -2294,19 +3000,682 @@ class Model(ORM):
 
     __call__ = add
 
+    def copy_in(self, rows, *fields, chunk_size=8192, returning=False,
+                binary=False, conn=None):
+        """ Bulk inserts @rows into the model's table with |COPY ... FROM
+            STDIN| without affecting the current model. Each value is
+            given to a copy of its field first, so it is cast and adapted
+            exactly as it would be by :meth:add.
+
+            @rows: (#iter) of #tuple or #list values ordered like @fields,
+                or #dict(s) of |field_name: value| pairs. Only the fields
+                present in a #dict are copied, so those missing from it
+                take their server defaults. Consecutive #dict(s) with the
+                same fields share a |COPY| statement.
+            @*fields: (:class:Field) fields to copy the values of @rows
+                into, defaults to all of the fields in the model in the
+                order of :attr:ORDINAL
+            @chunk_size: (#int) number of bytes of rows to send to the
+                server at a time
+            @returning: (#bool) |True| to return the inserted models rather
+                than the number of rows copied. :see::meth:ORM.copy_in
+            @binary: (#bool) |True| to stream the rows in the binary |COPY|
+                format. :see::meth:ORM.copy_in
+            @conn: (:class:Postgres|:class:PostgresPoolConnection)
+                :see::meth:ORM.copy_in
+
+            -> (#int) number of rows copied, or #list of the inserted models
+                if @returning is |True|
+            ..
+                Model.copy_in(((1, 'foo'), (2, 'bar')))
+                # COPY my_model (f1, f2) FROM STDIN
+                Model.copy_in({'f1': x} for x in range(100000))
+            ..
+        """
+        fields = fields or self.fields
+        all_names = tuple(field.field_name for field in fields)
+
+        def get_names(row):
+            if isinstance(row, dict):
+                return tuple(name for name in all_names if name in row) or \
+                    all_names
+            return all_names
+
+        _conn = conn
+        if conn is None:
+            _conn = self.db.get()
+        result = [] if returning else 0
+        try:
+            for names, group in groupby(rows, get_names):
+                row_fields = [field for field in fields
+                              if field.field_name in names]
+
+                def get_values(row):
+                    if isinstance(row, dict):
+                        return tuple(row.get(name) for name in names)
+                    return row
+
+                result += super().copy_in(map(get_values, group),
+                                          *row_fields,
+                                          table=self.table,
+                                          chunk_size=chunk_size,
+                                          returning=returning,
+                                          binary=binary,
+                                          conn=_conn)
+        except Exception:
+            if conn is None:
+                _conn.put()
+            raise
+        if conn is None:
+            if not _conn.autocommit:
+                _conn.commit()
+            _conn.put()
+        return result
+
+    def copy_out(self, fileobj, *fields, format='csv', header=False,
+                 compress=False, conn=None):
+        """ Selects @fields, or every field in the model, and writes the
+            results to @fileobj with |COPY (...) TO STDOUT| rather than
+            fetching them as models. Respects the |WHERE|, |ORDER BY| and
+            |LIMIT| clauses within the query state.
+            :see::meth:ORM.copy_out
+
+            @fileobj: (#file-like) object with a |write| method
+            @*fields: (:class:Field) fields to select
+            @format: (#str) |csv|, |text|, |binary| or |json|
+            @header: (#bool) |True| to write a header line with the column
+                names, only available to the |csv| format
+            @compress: (#bool|#int) |True| or a compression level to gzip
+                the output
+            @conn: (:class:Postgres|:class:PostgresPoolConnection)
+                :see::meth:ORM.copy_out
+
+            -> (#int) number of rows written
+            ..
+                with open('my_model.jsonl.gz', 'wb') as f:
+                    Model.where(Model.f1 > 10).copy_out(f, format='json',
+                                                        compress=True)
+            ..
+        """
+        q = super().dry().select(*fields)
+        try:
+            return super().copy_out(fileobj, q.query, q.params,
+                                    format=format,
+                                    header=header,
+                                    compress=compress,
+                                    conn=conn)
+        finally:
+            self.reset()
+
+    def _get_row_values(self, rows, fields):
+        """ -> yields #list of the values of each row in @rows ordered like
+                @fields, :prop:Field.empty where a value is missing
+
+            @rows: (#iter) of #tuple or #list values ordered like @fields,
+                #dict(s) of |field_name: value| pairs or :class:Model(s)
+        """
+        names = [field.field_name for field in fields]
+        empty = Field.empty
+        for row in rows:
+            if isinstance(row, Model):
+                yield [getattr(row, name).value for name in names]
+            elif isinstance(row, dict):
+                yield [row.get(name, empty) for name in names]
+            else:
+                yield row
+
+    def _group_row_values(self, rows, fields):
+        """ -> yields #tuple(s) of |(fields, rows)| for each run of
+                consecutive rows in @rows with values for the same @fields,
+                where |rows| yields #list(s) of only those values
+
+            @rows: :see::meth:_get_row_values
+        """
+        empty = Field.empty
+
+        def get_names(values):
+            return tuple(field.field_name
+                         for field, value in zip(fields, values)
+                         if value is not empty) or None
+
+        for names, group in groupby(self._get_row_values(rows, fields),
+                                    get_names):
+            if names is None:
+                #: Rows without any values are inserted as they were given
+                yield fields, group
+                continue
+            yield (
+                [field for field in fields if field.field_name in names],
+                ([value for value in values if value is not empty]
+                 for values in group))
+
+    def _cast_rows(self, rows, fields, should, missing):
+        """ Casts and validates the values of @rows with copies of their
+            fields, exactly as :meth:insert and :meth:update would.
+
+            @rows: :see::meth:_get_row_values
+            @fields: (:class:Field) fields the values belong to
+            @should: (#str) name of the :class:Field method which validates
+                the field and decides whether or not it has a value,
+                i.e. |_should_insert|
+            @missing: (#callable) receiving the field and returning the
+                parameter to use in place of an empty value
+
+            -> yields #list of adapted row parameters
+        """
+        fields = [field.clear_copy() for field in fields]
+        empty = Field.empty
+        for row in self._get_row_values(rows, fields):
+            values = []
+            add_value = values.append
+            for field, value in zip(fields, row):
+                field.value = empty
+                if value is not empty:
+                    field(value)
+                if getattr(field, should)():
+                    add_value(field.value)
+                else:
+                    add_value(missing(field))
+            yield values
+
+    def insert_many(self, rows, *fields, page_size=100, returning=False,
+                    conn=None):
+        """ Inserts @rows into the model's table without affecting the
+            current model. The |INSERT| is composed once and @page_size
+            rows at a time are sent to the server as a single multi-row
+            statement with :meth:execute_values. Values are cast and
+            validated by copies of their fields and empty values are
+            inserted as |DEFAULT|.
+
+            @rows: (#iter) of #tuple or #list values ordered like @fields,
+                #dict(s) of |field_name: value| pairs or :class:Model(s)
+            @*fields: (:class:Field) fields to insert the values of @rows
+                into, defaults to all of the fields in the model in the
+                order of :attr:ORDINAL
+            @page_size: (#int) number of rows to send in each statement
+            @returning: (#bool) |True| to return the inserted records in
+                the order of @rows
+            @conn: (:class:Postgres|:class:PostgresPoolConnection)
+                :see::meth:execute_values
+
+            -> (#int) number of rows inserted, or #list of inserted models
+                if @returning is |True| and :prop:_naked is |False|,
+                otherwise #list of :prop:_cursor_factory
+            ..
+                Model.insert_many([{'f1': 1, 'f2': 2}, {'f1': 3}])
+                # INSERT INTO my_model (f1, f2) VALUES (1, 2), (3, DEFAULT)
+            ..
+        """
+        fields = fields or self.fields
+        query = "INSERT INTO %s (%s) VALUES %%s" % (
+            self.table, ", ".join(field.field_name for field in fields))
+        if returning:
+            query += " RETURNING *"
+        rowcount = 0
+
+        def count(rows):
+            nonlocal rowcount
+            for row in rows:
+                rowcount += 1
+                yield row
+        default = AsIs('DEFAULT')
+        result = self.execute_values(
+            query,
+            count(self._cast_rows(rows,
+                                  fields,
+                                  '_should_insert',
+                                  lambda field: default)),
+            page_size=page_size,
+            fetch=returning,
+            conn=conn)
+        return result if returning else rowcount
+
+    def _get_bulk_keys(self):
+        """ -> (#tuple) of the :class:Field(s) which identify records in
+                bulk updates, the primary key or otherwise the first unique
+                field
+
+            :raises:|ORMIndexError| if the model has neither
+        """
+        keys = self.primary_key
+        if keys is None:
+            try:
+                keys = self.unique_fields[0]
+            except IndexError:
+                raise ORMIndexError('Bulk updates require a primary key '
+                                    'or unique field in the model.')
+        return keys if isinstance(keys, tuple) else (keys,)
+
+    def update_many(self, rows, *fields, page_size=100, conn=None):
+        """ Updates @fields in the records identified by the primary key,
+            or otherwise the first unique field, of each of @rows without
+            affecting the current model. The |UPDATE| is composed once and
+            @page_size statements at a time are sent to the server in a
+            single round trip with :meth:execute_batch. Values are cast
+            and validated by copies of their fields and columns whose
+            values are empty are left unchanged.
+
+            @rows: (#iter) of #dict(s) of |field_name: value| pairs or
+                :class:Model(s) containing values for the key field(s) and
+                @fields. Only the :prop:changed_fields of models are
+                updated and the models are marked unchanged afterwards.
+            @*fields: (:class:Field) fields to update, defaults to all of
+                the fields in the model other than the key field(s)
+            @page_size: (#int) number of statements to send in each round
+                trip
+            @conn: (:class:Postgres|:class:PostgresPoolConnection)
+                :see::meth:execute_batch
+            ..
+                Model.update_many([{'uid': 1, 'f1': 2}, {'uid': 2, 'f1': 4}],
+                                  Model.f1)
+                # UPDATE my_model SET f1 = 2 WHERE uid = 1;
+                # UPDATE my_model SET f1 = 4 WHERE uid = 2
+            ..
+        """
+        keys = self._get_bulk_keys()
+        key_names = {key.field_name for key in keys}
+        fields = fields or [field for field in self.fields
+                            if field.field_name not in key_names]
+        query = "UPDATE %s SET %s WHERE %s" % (
+            self.table,
+            ", ".join("%s = %%s" % field.field_name for field in fields),
+            " AND ".join("%s = %%s" % key.field_name for key in keys))
+
+        def missing(field):
+            if field.field_name in key_names:
+                raise ORMIndexError('A value for the key field `%s` is '
+                                    'required in each row.' %
+                                    field.field_name)
+            #: Leaves the column as it is
+            return AsIs(field.field_name)
+        models = []
+
+        def get_changes(row):
+            if not isinstance(row, Model):
+                return row
+            models.append(row)
+            changes = {key: getattr(row, key).value for key in key_names}
+            changes.update((field.field_name, field.value)
+                           for field in row.changed_fields)
+            return changes
+        nkeys = len(keys)
+        rows = self._cast_rows(map(get_changes, rows),
+                               keys + tuple(fields),
+                               '_should_update',
+                               missing)
+        #: Moves the key values to the WHERE clause
+        rows = (values[nkeys:] + values[:nkeys] for values in rows)
+        self.execute_batch(query,
+                           rows,
+                           page_size=page_size,
+                           conn=conn)
+        for model in models:
+            model.reset_changed()
+
+    def bulk_update(self, rows, *fields, chunk_size=1000, workers=1,
+                    conn=None):
+        """ Updates @fields in the records identified by the primary key,
+            or otherwise the first unique field, of each of @rows without
+            affecting the current model. Each chunk of @chunk_size rows is
+            written with a single set-based |UPDATE ... FROM (VALUES ...)|
+            statement whose values are cast to the |type_name| of their
+            fields.
+
+            @rows: (#iter) of :class:Model(s) or #dict(s) of
+                |field_name: value| pairs containing values for the key
+                field(s) and @fields. Models are marked unchanged once
+                their chunk is updated.
+            @*fields: (:class:Field) fields to update, defaults to the
+                fields other than the key field(s) which are set in any
+                of the #dict(s) or :prop:changed_fields of the models of
+                each chunk
+            @chunk_size: (#int) number of rows to update in each statement
+            @workers: (#int) number of chunks to update concurrently. Only
+                used when the client is a :class:PostgresPool and no @conn
+                is given, in which case each chunk is committed in its own
+                transaction on its own connection.
+            @conn: (:class:Postgres|:class:PostgresPoolConnection) if
+                a connection object is provided, it is your responsibility
+                to put the connection if it is a part of a pool.
+
+            -> (#list) of the number of rows updated by each chunk
+            ..
+                Model.bulk_update(models, Model.f1, chunk_size=2)
+                # UPDATE my_model SET f1 = v.f1
+                # FROM (VALUES (1::bigint, 2::integer),
+                #              (2::bigint, 4::integer)) AS v (uid, f1)
+                # WHERE my_model.uid = v.uid
+            ..
+        """
+        keys = self._get_bulk_keys()
+        key_names = {key.field_name for key in keys}
+        where = " AND ".join("%s.%s = v.%s" % (self.table,
+                                                key.field_name,
+                                                key.field_name)
+                             for key in keys)
+
+        def get_fields(chunk):
+            changed = set()
+            for row in chunk:
+                if isinstance(row, Model):
+                    changed.update(field.field_name
+                                   for field in row.changed_fields)
+                else:
+                    changed.update(row)
+            return [field for field in self.fields
+                    if field.field_name in changed and
+                    field.field_name not in key_names]
+
+        def missing(field):
+            raise ValueError('A value for the field `%s` is required in '
+                             'each row of a bulk update.' % field.field_name)
+        rows = iter(rows)
+
+        def chunks():
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                yield chunk
+
+        def update(chunk):
+            _fields = fields or get_fields(chunk)
+            if not _fields:
+                return 0
+            columns = keys + tuple(_fields)
+            template = "(%s)" % ", ".join("%%s::%s" % field.type_name
+                                          for field in columns)
+            query = "UPDATE %s SET %s FROM (VALUES %s) AS v (%s) WHERE %s" % (
+                self.table,
+                ", ".join("%s = v.%s" % (field.field_name, field.field_name)
+                          for field in _fields),
+                ", ".join([template] * len(chunk)),
+                ", ".join(field.field_name for field in columns),
+                where)
+            params = []
+            for values in self._cast_rows(chunk,
+                                          columns,
+                                          '_should_update',
+                                          missing):
+                params.extend(values)
+            rowcount = self.execute(query, params, conn=conn).rowcount
+            for row in chunk:
+                if isinstance(row, Model):
+                    row.reset_changed()
+            return rowcount
+
+        if workers > 1 and conn is None and isinstance(self.db, PostgresPool):
+            #: Chunks are read from @rows only as workers free up
+            results, pending = [], deque()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for chunk in chunks():
+                    if len(pending) >= workers * 2:
+                        results.append(pending.popleft().result())
+                    pending.append(executor.submit(update, chunk))
+                results.extend(future.result() for future in pending)
+            return results
+        return list(map(update, chunks()))
+
+    def bulk_upsert(self, rows, *fields, conflict_field=None,
+                    update_fields=None, chunk_size=1000,
+                    copy_threshold=10000, conn=None):
+        """ !! Postgres 9.5+ only !!
+            Inserts @rows into the model's table, updating the records
+            which already exist, without affecting the current model.
+
+            Up to @copy_threshold rows are sent @chunk_size at a time as
+            multi-row |INSERT ... ON CONFLICT (...) DO UPDATE| statements.
+            Larger inputs are streamed into a temporary table with |COPY|
+            and merged into the table with one
+            |INSERT ... SELECT ... ON CONFLICT| per group of rows. Either
+            way the upsert runs in one transaction, which is committed
+            unless @conn is given. Clients in |autocommit| mode are sent
+            an explicit |BEGIN| and |COMMIT|.
+
+            Fields missing from a #dict, or empty in a :class:Model, are
+            neither inserted nor updated, so new records take their server
+            defaults and existing records keep their values. Consecutive
+            rows with the same fields are upserted together as a group.
+
+            Postgres refuses to update the same record twice in one
+            statement, so the conflict values of @rows must be unique
+            within each chunk, and within each group of rows when they are
+            staged with |COPY|.
+
+            @rows: (#iter) of #tuple or #list values ordered like @fields,
+                #dict(s) of |field_name: value| pairs or :class:Model(s)
+            @*fields: (:class:Field) fields to insert the values of @rows
+                into, defaults to all of the fields in the model in the
+                order of :attr:ORDINAL
+            @conflict_field: (:class:Field|#tuple) the unique field(s)
+                which determine whether a record already exists, defaults
+                to the primary key or otherwise the first unique field
+            @update_fields: (#tuple) of :class:Field(s) to update when a
+                record already exists, defaults to all of @fields other
+                than @conflict_field. If empty, existing records are left
+                as they are with |DO NOTHING|.
+            @chunk_size: (#int) number of rows to send in each statement
+            @copy_threshold: (#int) number of rows at which the rows are
+                staged with |COPY| instead, |None| to never use |COPY|
+            @conn: (:class:Postgres|:class:PostgresPoolConnection) if
+                a connection object is provided, it is your responsibility
+                to put the connection if it is a part of a pool and to end
+                the transaction.
+
+            -> (#tuple) |(inserted, updated)| numbers of records
+            ..
+                Model.bulk_upsert([{'uid': 1, 'f1': 2}, {'uid': 2, 'f1': 4}])
+                # WITH upserted AS (
+                #   INSERT INTO my_model (uid, f1) VALUES (1, 2), (2, 4)
+                #   ON CONFLICT (uid) DO UPDATE SET f1 = EXCLUDED.f1
+                #   RETURNING xmax = 0 AS inserted)
+                # SELECT count(*) FILTER (WHERE inserted),
+                #        count(*) FILTER (WHERE NOT inserted)
+                # FROM upserted
+            ..
+        """
+        fields = fields or self.fields
+        if conflict_field is None:
+            conflict_field = self._get_bulk_keys()
+        elif not isinstance(conflict_field, (tuple, list)):
+            conflict_field = (conflict_field,)
+        conflict_names = {field.field_name for field in conflict_field}
+        if update_fields is not None:
+            update_names = {field.field_name for field in update_fields}
+
+        def get_query(fields):
+            names = [field.field_name for field in fields]
+            if update_fields is None:
+                updates = [name for name in names
+                           if name not in conflict_names]
+            else:
+                updates = [name for name in names if name in update_names]
+            if updates:
+                action = "DO UPDATE SET %s" % ", ".join(
+                    "%s = EXCLUDED.%s" % (name, name) for name in updates)
+            else:
+                action = "DO NOTHING"
+            #: Inserted records are the only ones without a deleting or
+            #  locking transaction
+            return ("WITH upserted AS (INSERT INTO %s (%s) %%s "
+                    "ON CONFLICT (%s) %s RETURNING xmax = 0 AS inserted) "
+                    "SELECT count(*) FILTER (WHERE inserted), "
+                    "count(*) FILTER (WHERE NOT inserted) "
+                    "FROM upserted") % (
+                self.table,
+                ", ".join(names),
+                ", ".join(field.field_name for field in conflict_field),
+                action), ", ".join(names)
+
+        rows = iter(rows)
+        head = []
+        if copy_threshold is not None:
+            head = list(islice(rows, copy_threshold))
+        use_copy = copy_threshold is not None and len(head) >= copy_threshold
+        _conn = conn
+        if conn is None:
+            _conn = self.db.get()
+        autocommit = _conn.autocommit
+        cursor = _conn.cursor(cursor_factory=_cursor)
+        staging = None
+        inserted, updated = 0, 0
+        try:
+            self._set_search_path(_conn)
+            if autocommit:
+                cursor.execute('BEGIN')
+            if use_copy:
+                #: Stages the rows in a temporary table without any of the
+                #  constraints of the table
+                staging = 'cargo_upsert_%s' % randhex(12)
+                cursor.execute("CREATE TEMP TABLE %s AS SELECT %s FROM %s "
+                               "WITH NO DATA" % (
+                                    staging,
+                                    ", ".join(field.field_name
+                                              for field in fields),
+                                    self.table))
+            for group_fields, group in self._group_row_values(
+                    chain(head, rows), fields):
+                query, names = get_query(group_fields)
+                if use_copy:
+                    super().copy_in(group,
+                                    *group_fields,
+                                    table=staging,
+                                    conn=_conn)
+                    query %= "SELECT %s FROM %s" % (names, staging)
+                    #: For debug mode
+                    self.debug(cursor, query, None)
+                    cursor.execute(query)
+                    counts = [cursor.fetchone()]
+                    cursor.execute("TRUNCATE %s" % staging)
+                else:
+                    query %= "VALUES %s"
+                    self.debug(cursor, query, None)
+                    default = AsIs('DEFAULT')
+                    counts = psycopg2.extras.execute_values(
+                        cursor,
+                        query,
+                        self._cast_rows(group,
+                                        group_fields,
+                                        '_should_insert',
+                                        lambda field: default),
+                        page_size=chunk_size,
+                        fetch=True)
+                inserted += sum(count for count, _ in counts)
+                updated += sum(count for _, count in counts)
+            if autocommit:
+                cursor.execute('COMMIT')
+        except Exception as e:
+            #: Rolls back the transaction in the event of a failure
+            if autocommit:
+                cursor.execute('ROLLBACK')
+            _conn.rollback()
+            if isinstance(e, Psycopg2QueryErrors):
+                raise QueryError(e.args[0].strip(),
+                                 code=ERROR_CODES.EXECUTE,
+                                 root=e)
+            raise
+        finally:
+            if staging is not None:
+                #: Temporary tables last until the session ends unless the
+                #  transaction which created them is rolled back
+                cursor.execute("DROP TABLE IF EXISTS %s" % staging)
+            if conn is None:
+                if not autocommit:
+                    _conn.commit()
+                _conn.put()
+        return inserted, updated
+
+    def _get_copy_encoders(self, fields, conn, binary=False):
+        """ -> (#list) of callables which cast values with a copy of their
+                field and encode them to the |COPY| text format, or pack
+                them into the binary format if @binary is |True|
+        """
+        def encoder(field):
+            field = field.clear_copy()
+
+            def encode(value):
+                field.value = field.empty
+                field(value)
+                if field.value is field.empty:
+                    return encode_text(None)
+                return encode_text(field.value, field.OID, conn.connection)
+            return encode
+
+        def binary_encoder(field):
+            pack = self._get_binary_encoder(field, conn)
+            field = field.clear_copy()
+
+            def encode(buf, value):
+                field.value = field.empty
+                field(value)
+                pack(buf, None if field.value is field.empty else field.value)
+            return encode
+        return list(map(binary_encoder if binary else encoder, fields))
+
+    def _get_conflict_fields(self):
+        """ -> (#tuple) of the unique :class:Field(s) with values which
+                identify the record in the current model, the primary key
+                or otherwise the first unique index, |None| if there are
+                none
+        """
+        if self.best_unique_index is None:
+            return None
+        _zero = {0, 0.0}
+
+        def indexable(index):
+            return (index.value or index.value in _zero) and index.validate()
+
+        keys = self.primary_key
+        if keys is not None:
+            keys = keys if isinstance(keys, tuple) else (keys,)
+            if all(map(indexable, keys)):
+                return keys
+        for index in self.unique_indexes:
+            if indexable(index):
+                return (index,)
+
+    def _has_required_values(self):
+        """ -> (#bool) |True| if the model holds a value for every
+                |NOT NULL| field which has no default
+        """
+        for field in self.fields:
+            if (field.not_null or field.primary) and \
+               field.default is None and \
+               not isinstance(field, SmallSerial) and \
+               field.value is field.empty:
+                return False
+        return True
+
     def save(self, *fields, **kwargs):
-        """ Inserts a single record into the DB if it doesn't already exist
-            and a unique key is not empty, otherwise updates the record in
-            the DB with the current model values
+        """ Inserts a single record into the DB if it doesn't already exist,
+            otherwise updates the record in the DB with the current model
+            values.
+
+            When a unique key is not empty and the model holds values for
+            every |NOT NULL| field without a default, this is a single
+            |INSERT ... ON CONFLICT (unique key) DO UPDATE ... RETURNING|
+            round trip, :see::meth:upsert. When the model only holds some
+            of the fields of its record, the record is updated if it
+            exists. Otherwise the record is simply inserted.
 
             @*fields: optionally only save specified :class:Field objects
-                during updates
+                during updates, defaults to the :prop:changed_fields
 
             -> self
         """
-        best_index = self.best_unique_index
-        if best_index is not None:
-            exists = self.copy().reset_dry().naked().where(best_index).get()
+        conflict_field = self._get_conflict_fields()
+        if conflict_field is not None:
+            if self._has_required_values():
+                #: UPSERT
+                update_fields = fields or self.changed_fields or \
+                    conflict_field
+                return self.one().upsert(*self.fields,
+                                         conflict_field=conflict_field,
+                                         update_fields=update_fields,
+                                         **kwargs)
+            #: A partial model can't be proposed for insertion
+            exists = self.copy().reset_dry().naked().where(
+                *(field.eq(field.value) for field in conflict_field)).get()
             if exists:
                 #: UPDATE
                 return self.one().update(*fields, **kwargs)
@@ -2336,8 +3705,71 @@ class Model(ORM):
         """
         if not self.state.has('WHERE'):
             self.where(self.best_available_index or True)
+        if self._related:
+            fields = tuple(fields or self.fields) + self._related_columns()
         return super().select(*fields, **kwargs)
 
+    def select_related(self, *names):
+        """ |LEFT JOIN|s the tables referenced by the :class:ForeignKey(s)
+            at @names so that the referenced records are selected in the
+            same query as the model rather than in one more query per
+            result. The referenced models are hydrated from each row and
+            attached to the foreign keys of the resulting models, where
+            they are found at |ref.model| and returned by |pull()|.
+            References of references are joined with dotted paths.
+
+            @*names: (#str) names of foreign keys in this model, or paths
+                to foreign keys in the referenced models, i.e.
+                |'author.company'|
+
+            -> @self
+            ..
+                posts = Posts().select_related('author.company')
+                posts = posts.where(True).select()
+                posts[0].author.pull()  # No query
+                posts[0].author.ref.model.company.ref.model  # No query
+            ..
+            |SELECT posts.uid, ..., _author.uid AS "_author.uid", ...    |
+            |FROM posts                                                 |
+            |LEFT JOIN users _author ON posts.author = _author.uid       |
+            |LEFT JOIN companies _author__company                        |
+            |  ON _author.company = _author__company.uid                 |
+        """
+        related = list(self._related)
+        aliases = {alias for alias, *_ in related}
+        for name in names:
+            owner, parent, path = self, None, []
+            for attr in name.split('.'):
+                path.append(attr)
+                fkey = getattr(owner, attr, None)
+                if getattr(fkey, 'ref', None) is None:
+                    raise ValueError('`%s` is not a foreign key of %s' %
+                                     (attr, owner.__class__.__name__))
+                alias = '_' + '__'.join(path)
+                if alias not in aliases:
+                    table, on = self._join.with_reference(fkey, alias, parent)
+                    self.state.add(Clause('LEFT JOIN',
+                                          safe(table, alias=alias),
+                                          on))
+                    related.append((alias, parent, attr, fkey.ref.model))
+                    aliases.add(alias)
+                owner, parent = fkey.ref.model, alias
+        self._related = tuple(related)
+        return self
+
+    def _related_columns(self):
+        """ -> (#tuple) of the columns of the tables joined by
+                :meth:select_related labelled |alias.field_name|
+        """
+        columns = []
+        for alias, _, _, model in self._related:
+            for field in model.fields:
+                field = field.copy()
+                field.set_alias(table=alias)
+                columns.append(aliased(field).alias('%s.%s' % (
+                    alias, field.field_name)))
+        return tuple(columns)
+
     def get(self, *fields, **kwargs):
         """ Gets a single record from the DB based on the
             :prop:best_available_index if no |WHERE| clause has been
@@ -2411,14 +3843,22 @@ class Model(ORM):
             :prop:best_unique_index within the current model.
 
             @fields: (:class:cargo.Field) objects within the Model,
-                if None are specified, all will be updated
+                if None are specified, the :prop:changed_fields will be
+                updated
 
-            -> result of query, differs depending on cursor settings
+            -> result of query, differs depending on cursor settings.
+                |None| if no @fields are specified and none have changed,
+                in which case nothing is updated.
         """
         if not self.state.has('RETURNING'):
             return_fields = filter(lambda x: isinstance(x, Field), fields)
             self.returning(*return_fields)
         self._explicit_where()
+        if not fields and not self.state.has('SET'):
+            fields = self.changed_fields
+            if not fields:
+                self.reset()
+                return None
         return super().update(*fields, **kwargs)
 
     def pull_all(self, *args, dry=False, **kwargs):
@@ -2432,6 +3872,41 @@ class Model(ORM):
                 relationship.pull(*args, dry=dry, **kwargs)
             for relationship in self.relationships}
 
+    def prefetch(self, results, *names, chunk_size=1000, naked=False):
+        """ Loads the :class:Relationship(s) and :class:ForeignKey(s) at
+            @names for every model in @results with one
+            |WHERE field = ANY(%s)| query per relationship, rather than the
+            one query per model which calling :meth:Relationship.pull on
+            each of them would take. The records are attached to the
+            relationships of each model, whose |pull()| then returns them
+            without querying.
+
+            @results: (#list) of :class:Model(s) of this model's class
+            @*names: (#str) attribute names of the relationships or
+                foreign keys to load
+            @chunk_size: (#int) max number of keys in each query
+            @naked: (#bool) |True| to attach :prop:_cursor_factory results
+                rather than models
+
+            -> @results
+            ..
+                posts = Posts().where(True).select()
+                Posts().prefetch(posts, 'author', 'comments')
+                posts[0].author.pull()  # No query
+                posts[0].comments.pull()  # No query
+            ..
+        """
+        for name in names:
+            relationship = getattr(self, name, None)
+            if not isinstance(relationship, Relationship) and \
+               getattr(relationship, 'ref', None) is None:
+                raise ValueError('`%s` is not a relationship or foreign key '
+                                 'of %s' % (name, self.__class__.__name__))
+            relationship.prefetch(results,
+                                  chunk_size=chunk_size,
+                                  naked=naked)
+        return results
+
     def last(self, count=1, *args, **kwargs):
         """ Selects the last @count rows from the model based on the
             :prop:best_index ordered |DESC|. If @count is |1| a single result
@@ -2463,7 +3938,7 @@ class Model(ORM):
         return super().select(*args, **kwargs)
 
     def iternaked(self, offset=0, limit=0, buffer=100, order_field=None,
-                  reverse=False, fields=None):
+                  reverse=False, fields=None, stream=False, withhold=False):
         """ Yields cursor factory until there are no more results to fetch.
 
             @offset: (#int) cursor start position
@@ -2472,17 +3947,25 @@ class Model(ORM):
             @reverse: (#bool) True if returning in descending order
             @order_field: (:class:cargo.Field) object to order the
                 query by
+            @stream: (#bool) True to fetch the results through a named,
+                server-side cursor @buffer rows at a time.
+                :see::meth:ORM.stream
+            @withhold: (#bool) True to declare the server-side cursor
+                |WITH HOLD| when @stream is |True|
         """
         for item in self.naked().iter(offset=offset,
                                       limit=limit,
                                       buffer=buffer,
                                       order_field=order_field,
                                       reverse=reverse,
-                                      fields=fields):
+                                      fields=fields,
+                                      stream=stream,
+                                      withhold=withhold):
             yield item
 
     def iter(self, offset=0, limit=0, buffer=100, order_field=None,
-             reverse=False, fields=None):
+             reverse=False, fields=None, stream=False, withhold=False,
+             reuse=False, token=None):
         """ Yields populated models until there are no more
             results to fetch.
 
@@ -2492,23 +3975,56 @@ class Model(ORM):
             @reverse: (#bool) True if returning in descending order
             @order_field: (:class:cargo.Field) object to order the
                 query by
+            @stream: (#bool) True to fetch the results through a named,
+                server-side cursor @buffer rows at a time, otherwise the
+                entire result set is transferred to the client before the
+                first page is yielded. :see::meth:ORM.stream
+            @withhold: (#bool) True to declare the server-side cursor
+                |WITH HOLD| when @stream is |True|
+            @reuse: (#bool|#int) True to refill a ring of preallocated
+                models in place rather than copying the model for every
+                row, or an #int minimum number of models in the ring. The
+                ring holds one page of @buffer results, so each yielded
+                model is refilled once the following page is fetched and
+                models must not be retained. Has no effect on naked
+                results. :see::attr:ModelCursor.reuse
+            @token: (#str) continuation token of :meth:make_token or
+                :meth:keyset to start after rather than at @offset. The
+                results are ordered by the key and in the direction the
+                token was made with, rather than by @order_field.
         """
-        if not self.state.has('WHERE'):
-            self.where(self.best_available_index or True)
+        if token is not None:
+            keys, values, reverse = self._decode_token(token)
+            self.seek(keys, values, limit=limit, reverse=reverse)
+        else:
+            if not self.state.has('WHERE'):
+                self.where(self.best_available_index or True)
 
-        field = getattr(self, order_field) if order_field else self.best_index
+            field = getattr(self, order_field) if order_field else \
+                self.best_index
 
-        if field is not None:
-            order = field.asc() if not reverse else field.desc()
-            self.order_by(order)
+            if field is not None:
+                order = field.asc() if not reverse else field.desc()
+                self.order_by(order)
 
-        self.offset(offset)
+            self.offset(offset)
 
-        if limit:
-            self.limit(limit)
+            if limit:
+                self.limit(limit)
 
-        q = super().dry().select(*fields or []).execute()
+        q = super().dry().select(*fields or [])
 
+        if stream:
+            for results in self.stream(q.query, q.params, buffer=buffer,
+                                       withhold=withhold, reuse=reuse):
+                for result in results:
+                    yield result
+            self.reset()
+            return
+
+        q = q.execute()
+        if reuse and isinstance(q, ModelCursor):
+            q.reuse = reuse
         while True:
             results = q.fetchmany(buffer)
             if not results:
@@ -2517,6 +4033,116 @@ class Model(ORM):
                 yield result
         self.reset()
 
+    def _get_keys(self, fields=None):
+        """ -> (#tuple) of :class:Field @fields or field names to paginate
+                by, defaulting to the :prop:primary_key or else the
+                :prop:best_index
+        """
+        if fields:
+            if isinstance(fields, (str, Field)):
+                fields = (fields,)
+            return tuple(getattr(self, field) if isinstance(field, str) else
+                         field
+                         for field in fields)
+        keys = self.primary_key or self.best_index
+        if keys is None:
+            raise ValueError('Keyset pagination requires an index or '
+                             '`fields` to order the results by.')
+        return keys if isinstance(keys, tuple) else (keys,)
+
+    def _decode_token(self, token):
+        """ -> (#tuple) |(keys, values, reverse)| of continuation @token,
+                where |keys| are the :class:Field(s) of this model
+        """
+        names, values, reverse = decode_token(token)
+        for name in names:
+            if name not in self.field_names:
+                raise ValueError('Invalid continuation token `%s`' % token)
+        return self._get_keys(names), values, reverse
+
+    def make_token(self, result, fields=None, reverse=False):
+        """ -> (#str) opaque continuation token of @result, the last result
+                seen, which :meth:keyset and :meth:iter resume after
+
+            @result: (:class:Model|#dict|#namedtuple) result including the
+                values of @fields
+            @fields: (#tuple) of :class:Field or #str field names the
+                results are ordered by. :see::meth:keyset
+            @reverse: (#bool) |True| if the results are ordered descending
+        """
+        keys = self._get_keys(fields)
+        values = []
+        for key in keys:
+            try:
+                values.append(result[key.field_name])
+            except TypeError:
+                #: Named tuples
+                values.append(getattr(result, key.field_name))
+        return encode_token([key.field_name for key in keys], values,
+                            reverse)
+
+    def keyset(self, token=None, limit=25, fields=None, reverse=False):
+        """ Selects the page of @limit results following continuation
+            @token with keyset pagination, i.e.
+            |WHERE (a, b) > (%s, %s) ORDER BY a, b LIMIT 25|, rather than
+            with an |OFFSET| as :meth:page does. Each page takes the same
+            time to fetch no matter how deep it is. Respects the |WHERE|
+            clauses within the query state. :see::meth:ORM.seek
+
+            Continuation tokens are not signed, they merely encode the
+            field names, the last seen values and the direction. The names
+            are checked against the model and the values are parameterized.
+
+            @token: (#str) continuation token returned with the previous
+                page, or |None| for the first page
+            @limit: (#int) max results to return
+            @fields: (#tuple) of :class:Field or #str field names which
+                are unique together to order the results by. Defaults to
+                the :prop:primary_key, which may span several fields, or
+                else the :prop:best_index. Ignored when @token is given.
+            @reverse: (#bool) |True| to order the results descending.
+                Ignored when @token is given.
+
+            -> (#tuple) |(results, token)| #list of results and the
+                continuation token of the next page, or |None| if this is
+                the last page
+            ..
+                users, token = User.keyset(limit=50)
+                while token:
+                    users, token = User.keyset(token, limit=50)
+            ..
+        """
+        if token is not None:
+            keys, values, reverse = self._decode_token(token)
+        else:
+            keys, values = self._get_keys(fields), None
+        results = self.seek(keys, values, limit=limit, reverse=reverse)\
+            .select()
+        if not limit or len(results) < limit:
+            return results, None
+        return results, self.make_token(results[-1], keys, reverse)
+
+    def to_columns(self, *fields, chunk_size=10000, withhold=False):
+        """ Selects @fields, or every field in the model, and returns the
+            results as a :class:numpy.ndarray for each column rather than
+            as models. Respects the |WHERE|, |ORDER BY| and |LIMIT| clauses
+            within the query state. :see::meth:ORM.fetch_columns
+
+            @*fields: (:class:Field) fields to select
+            @chunk_size: (#int) number of rows to fetch from the server in
+                each round trip
+            @withhold: (#bool) :see::meth:ORM.stream
+
+            -> (#OrderedDict) |{column name: numpy.ndarray}|
+        """
+        q = super().dry().select(*fields)
+        try:
+            return self.fetch_columns(q.query, q.params,
+                                      chunk_size=chunk_size,
+                                      withhold=withhold)
+        finally:
+            self.reset()
+
     def copy(self, *args, **kwargs):
         """ Returns a safe copy of the model """
         cls = self.clear_copy(*args, **kwargs)
@@ -2529,6 +4155,14 @@ class Model(ORM):
         )
         cls._alias = self._alias
         cls._always_naked = self._always_naked
+        cls._lazy = self._lazy
+        if '_related' in self.__dict__:
+            cls._related = self._related
+        #: Unchanged fields remain unchanged in the copy
+        cls._loaded_values = {
+            name: getattr(cls, name)._tracked_value
+            for name, value in self._loaded_values.items()
+            if getattr(self, name)._tracked_value is value}
 
         return cls
 
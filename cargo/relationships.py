@@ -7,8 +7,11 @@
 
 """
 import copy
+import uuid
 import importlib
+from collections import defaultdict
 from functools import lru_cache
+from itertools import islice
 
 from pydoc import locate, ErrorDuringImport
 
@@ -17,7 +20,8 @@ from vital.debug import preprX, get_obj_name
 
 from cargo.fields import *
 from cargo.etc.types import *
-from cargo.expressions import Clause, safe
+from cargo.expressions import Clause, Expression, Function, parameterize,\
+    safe
 from cargo.exceptions import RelationshipImportError, PullError
 
 
@@ -48,10 +52,67 @@ def _import_from(owner_module, string):
     return obj
 
 
+def _get_value(result, name):
+    """ -> value of the field at @name in @result, a :class:Model, #dict
+            or #namedtuple
+    """
+    if isinstance(result, dict):
+        return result[name]
+    value = getattr(result, name)
+    if isinstance(value, Field):
+        return value.value
+    return value
+
+
+def _as_key(field, value):
+    """ -> @value of @field in the form keys are matched in. |uuid| keys
+            may be strings or :class:uuid.UUID(s) and are matched as the
+            latter.
+    """
+    if value is not None and field.type_name == 'uuid' and \
+       not isinstance(value, uuid.UUID):
+        return uuid.UUID(value)
+    return value
+
+
+def _any_of(field, values):
+    """ -> (:class:Expression) |field = ANY(%s::type[])| with the array of
+            @values cast to the type of @field, so that keys which are
+            adapted to strings match columns such as |uuid| or |inet|
+    """
+    array = parameterize(list(values), safe('::%s[]' % field.type_name))
+    return Expression(field, '=', Function('ANY', array))
+
+
+def _select_any(model, field_name, values, chunk_size, naked=False):
+    """ Selects the records of @model whose @field_name is in @values with
+        one |WHERE field = ANY(%s)| query per @chunk_size values
+
+        -> yields results of :meth:Model.select
+    """
+    values = iter(values)
+    field = getattr(model, field_name)
+    while True:
+        chunk = list(islice(values, chunk_size))
+        if not chunk:
+            break
+        if naked:
+            model.naked()
+        model.where(_any_of(field, chunk))
+        for result in model.select():
+            yield result
+
+
 class _ForeignObject(object):
     __slots__ = tuple()
 
     def pull(self, *args, dry=False, naked=False, **kwargs):
+        prefetched = self.ref.prefetched
+        if prefetched is not None and not (args or dry or naked or kwargs):
+            value, result = prefetched
+            if value == self.value:
+                return result
+
         model = self.ref.model.where(self.ref.field == self.value)
 
         if naked:
@@ -61,6 +122,37 @@ class _ForeignObject(object):
 
         return model.get(*args, **kwargs)
 
+    def prefetch(self, owners, chunk_size=1000, naked=False):
+        """ Selects the records referenced by this foreign key in each of
+            @owners with one |WHERE field = ANY(%s)| query per @chunk_size
+            distinct keys and attaches them to the foreign keys of @owners.
+            :meth:pull then returns the attached record, or |None| if it
+            was not found, without querying.
+
+            @owners: (#list) of :class:Model(s) which this foreign key
+                belongs to
+            @chunk_size: (#int) max number of keys in each query
+            @naked: (#bool) |True| to attach :prop:_cursor_factory results
+                rather than models
+        """
+        fields = [getattr(owner, self.field_name) for owner in owners]
+        fields = [field for field in fields if field.value_is_not_null]
+        model = self.ref.model.clear_copy()
+        field_name = self.ref.field_name
+        ref_field = getattr(model, field_name)
+        keys = {_as_key(ref_field, field.value) for field in fields}
+        found = {
+            _as_key(ref_field, _get_value(result, field_name)): result
+            for result in _select_any(model,
+                                      field_name,
+                                      keys,
+                                      chunk_size,
+                                      naked=naked)}
+        for field in fields:
+            result = found.get(_as_key(ref_field, field.value))
+            field.ref = field.ref.with_prefetched(field.value, result)
+        return owners
+
 
 class BaseRelationship(object):
 
@@ -90,6 +182,8 @@ class Reference(object):
         self._schema = schema
         self.field_name = field_name
         self.constraints = constraints or []
+        #: |(key, record)| attached by :meth:_ForeignObject.prefetch
+        self.prefetched = None
 
     __repr__ = preprX('_model', 'field_name')
 
@@ -144,6 +238,16 @@ class Reference(object):
         self.constraints.append(clause)
         return self
 
+    def with_prefetched(self, value, result):
+        """ -> copy of the reference holding @result, the record whose
+                referenced field equals @value, for :meth:ForeignKey.pull
+                to return
+        """
+        ref = self.__class__(self._model, self.field_name, self.constraints,
+                             schema=self._schema)
+        ref.prefetched = (value, result)
+        return ref
+
     def on_update(self, val):
         return self.add_constraint('ON UPDATE', val)
 
@@ -198,6 +302,7 @@ def get_cls(cls):
             return cls
 
         pull = _ForeignObject.pull
+        prefetch = _ForeignObject.prefetch
 
     FKey.__name__ = cls.__name__
     return FKey
@@ -400,6 +505,8 @@ class ForeignKey(BaseRelationship, _ForeignObject):
                             self._owner.__class__.__name__)
         objname = "%s.%s" % (_owner, self._owner_attr)
         setattr(self.ref_model, self._relation, Relationship(objname))
+        #: The referenced model's compiled layout lacks the new relationship
+        self.ref_model._compiled = None
 
     def forge(self, owner, attribute):
         """ Called when the @owner :class:Model is initialized. Makes
@@ -494,6 +601,8 @@ class Relationship(BaseRelationship):
         self._owner_attr = None
         self._foreign_key = foreign_key
         self._forged = False
+        #: |(join value, results)| attached by :meth:prefetch
+        self._prefetched = None
 
     __repr__ = preprX('_foreign_key', '_model_cls')
 
@@ -534,7 +643,7 @@ class Relationship(BaseRelationship):
             obj = getattr(obj(), string.split(".")[-1])
         except AttributeError:
             self._raise_forge_error(string)
-        if hasattr(field, 'ref') and field.ref is not None:
+        if hasattr(obj, 'ref') and obj.ref is not None:
             return obj
         else:
             self._raise_forge_error(
@@ -559,7 +668,17 @@ class Relationship(BaseRelationship):
             @order_field: (:class:cargo.Field) object to order the
                 query by
             @*args and @**kwargs get passed to the :meth:Model.select query
+
+            Results attached by :meth:prefetch are returned without
+            querying when no arguments are given.
         """
+        prefetched = self._prefetched
+        if prefetched is not None and \
+           not (args or offset or limit or order_field is not None or dry or
+                kwargs or self.state.has('WHERE')):
+            value, results = prefetched
+            if value == self.join_field.value:
+                return results
         if self.join_field.value_is_null and not self.state.has('WHERE'):
             raise PullError(('Required field `{}` was empty and no explicit ' +
                              'WHERE clause was specified.')
@@ -597,6 +716,41 @@ class Relationship(BaseRelationship):
                          dry=dry,
                          **kwargs)
 
+    def prefetch(self, owners, chunk_size=1000, naked=False):
+        """ Selects the records of this relationship for each of @owners
+            with one |WHERE foreign_key = ANY(%s)| query per @chunk_size
+            distinct join values rather than one query per owner, groups
+            them by their foreign key and attaches each group to the
+            relationship of its owner. :meth:pull then returns the attached
+            results without querying.
+
+            @owners: (#list) of :class:Model(s) which this relationship
+                belongs to
+            @chunk_size: (#int) max number of join values in each query
+            @naked: (#bool) |True| to attach :prop:_cursor_factory results
+                rather than models
+        """
+        relationships = [getattr(owner, self._owner_attr) for owner in owners]
+        relationships = [rel for rel in relationships
+                         if rel.join_field.value_is_not_null]
+        model = self._model.clear_copy()
+        field_name = self.foreign_key.field_name
+        field = getattr(model, field_name)
+        grouped = defaultdict(list)
+        for result in _select_any(model,
+                                  field_name,
+                                  {_as_key(field, rel.join_field.value)
+                                   for rel in relationships},
+                                  chunk_size,
+                                  naked=naked):
+            grouped[_as_key(field, _get_value(result, field_name))].append(
+                result)
+        for rel in relationships:
+            value = rel.join_field.value
+            rel._prefetched = (value,
+                               grouped.get(_as_key(field, value), []))
+        return owners
+
     @cached_property
     def foreign_key(self):
         """ -> :class:ForeignKey found from :prop:_foreign_key """
@@ -44,5 +44,9 @@ setup(
         "Operating System :: OS Independent"
     ],
     install_requires=[str(ir.req) for ir in install_reqs],
+    extras_require={
+        #: ORM.fetch_columns and Model.to_columns
+        'columns': ['numpy']
+    },
     packages=list(find_packages(PKG))
 )
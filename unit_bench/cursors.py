@@ -1,9 +1,16 @@
 import copy
+import decimal
+import datetime
+import tracemalloc
 import psycopg2
+from collections import deque
 
 from cargo.expressions import _empty
 from cargo.cursors import *
-from cargo import ORM, db
+from cargo.cursors import nt
+from cargo import ORM, Model, db
+from cargo.fields import *
+from cargo.builder import Plan, drop_schema
 
 from vital.debug import Compare, Timer, RandData, bold
 
@@ -56,3 +63,116 @@ t.time(50000, 1, 2, 3, 4, 5, 'a', 'b', 'c', 'd', 'e', 'f')
 print(bold('RealDict'))
 t = Timer(rd.select)
 t.time(50000, 1, 2, 3, 4, 5, 'a', 'b', 'c', 'd', 'e', 'f')
+
+
+#: Record classes of small result sets
+class UncachedNamedTupleCursor(CNamedTupleCursor):
+    """ Creates a new record class for every query, as
+        :class:CNamedTupleCursor did before record classes were cached
+    """
+    def _make_nt(self):
+        return nt("Record", (d for d, *_ in self.description or []),
+                  rename=True)
+
+
+def small_query(cursor_factory):
+    cursor = cnt.client.connection.cursor(cursor_factory=cursor_factory)
+
+    def query():
+        cursor.execute('SELECT 1 AS uid, 2 AS username, 3 AS email;')
+        return cursor.fetchall()
+
+    query.__name__ = query.__qualname__ = cursor_factory.__name__
+    return query
+
+
+c = Compare(small_query(UncachedNamedTupleCursor),
+            small_query(CNamedTupleCursor),
+            small_query(RowCursor),
+            name='Small Result Sets')
+c.time(50000)
+
+
+#: Memory per row
+def row_memory(cursor_factory, rows=100000):
+    cursor = cnt.client.connection.cursor(cursor_factory=cursor_factory)
+    cursor.execute('SELECT i AS uid, i::text AS username, now() AS joined, '
+                   '       i * 2 AS score, true AS active, '
+                   '       NULL::text AS email '
+                   'FROM generate_series(1, %s) i;', (rows,))
+    tracemalloc.start()
+    results = cursor.fetchall()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    cursor.close()
+    return size / rows
+
+
+print(bold('Memory per row'))
+for cursor_factory in (RowCursor,
+                       CNamedTupleCursor,
+                       psycopg2.extras.DictCursor,
+                       psycopg2.extras.RealDictCursor,
+                       OrderedDictCursor):
+    print('%s: %.1f bytes' % (cursor_factory.__name__,
+                              row_memory(cursor_factory)))
+
+
+#: ModelCursor hydration
+class Hydrate(Model):
+    uid = Int(primary=True)
+    username = Text()
+    join_date = Timestamp()
+    tags = Array(Text())
+    meta = JsonB()
+    score = Decimal()
+
+
+class LegacyModelCursor(ModelCursor):
+    """ Hydrates models through :meth:Model.__setitem__ for every column of
+        every row, as :class:ModelCursor did before hydration plans
+    """
+    def _fill_model(self, tup, new=True):
+        model = self._cargo_model.clear_copy() if new else self._cargo_model
+        for (k, *_), v in zip(self.description, tup):
+            model[k] = v
+        return model.reset_changed()
+
+
+schema = '_cargo_testing'
+db.open(schema=schema)
+drop_schema(db, schema, cascade=True, if_exists=True)
+hydrate = Hydrate()
+Plan(hydrate).execute()
+
+#: Distinct rows in the form psycopg2 decodes |hydrate| records
+ROWS = 1000000
+joined = datetime.datetime(2016, 1, 1, 12)
+rows = [(i, 'user%d' % i, joined + datetime.timedelta(seconds=i),
+         ['a', str(i)], {'uid': i}, decimal.Decimal(i) / 4)
+        for i in range(ROWS)]
+
+
+def hydrate_with(cursor_factory):
+    cursor = hydrate.client.connection.cursor(cursor_factory=cursor_factory)
+    cursor._cargo_model = hydrate.copy()
+    #: Only the description of the rows is needed from the server
+    cursor.execute('SELECT uid, username, join_date, tags, meta, score '
+                   'FROM %s.hydrate LIMIT 0;' % schema)
+
+    def fill():
+        #: A fresh model for every row as in :meth:ModelCursor.fetchall,
+        #  the models are dropped as they are made to bound the memory
+        deque(map(cursor._fill_model, rows), maxlen=0)
+
+    fill.__name__ = fill.__qualname__ = cursor_factory.__name__
+    return fill
+
+
+c = Compare(hydrate_with(LegacyModelCursor),
+            hydrate_with(ModelCursor),
+            name='ModelCursor Hydration of %d Rows' % ROWS)
+c.time(1)
+
+drop_schema(db, schema, cascade=True)
@@ -1,3 +1,5 @@
+import io
+
 from cargo import Model, db, Query
 from cargo.fields import *
 from cargo.relationships import ForeignKey
@@ -57,6 +59,20 @@ if __name__ == '__main__':
     c = Compare(Users, Posts, name='Initialization')
     c.time(ITERATIONS)
 
+    #: Initialization without the compiled class layout, i.e. walking
+    #  and rebuilding the model's members for every instance
+    def users_uncompiled():
+        Users._compiled = None
+        return Users()
+
+    def users_compiled():
+        return Users()
+
+    Users()
+    c = Compare(users_uncompiled, users_compiled,
+                name='Compiled Initialization')
+    c.time(ITERATIONS)
+
     User = Users()
     Post = Posts()
 
@@ -98,6 +114,30 @@ if __name__ == '__main__':
     for user in User:
         print(user)
 
+    #: Iterating with recycled models
+    def iter_copies():
+        for user in User.iter():
+            pass
+
+    def iter_reused():
+        for user in User.iter(reuse=True):
+            pass
+
+    c = Compare(iter_copies, iter_reused, name='Iteration')
+    c.time(ITERATIONS)
+
+    #: Exporting JSON lines
+    def export_to_json():
+        f = io.StringIO()
+        for user in User.iter():
+            f.write(user.to_json() + '\n')
+
+    def export_copy_out():
+        User.copy_out(io.StringIO(), format='json')
+
+    c = Compare(export_to_json, export_copy_out, name='JSON Export')
+    c.time(ITERATIONS)
+
     banner('Posts')
     for x, post in enumerate(Post):
         if x > 0:
@@ -0,0 +1,134 @@
+#!/usr/bin/python3 -S
+# -*- coding: utf-8 -*-
+"""
+    `Unit tests for cargo.aio.loader.AioLoader`
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   2016 Jared Lunde © The MIT License (MIT)
+   http://github.com/jaredlunde
+"""
+import asyncio
+import unittest
+import uuid
+
+from cargo import Model, UUID
+from cargo.aio import AioLoader, AioModel
+
+from unit_tests.aio import configure
+
+
+class CountedFoo(configure.AioFoo):
+    statements = []
+
+    async def execute(self, query, *args, **kwargs):
+        self.statements.append(query)
+        return await super().execute(query, *args, **kwargs)
+
+
+class Team(Model):
+    schema = 'cargo_tests'
+    uid = UUID(primary=True)
+
+
+class AioTeam(AioModel):
+    schema = 'cargo_tests'
+    table = 'team'
+    uid = UUID(primary=True)
+
+
+class TestAioLoader(configure.AioTestCase):
+    model_cls = CountedFoo
+
+    def setUp(self):
+        super().setUp()
+        self.fill(5)
+        CountedFoo.statements.clear()
+
+    def _uids(self, results):
+        return [x.uid.value if x is not None else None for x in results]
+
+    def test___init__(self):
+        loader = self.model.loader(self.model.uid)
+        self.assertIsInstance(loader, AioLoader)
+        self.assertEqual(loader.field_name, 'uid')
+        self.assertEqual(self.model.loader().field_name, 'uid')
+
+    def test_load(self):
+        loader = self.model.loader(self.model.uid)
+        results = self.run_async(asyncio.gather(loader.load(1),
+                                                loader.load(2),
+                                                loader.load(1),
+                                                loader.load(3)))
+        self.assertListEqual(self._uids(results), [1, 2, 1, 3])
+        self.assertIs(results[0], results[2])
+        self.assertEqual(len(CountedFoo.statements), 1)
+        self.assertIn('ANY', CountedFoo.statements[0])
+
+    def test_load_missing(self):
+        loader = self.model.loader(self.model.uid)
+        results = self.run_async(asyncio.gather(loader.load(1),
+                                                loader.load(1234)))
+        self.assertListEqual(self._uids(results), [1, None])
+        self.assertEqual(len(CountedFoo.statements), 1)
+
+    def test_load_memoized(self):
+        loader = self.model.loader(self.model.uid)
+        a = self.run_async(loader.load(1))
+        b = self.run_async(loader.load(1))
+        self.assertIs(a, b)
+        self.assertEqual(len(CountedFoo.statements), 1)
+        loader = self.model.loader(self.model.uid, cache=False)
+        a = self.run_async(loader.load(1))
+        b = self.run_async(loader.load(1))
+        self.assertIsNot(a, b)
+        self.assertEqual(a.uid.value, b.uid.value)
+        self.assertEqual(len(CountedFoo.statements), 3)
+
+    def test_load_many(self):
+        loader = self.model.loader(self.model.uid)
+        results = self.run_async(loader.load_many([4, 1234, 2, 5, 2]))
+        self.assertListEqual(self._uids(results), [4, None, 2, 5, 2])
+        self.assertEqual(len(CountedFoo.statements), 1)
+
+    def test_max_batch_size(self):
+        loader = self.model.loader(self.model.uid, max_batch_size=2)
+        results = self.run_async(loader.load_many([1, 2, 3, 4, 5]))
+        self.assertListEqual(self._uids(results), [1, 2, 3, 4, 5])
+        self.assertEqual(len(CountedFoo.statements), 3)
+
+    def test_clear(self):
+        loader = self.model.loader(self.model.uid)
+        self.run_async(loader.load_many([1, 2]))
+        self.assertIs(loader.clear(1), loader)
+        self.run_async(loader.load_many([1, 2]))
+        self.assertEqual(len(CountedFoo.statements), 2)
+        self.run_async(loader.load_many([1, 2]))
+        self.assertEqual(len(CountedFoo.statements), 2)
+        loader.clear()
+        self.run_async(loader.load_many([1, 2]))
+        self.assertEqual(len(CountedFoo.statements), 3)
+
+
+class TestAioLoaderUUID(configure.AioTestCase):
+    model_cls = AioTeam
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        configure.Plan(Team()).execute()
+
+    def test_load_uuid(self):
+        a, b = uuid.uuid4(), uuid.uuid4()
+        Team().insert_many([{'uid': a}, {'uid': b}])
+        loader = self.model.loader(self.model.uid)
+        results = self.run_async(asyncio.gather(loader.load(str(a)),
+                                                loader.load(b),
+                                                loader.load(a)))
+        self.assertListEqual([x.uid.value for x in results], [a, b, a])
+        self.assertIs(results[0], results[2])
+        Team().where(True).delete()
+
+
+if __name__ == '__main__':
+    # Unit test
+    configure.run_tests(TestAioLoader, TestAioLoaderUUID, failfast=True,
+                        verbosity=2)
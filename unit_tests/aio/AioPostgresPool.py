@@ -10,7 +10,8 @@ import unittest
 import psycopg2
 
 from cargo.cursors import *
-from cargo.clients import AioPostgresPool, local_client
+from cargo.aio import AioPostgresPool
+from cargo.clients import local_client
 
 from unit_tests.aio import configure
 
@@ -0,0 +1,113 @@
+#!/usr/bin/python3 -S
+# -*- coding: utf-8 -*-
+"""
+    `Unit tests for cargo.aio.orm.AioStream`
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   2016 Jared Lunde © The MIT License (MIT)
+   http://github.com/jaredlunde
+"""
+import asyncio
+import unittest
+
+from cargo import QueryError
+from cargo.aio import AioStream
+
+from unit_tests.aio import configure
+
+
+class TestAioStream(configure.AioTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fill(5)
+
+    async def _connections_returned(self):
+        pool = self.pool.pool
+        for _ in range(100):
+            if pool.freesize == pool.size:
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    def test_stream(self):
+        async def test():
+            stream = self.model.stream('SELECT uid FROM foo ORDER BY uid',
+                                       buffer=2)
+            self.assertIsInstance(stream, AioStream)
+            pages = []
+            async for results in stream:
+                pages.append([x.uid for x in results])
+            self.assertListEqual(pages, [[1, 2], [3, 4], [5]])
+            self.assertTrue(stream.closed)
+            self.assertTrue(await self._connections_returned())
+        self.run_async(test())
+
+    def test_aiter(self):
+        async def test():
+            uids = []
+            async for result in self.model.aiter(buffer=2):
+                self.assertIsInstance(result, configure.AioFoo)
+                uids.append(result.uid.value)
+            self.assertListEqual(uids, [1, 2, 3, 4, 5])
+            self.assertFalse(self.model.state.has('WHERE'))
+            uids = []
+            async for result in self.model.aiternaked(buffer=3,
+                                                      reverse=True):
+                uids.append(result.uid)
+            self.assertListEqual(uids, [5, 4, 3, 2, 1])
+            uids = []
+            async for result in self.model:
+                uids.append(result.uid.value)
+            self.assertListEqual(uids, [1, 2, 3, 4, 5])
+        self.run_async(test())
+
+    def test_aiter_break(self):
+        async def test():
+            async for result in self.model.aiter(buffer=1):
+                break
+            self.assertTrue(await self._connections_returned())
+            self.assertFalse(self.model.state.has('WHERE'))
+            async with self.model.aiter(buffer=1) as results:
+                async for result in results:
+                    break
+            pool = self.pool.pool
+            self.assertEqual(pool.freesize, pool.size)
+            self.assertEqual(len(await self.model.where(True).select()), 5)
+        self.run_async(test())
+
+    def test_aiter_unconsumed(self):
+        async def test():
+            model = self.model
+            stream = model.aiternaked(limit=1, reverse=True)
+            #: The query state is reset whether the stream is used or not
+            self.assertFalse(model.state.has('WHERE'))
+            self.assertFalse(model._naked)
+            result = await model.where(model.uid == 2).get()
+            self.assertIsInstance(result, configure.AioFoo)
+            self.assertEqual(result.uid.value, 2)
+            uids = []
+            async for result in stream:
+                uids.append(result.uid)
+            self.assertListEqual(uids, [5])
+        self.run_async(test())
+
+    def test_stream_error(self):
+        async def test():
+            pages = []
+            stream = self.model.stream(
+                'SELECT 1 / (x - 3) AS uid FROM generate_series(1, 5) x',
+                buffer=1)
+            with self.assertRaises(QueryError):
+                async for results in stream:
+                    pages.append(results)
+            self.assertEqual(len(pages), 2)
+            self.assertTrue(stream.closed)
+            self.assertTrue(await self._connections_returned())
+            #: The transaction of the stream was rolled back
+            self.assertEqual(len(await self.model.where(True).select()), 5)
+        self.run_async(test())
+
+
+if __name__ == '__main__':
+    # Unit test
+    configure.run_tests(TestAioStream, failfast=True, verbosity=2)
@@ -0,0 +1,118 @@
+#!/usr/bin/python3 -S
+# -*- coding: utf-8 -*-
+"""
+    `Unit tests for cargo.aio.orm.AioTransaction`
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   2016 Jared Lunde © The MIT License (MIT)
+   http://github.com/jaredlunde
+"""
+import unittest
+
+from cargo import QueryError
+from cargo.aio import AioTransaction
+
+from unit_tests.aio import configure
+
+
+class TestAioTransaction(configure.AioTestCase):
+
+    def _uids(self):
+        return sorted(x.uid.value
+                      for x in configure.Foo().where(True).select())
+
+    def test_commit(self):
+        async def test():
+            model = self.model
+            transaction = model.transaction()
+            self.assertIsInstance(transaction, AioTransaction)
+            async with transaction:
+                await model.add(uid=1, textfield='foo')
+                await model.add(uid=2, textfield='bar')
+                #: Uncommitted records are only visible to the transaction
+                self.assertListEqual(self._uids(), [])
+                self.assertEqual(len(await model.where(True).select()), 2)
+            self.assertListEqual(self._uids(), [1, 2])
+        self.run_async(test())
+
+    def test_rollback(self):
+        async def test():
+            model = self.model
+            with self.assertRaises(ValueError):
+                async with model.transaction():
+                    await model.add(uid=1, textfield='foo')
+                    raise ValueError()
+            self.assertListEqual(self._uids(), [])
+            with self.assertRaises(QueryError):
+                async with model.transaction():
+                    await model.add(uid=1, textfield='foo')
+                    await model.add(uid=1, textfield='foo')
+            self.assertListEqual(self._uids(), [])
+            pool = self.pool.pool
+            self.assertEqual(pool.freesize, pool.size)
+        self.run_async(test())
+
+    def test_savepoint(self):
+        async def test():
+            model = self.model
+            async with model.transaction():
+                await model.add(uid=1, textfield='foo')
+                try:
+                    async with model.transaction() as savepoint:
+                        self.assertIsNotNone(savepoint.savepoint)
+                        await model.add(uid=2, textfield='bar')
+                        raise ValueError()
+                except ValueError:
+                    pass
+                async with model.transaction():
+                    await model.add(uid=3, textfield='baz')
+            self.assertListEqual(self._uids(), [1, 3])
+        self.run_async(test())
+
+    def test_rollback_search_path(self):
+        async def test():
+            model = self.model
+            conn = await self.pool.get()
+            await conn.set_search_path('public')
+            self.pool.put(conn)
+            with self.assertRaises(ValueError):
+                async with model.transaction():
+                    #: Sets the search path within the transaction
+                    await model.where(True).select()
+                    raise ValueError()
+            #: The rolled back search path was forgotten and is set again
+            self.assertListEqual(await model.where(True).select(), [])
+            async with model.transaction():
+                try:
+                    async with model.transaction():
+                        await model.where(True).select()
+                        raise ValueError()
+                except ValueError:
+                    pass
+                self.assertListEqual(await model.where(True).select(), [])
+        self.run_async(test())
+
+    def test_multi(self):
+        async def test():
+            model = self.model
+            model.multi()
+            model.fill(uid=1, textfield='foo')
+            model.insert()
+            model.fill(uid=2, textfield='bar')
+            model.insert()
+            await model.run()
+            self.assertListEqual(self._uids(), [1, 2])
+            model.multi()
+            model.fill(uid=3, textfield='baz')
+            model.insert()
+            model.fill(uid=1, textfield='foo')
+            model.insert()
+            with self.assertRaises(QueryError):
+                await model.run()
+            #: The queries of the multi run were rolled back together
+            self.assertListEqual(self._uids(), [1, 2])
+        self.run_async(test())
+
+
+if __name__ == '__main__':
+    # Unit test
+    configure.run_tests(TestAioTransaction, failfast=True, verbosity=2)
@@ -0,0 +1,50 @@
+import asyncio
+import unittest
+
+from cargo.aio import AioModel, AioPostgresPool
+
+from unit_tests.configure import *
+
+
+class AioFoo(AioModel):
+    ORDINAL = ('uid', 'textfield')
+    schema = 'cargo_tests'
+    table = 'foo'
+    uid = Int(index=True, unique=True)
+    textfield = Text()
+
+
+class AioTestCase(unittest.TestCase):
+    """ Runs the coroutines of each test on an event loop and connection
+        pool of its own, against the |cargo_tests.foo| table
+    """
+    model_cls = AioFoo
+
+    @classmethod
+    def setUpClass(cls):
+        setup()
+        Plan(Foo()).execute()
+
+    @classmethod
+    def tearDownClass(cls):
+        cleanup()
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.pool = AioPostgresPool(1, 2, loop=self.loop)
+        self.run_async(self.pool.connect())
+        self.model = self.model_cls(client=self.pool)
+
+    def tearDown(self):
+        Foo().where(True).delete()
+        self.pool.close()
+        self.run_async(self.pool.wait_closed())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def fill(self, n):
+        Foo().insert_many((x, 'bar') for x in range(1, n + 1))
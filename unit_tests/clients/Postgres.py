@@ -9,6 +9,8 @@
 import unittest
 import psycopg2
 
+from decimal import Decimal
+
 from cargo.cursors import *
 from cargo.clients import db, Postgres, local_client
 
@@ -94,6 +96,123 @@ class TestPostgres(unittest.TestCase):
         cur.execute("INSERT INTO foo (uid, textfield) VALUES (3, 'bar')")
         self.assertIsNone(client.commit())
 
+    def test_set_search_path(self):
+        client = Postgres()
+        self.assertTrue(client.set_search_path('cargo_tests', 'public'))
+        self.assertFalse(client.set_search_path('cargo_tests', 'public'))
+        self.assertEqual(client.search_path_stats.hits, 1)
+        self.assertEqual(client.search_path_stats.misses, 1)
+        cur = client.cursor()
+        cur.execute('SHOW search_path')
+        self.assertEqual(cur.fetchone()[0], 'cargo_tests, public')
+        self.assertTrue(client.set_search_path('public'))
+        self.assertEqual(client.search_path_stats.misses, 2)
+        client.close()
+
+    def test_set_search_path_rollback(self):
+        client = Postgres()
+        client.set_search_path('cargo_tests')
+        client.rollback()
+        self.assertTrue(client.set_search_path('cargo_tests'))
+        client.commit()
+        self.assertFalse(client.set_search_path('cargo_tests'))
+        client.close()
+        self.assertTrue(client.set_search_path('cargo_tests'))
+        client.close()
+
+    def test_execute(self):
+        client = Postgres()
+        cur = client.execute(client.cursor(), 'SELECT %s', (1,))
+        self.assertEqual(cur.fetchone()[0], 1)
+        self.assertEqual(client.statement_cache_stats.misses, 0)
+        client.close()
+
+    def test_execute_prepared(self):
+        client = Postgres(statement_cache_size=2)
+        stats = client.statement_cache_stats
+        for x in range(3):
+            cur = client.execute(client.cursor(),
+                                 'SELECT %(a)s + %(b)s, %(a)s, \'%%\'',
+                                 {'a': x, 'b': 1})
+            self.assertEqual(tuple(cur.fetchone()), (x + 1, x, '%'))
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.hits, 2)
+        cur = client.execute(client.cursor(), 'SELECT %s::text', ('foo',))
+        self.assertEqual(cur.fetchone()[0], 'foo')
+        cur = client.execute(client.cursor(), 'SELECT 1')
+        self.assertEqual(cur.fetchone()[0], 1)
+        self.assertEqual(stats.misses, 3)
+        self.assertEqual(stats.evictions, 1)
+        cur.execute('SELECT count(*) FROM pg_prepared_statements')
+        self.assertEqual(cur.fetchone()[0], 2)
+        client.close()
+
+    def test_execute_unpreparable(self):
+        client = Postgres(statement_cache_size=10)
+        cur = client.execute(client.cursor(), 'SELECT %s IS NULL', (None,))
+        self.assertTrue(cur.fetchone()[0])
+        cur = client.execute(client.cursor(), 'SELECT %s IS NULL', (None,))
+        self.assertTrue(cur.fetchone()[0])
+        self.assertEqual(client.statement_cache_stats.hits, 1)
+        cur.execute('SELECT count(*) FROM pg_prepared_statements')
+        self.assertEqual(cur.fetchone()[0], 0)
+        with self.assertRaises(psycopg2.ProgrammingError):
+            client.execute(client.cursor(), 'SELECT * FROM cargo_nope')
+        client.close()
+
+    def test_execute_prepared_equivalence(self):
+        queries = [('SELECT \'a%%\'', None),
+                   ('SELECT %s', ([1, 2],)),
+                   ('SELECT %(a)s', {'a': [1, 2]}),
+                   ('SELECT %s::bytea', (b'foo',)),
+                   ('SELECT %s, \'%%\'', (1,))]
+        uncached = Postgres()
+        cached = Postgres(statement_cache_size=10)
+        for query, params in queries * 2:
+            expected = uncached.execute(uncached.cursor(), query, params)
+            cur = cached.execute(cached.cursor(), query, params)
+            self.assertEqual(tuple(cur.fetchone()),
+                             tuple(expected.fetchone()))
+        cur.execute('SELECT count(*) FROM pg_prepared_statements')
+        self.assertEqual(cur.fetchone()[0], 2)
+        uncached.close()
+        cached.close()
+
+    def test_execute_prepared_types(self):
+        params = (1, -2 ** 31, 2 ** 31, -2 ** 63, 10 ** 30, 1.5, 1e300,
+                  float('inf'), Decimal('10'), Decimal('1.50'),
+                  Decimal('NaN'))
+        uncached = Postgres()
+        cached = Postgres(statement_cache_size=10)
+        for param in params:
+            query = 'SELECT pg_typeof(%s)::text, %s'
+            expected = uncached.execute(uncached.cursor(), query,
+                                        (param, param))
+            cur = cached.execute(cached.cursor(), query, (param, param))
+            #: NaN is compared by its repr
+            self.assertEqual(repr(tuple(cur.fetchone())),
+                             repr(tuple(expected.fetchone())))
+        self.assertEqual(cached.statement_cache_stats.misses, 3)
+        uncached.close()
+        cached.close()
+
+    def test_execute_prepared_search_path(self):
+        client = Postgres(statement_cache_size=10)
+        client.set_search_path('cargo_tests')
+        client.execute(client.cursor(), 'SELECT 1')
+        client.rollback()
+        client.set_search_path('cargo_tests')
+        self.assertEqual(client.statement_cache_stats.evictions, 0)
+        client.set_search_path('public')
+        self.assertEqual(client.statement_cache_stats.evictions, 1)
+        client.execute(client.cursor(), 'SELECT 1')
+        self.assertEqual(client.statement_cache_stats.misses, 2)
+        client.reset()
+        cur = client.cursor()
+        cur.execute('SELECT count(*) FROM pg_prepared_statements')
+        self.assertEqual(cur.fetchone()[0], 0)
+        client.close()
+
     def test_get_oid(self):
         client = Postgres()
         OIDs = client.get_type_OID('text')
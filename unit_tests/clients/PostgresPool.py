@@ -142,6 +142,42 @@ class TestPostgresPool(unittest.TestCase):
         self.assertIsNone(conn.commit())
         client.put(conn)
 
+    def test_set_search_path(self):
+        with PostgresPool(1, 1, autocommit=True) as pool:
+            conn = pool.get()
+            self.assertTrue(conn.set_search_path('cargo_tests'))
+            pool.put(conn)
+            conn = pool.get()
+            self.assertFalse(conn.set_search_path('cargo_tests'))
+            self.assertEqual(pool.search_path_stats.hits, 1)
+            self.assertEqual(pool.search_path_stats.misses, 1)
+            pool.put(conn)
+
+    def test_set_search_path_open_transaction(self):
+        with PostgresPool(1, 1) as pool:
+            conn = pool.get()
+            conn.set_search_path('cargo_tests')
+            #: The pool rolls back the uncommitted SET
+            pool.put(conn)
+            conn = pool.get()
+            self.assertTrue(conn.set_search_path('cargo_tests'))
+            conn.commit()
+            pool.put(conn)
+            conn = pool.get()
+            self.assertFalse(conn.set_search_path('cargo_tests'))
+            pool.put(conn)
+
+    def test_execute_prepared(self):
+        with PostgresPool(1, 1, statement_cache_size=10) as pool:
+            for x in range(2):
+                conn = pool.get()
+                cur = conn.execute(conn.cursor(), 'SELECT %s', (x,))
+                self.assertEqual(cur.fetchone()[0], x)
+                #: Prepared statements outlive the rolled back transaction
+                pool.put(conn)
+            self.assertEqual(pool.statement_cache_stats.misses, 1)
+            self.assertEqual(pool.statement_cache_stats.hits, 1)
+
     def test_minconn_maxconn(self):
         client = PostgresPool(10, 12)
         self.assertEqual(client.pool.minconn, 10)
@@ -0,0 +1,65 @@
+#!/usr/bin/python3 -S
+# -*- coding: utf-8 -*-
+"""
+
+  `Unit tests for cargo.expressions.normalize_params`
+--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--·--
+   2016 Jared Lunde © The MIT License (MIT)
+   http://github.com/jaredlunde
+
+"""
+import unittest
+
+from cargo import safe
+from cargo.expressions import Clause, Expression, normalize_params
+
+
+class Testnormalize_params(unittest.TestCase):
+
+    def test_identical_shapes(self):
+        a = Clause('WHERE', Expression(safe('foo.bar'), '=', 1000) &
+                   Expression(safe('foo.baz'), '=', 'abc'))
+        b = Clause('WHERE', Expression(safe('foo.bar'), '=', 2000) &
+                   Expression(safe('foo.baz'), '=', 'def'))
+        self.assertNotEqual(a.string, b.string)
+        query_a, params_a = normalize_params(a.string, a.params)
+        query_b, params_b = normalize_params(b.string, b.params)
+        self.assertEqual(query_a, query_b)
+        self.assertEqual(
+            query_a, 'WHERE foo.bar = %(p0)s AND foo.baz = %(p1)s')
+        self.assertDictEqual(params_a, {'p0': 1000, 'p1': 'abc'})
+        self.assertDictEqual(params_b, {'p0': 2000, 'p1': 'def'})
+
+    def test_positional(self):
+        exp = Expression(safe('foo.bar'), '=', 1000) | \
+            Expression(safe('foo.bar'), '=', 2000)
+        query, params = normalize_params(exp.string, exp.params,
+                                         positional=True)
+        self.assertEqual(query, 'foo.bar = %s OR foo.bar = %s')
+        self.assertTupleEqual(params, (1000, 2000))
+
+    def test_repeated_key(self):
+        query, params = normalize_params(
+            '%(a)s + %(b)s + %(a)s', {'a': 1, 'b': 2})
+        self.assertEqual(query, '%(p0)s + %(p1)s + %(p0)s')
+        self.assertDictEqual(params, {'p0': 1, 'p1': 2})
+        query, params = normalize_params(
+            '%(a)s + %(b)s + %(a)s', {'a': 1, 'b': 2}, positional=True)
+        self.assertEqual(query, '%s + %s + %s')
+        self.assertTupleEqual(params, (1, 2, 1))
+
+    def test_untouched(self):
+        query, params = normalize_params("'%%(a)s' || %(a)s", {'a': 1})
+        self.assertEqual(query, "'%%(a)s' || %(p0)s")
+        self.assertDictEqual(params, {'p0': 1})
+
+    def test_unknown_key(self):
+        for positional in (False, True):
+            with self.assertRaises(KeyError):
+                normalize_params('%(a)s || %(c)s', {'a': 1},
+                                 positional=positional)
+
+
+if __name__ == '__main__':
+    # Unit test
+    unittest.main()
@@ -6,13 +6,22 @@
    2016 Jared Lunde © The MIT License (MIT)
    http://github.com/jaredlunde
 """
+import gc
+import io
 import copy
+import json
 import pickle
+import unittest
 
 from random import randint
 import psycopg2.extras
 from collections import OrderedDict
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from vital.security import randkey
 
 from cargo import *
@@ -60,6 +69,25 @@ class FooMultiPrimary(Model):
     uid2 = UID()
 
 
+class FooSerial(Model):
+    schema = 'cargo_tests'
+    uid = Serial()
+    textfield = Text()
+
+
+class FooRequired(Model):
+    schema = 'cargo_tests'
+    uid = Int(primary=True)
+    textfield = Text(not_null=True)
+    intfield = Int()
+
+
+class FooSecret(Model):
+    schema = 'cargo_tests'
+    uid = Int(primary=True)
+    secret = Encrypted(Encrypted.generate_secret())
+
+
 class TestModel(configure.BaseTestCase):
     _GET_TYPE = '__getattr__'
     _FACTORY_TYPE = tuple
@@ -81,6 +109,9 @@ class TestModel(configure.BaseTestCase):
     def setUpClass():
         configure.Plan(configure.Foo()).execute()
         configure.Plan(configure.FooB()).execute()
+        configure.Plan(FooSerial()).execute()
+        configure.Plan(FooRequired()).execute()
+        configure.Plan(FooSecret()).execute()
 
     def setUp(self):
         for k in dir(self.__class__):
@@ -100,6 +131,35 @@ class TestModel(configure.BaseTestCase):
         self.assertTupleEqual(self.model.foreign_keys, tuple())
         self.assertListEqual(self.modelb.relationships, [])
 
+    def test__compile_cached(self):
+        model = self.modelb.clear_copy()
+        compiled = self.modelb.__class__.__dict__['_compiled']
+        self.assertTupleEqual(compiled.field_names, model.field_names)
+        self.assertEqual(compiled.table, 'foo_b')
+        for field in model.fields:
+            self.assertIsNot(field, getattr(self.modelb, field.field_name))
+            for proto in compiled.fields:
+                self.assertIsNot(field, proto)
+            self.assertEqual(field.table, model.table)
+            #: Cloned fields validate themselves rather than the prototype
+            if field.validator is not None:
+                self.assertIs(field.validator.field, field)
+        self.assertIs(model.unique_indexes[0], model.uid)
+        self.assertIs(model.best_indexes[0], model.uid)
+        self.assertIsNone(model.primary_key)
+
+    def test__compile_registered(self):
+        compiled = self.modelb.__class__.__dict__['_compiled']
+        client = Postgres()
+        self.modelb.__class__(client=client)
+        self.assertIn(client, compiled.registered)
+        size = len(compiled.registered)
+        #: Compiled layouts do not keep clients alive
+        client.close()
+        del client
+        gc.collect()
+        self.assertEqual(len(compiled.registered), size - 1)
+
     def _gres(self, result, attr):
         """ Gets the result for various factories """
         if self._GET_TYPE == '__getitem__':
@@ -408,18 +468,69 @@ class TestModel(configure.BaseTestCase):
                           'WHERE foo.uid = {uid} ' +
                           'RETURNING foo.textfield, foo.uid'
                           ).format(uid=rds['uid']))
-        #: Update all
+        #: Update changed
         q = self.model.dry().update()
-        self.assertIn(q.query % q.params, [
-                      ('UPDATE foo SET textfield = bar, uid = {uid} ' +
-                       'WHERE foo.uid = {uid}' +
-                       ' RETURNING *'
-                       ).format(uid=rds['uid']), (
-                        'UPDATE foo SET uid = {uid}, textfield = bar ' +
-                        'WHERE foo.uid = {uid}' +
-                        ' RETURNING *'
-                        ).format(uid=rds['uid']),
-                      ])
+        self.assertEqual(q.query % q.params,
+                         ('UPDATE foo SET textfield = bar ' +
+                          'WHERE foo.uid = {uid}' +
+                          ' RETURNING *').format(uid=rds['uid']))
+        #: Update unchanged
+        self.model.reset_changed()
+        self.assertIsNone(self.model.dry().update())
+        self.assertFalse(self.model._dry)
+        self.assertIsNone(self.model.update())
+
+    def test_changed_fields(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        self.assertTupleEqual(model.changed_fields, tuple())
+        model.fill(uid=1234567, textfield='foo')
+        self.assertTupleEqual(model.changed_fields,
+                              (model.uid, model.textfield))
+        model.save()
+        self.assertTupleEqual(model.changed_fields, tuple())
+        model['textfield'] = 'bar'
+        self.assertTupleEqual(model.changed_fields, (model.textfield,))
+        self.assertTupleEqual(model.copy().changed_fields,
+                              (model.textfield,))
+        self.assertIn('SET textfield = EXCLUDED.textfield',
+                      model.dry().save().query)
+        model.one().update()
+        self.assertTupleEqual(model.changed_fields, tuple())
+        model.clear()
+        model['uid'] = 1234567
+        model.get()
+        self.assertEqual(model.textfield.value, 'bar')
+        self.assertTupleEqual(model.changed_fields, tuple())
+        model.textfield('baz')
+        model.update_many([model])
+        self.assertTupleEqual(model.changed_fields, tuple())
+        model.where(True).delete()
+
+    def test_changed_fields_encrypted(self):
+        model = FooSecret()
+        model.fill(uid=1, secret='foo')
+        self.assertTupleEqual(model.changed_fields,
+                              (model.uid, model.secret))
+        model.save()
+        self.assertTupleEqual(model.changed_fields, tuple())
+        self.assertTupleEqual(model.copy().changed_fields, tuple())
+        self.assertIsNone(model.update())
+        model.secret('bar')
+        self.assertTupleEqual(model.changed_fields, (model.secret,))
+        model.one().update()
+        self.assertTupleEqual(model.changed_fields, tuple())
+        model.clear()
+        model['uid'] = 1
+        model.get()
+        self.assertEqual(model.secret.value, 'bar')
+        self.assertTupleEqual(model.changed_fields, tuple())
+        for reuse in (0, True):
+            lazy = model.copy().set_lazy()
+            for result in lazy.iter(reuse=reuse):
+                self.assertEqual(result.secret.value, 'bar')
+                self.assertTupleEqual(result.changed_fields, tuple())
+        model.where(True).delete()
 
     def test_update_factory(self):
         rds = {
@@ -428,16 +539,17 @@ class TestModel(configure.BaseTestCase):
         }
         self.model.fill(**rds)
         self.model.insert()
+        fields = self.model.fields
         # Updates return lists by default
-        result = self.model.update()
+        result = self.model.update(*fields)
         self.assertIsInstance(result, list)
         self.assertIsInstance(result[0], self.model.__class__)
-        result = self.model.naked().update()
+        result = self.model.naked().update(*fields)
         self.assertIsInstance(result[0], self._FACTORY_TYPE)
         # Update one returns self
-        result = self.model.one().update()
+        result = self.model.one().update(*fields)
         self.assertIs(result, self.model)
-        result = self.model.naked().update()
+        result = self.model.naked().update(*fields)
         self.assertIsInstance(result[0], self._FACTORY_TYPE)
 
     def test_update_raises(self):
@@ -492,7 +604,48 @@ class TestModel(configure.BaseTestCase):
         self.assertIs(self.model, result)
         self.assertEqual(result.textfield.value, rds['textfield'])
         self.assertEqual(result.uid.value, rds['uid'])
-        self.assertEqual(q.__querytype__, 'UPDATE')
+        # Updates are a single INSERT ... ON CONFLICT round trip
+        self.assertEqual(q.__querytype__, 'INSERT')
+        self.assertIn('ON CONFLICT (uid) DO UPDATE', q.query)
+
+    def test_save_upsert(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        model.fill(uid=1234567, textfield='foo')
+        model.save()
+        model['textfield'] = 'bar'
+        self.assertIs(model.save(), model)
+        self.assertEqual(model.textfield.value, 'bar')
+        res = model.naked().where(model.uid == 1234567).select()
+        self.assertEqual(len(res), 1)
+        self.assertEqual(self._gres(res[0], 'textfield'), 'bar')
+        # Empty fields are left as they are
+        model.clear()
+        model['uid'] = 1234567
+        self.assertIs(model.save(), model)
+        self.assertEqual(model.textfield.value, 'bar')
+        # Models without unique values are inserted
+        model.clear()
+        model['textfield'] = 'baz'
+        self.assertNotIn('ON CONFLICT', model.dry().save().query)
+        model.where(True).delete()
+
+    def test_save_partial(self):
+        model = FooRequired()
+        model.where(True).delete()
+        model.fill(uid=1, textfield='foo')
+        model.save()
+        # The record is updated without proposing the partial model for
+        # insertion, which would violate |NOT NULL|
+        model = FooRequired()
+        model.fill(uid=1, intfield=2)
+        self.assertNotIn('ON CONFLICT', model.copy().dry().save().query)
+        self.assertIs(model.save(), model)
+        res = model.where(model.uid == 1).select()
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0].textfield.value, 'foo')
+        self.assertEqual(res[0].intfield.value, 2)
+        model.where(True).delete()
 
     def test_save_factory(self):
         rds = {
@@ -713,6 +866,67 @@ class TestModel(configure.BaseTestCase):
             raws.append(x)
         self.assertEqual(len(raws), 10)
 
+    def test_model_cursor(self):
+        self.fill(3)
+        model = self.model.copy()
+        conn = model.db.get()
+        cursor = model.get_cursor(conn)
+        cursor.execute('SELECT uid, textfield, 1 AS uid2 '
+                       'FROM cargo_tests.foo ORDER BY uid')
+        with self.assertRaises(KeyError):
+            cursor.fetchone()
+        cursor.execute('SELECT textfield, uid FROM cargo_tests.foo '
+                       'ORDER BY uid')
+        self.assertIsNone(cursor._plan)
+        results = cursor.fetchall()
+        self.assertEqual(cursor._plan, (((0, 'textfield'), (1, 'uid')), ()))
+        self.assertListEqual([x.uid.value for x in results],
+                             [1234567, 1234568, 1234569])
+        for result in results:
+            self.assertEqual(result.textfield.value, 'bar')
+            self.assertFalse(result.changed_fields)
+        model.db.put(conn)
+
+    def test_set_lazy(self):
+        self.fill(2)
+        model = self.model.copy().set_lazy()
+        results = model.where(True).order_by(model.uid.asc()).select()
+        result = results[0]
+        self.assertIsNot(type(result.uid), type(model.uid))
+        self.assertEqual(result.uid.value, 1234567)
+        self.assertIs(type(result.uid), type(model.uid))
+        self.assertIsNot(type(result.textfield), type(model.textfield))
+        self.assertFalse(result.changed_fields)
+        result.textfield('foo')
+        self.assertEqual(result.changed_fields, (result.textfield,))
+        result = results[1].materialize()
+        for field in result.fields:
+            self.assertIs(type(field), type(getattr(model, field.field_name)))
+        self.assertEqual(result.to_dict(),
+                         {'uid': 1234568, 'textfield': 'bar'})
+        model.set_lazy(False)
+        result = model.where(True).get()
+        self.assertIs(type(result.uid), type(model.uid))
+
+    def test_iter_reuse(self):
+        self.fill(10)
+        model = self.model.copy()
+        res = [(x.uid.value, x.textfield.value)
+               for x in model.iter(buffer=4)]
+        models = []
+        for x in model.iter(buffer=4, reuse=True):
+            self.assertIsInstance(x, model.__class__)
+            self.assertEqual((x.uid.value, x.textfield.value),
+                             res[len(models)])
+            models.append(x)
+        self.assertEqual(len(models), 10)
+        self.assertEqual(len(set(map(id, models))), 4)
+        self.assertIs(models[0], models[4])
+        self.assertIsNot(models[0], models[1])
+        for x in model.iter(buffer=4, reuse=True, fields=[model.uid]):
+            self.assertIs(x.textfield.value, x.textfield.empty)
+            self.assertFalse(x.changed_fields)
+
     def test_iter(self):
         self.fill(10)
         res = []
@@ -740,6 +954,359 @@ class TestModel(configure.BaseTestCase):
             res4.append(x)
         self.assertEqual(len(res4), 8)
 
+    def test_iternaked_stream(self):
+        self.fill(10)
+        raws = []
+        for x in self.model.iternaked(stream=True, buffer=3):
+            self.assertIsInstance(x, self._FACTORY_TYPE)
+            raws.append(x)
+        self.assertEqual(len(raws), 10)
+
+    def test_iter_stream(self):
+        self.fill(10)
+        res = [x for x in self.model.iter()]
+        res2 = []
+        for x in self.model.iter(stream=True, buffer=3):
+            self.assertIsInstance(x, self.model.__class__)
+            res2.append(x)
+        self.assertEqual([x.uid.value for x in res],
+                         [x.uid.value for x in res2])
+
+        res3 = []
+        for x in self.model.iter(offset=2, limit=2, stream=True):
+            res3.append(x)
+        self.assertListEqual([x.uid.value for x in res3],
+                             [x.uid.value for x in res[2:4]])
+
+        res4 = []
+        for x in self.model.iter(stream=True, withhold=True, buffer=1):
+            res4.append(x)
+        self.assertEqual(len(res4), 10)
+
+    def test_keyset(self):
+        self.fill(10)
+        model = self.model.copy()
+        uids, token = [], None
+        while True:
+            results, token = model.keyset(token, limit=3)
+            uids.extend(x.uid.value for x in results)
+            if token is None:
+                break
+        self.assertListEqual(uids, [1234567 + x for x in range(10)])
+        results, token = model.naked().keyset(limit=4, reverse=True)
+        results, token = model.keyset(token, limit=4)
+        self.assertListEqual([self._gres(x, 'uid') for x in results],
+                             [1234572, 1234571, 1234570, 1234569])
+        results, token = model.keyset(limit=5, fields=('textfield', 'uid'))
+        results, token = model.keyset(token, limit=5)
+        self.assertEqual(self._gres(results[0], 'uid'), 1234572)
+        self.assertEqual(model.keyset(token, limit=5), ([], None))
+        with self.assertRaises(ValueError):
+            model.keyset('W1siZm9vIl0sIFsxXSwgZmFsc2Vd')
+
+    def test_iter_token(self):
+        self.fill(10)
+        model = self.model.copy()
+        token = model.make_token(model.where(model.uid == 1234570).get())
+        self.assertListEqual([x.uid.value for x in model.iter(token=token,
+                                                              limit=3)],
+                             [1234571, 1234572, 1234573])
+        token = model.make_token({'uid': 1234570}, reverse=True)
+        self.assertListEqual([x.uid.value for x in model.iter(token=token)],
+                             [1234569, 1234568, 1234567])
+
+    def test_iter_stream_early_exit(self):
+        self.fill(10)
+        gen = self.model.iter(stream=True, buffer=2)
+        self.assertIsInstance(next(gen), self.model.__class__)
+        gen.close()
+        self.assertEqual(len([x for x in self.model.iter(stream=True)]), 10)
+
+    def test_copy_in(self):
+        self.model.where(True).delete()
+        rows = ((1234567 + x, 'bar\t%s\n' % x) for x in range(1000))
+        self.assertEqual(self.model.copy_in(rows, chunk_size=256), 1000)
+        self.assertEqual(len(self.model.select()), 1000)
+        for x in self.model.naked().where(self.model.uid < 1234570).select():
+            self.assertEqual(self._gres(x, 'textfield'),
+                             'bar\t%s\n' % (self._gres(x, 'uid') - 1234567))
+        self.model.where(True).delete()
+
+    def test_copy_in_fields(self):
+        self.model.where(True).delete()
+        rows = [{'uid': 1}, {'uid': 2, 'textfield': 'foo'}]
+        self.assertEqual(self.model.copy_in(rows), 2)
+        rows = [{'uid': 3, 'textfield': 'foo'}]
+        self.assertEqual(self.model.copy_in(rows, self.model.uid), 1)
+        res = self.model.where(self.model.textfield == 'foo').select()
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0].uid.value, 2)
+        self.model.where(True).delete()
+
+    def test_copy_in_defaults(self):
+        model = FooSerial()
+        model.where(True).delete()
+        rows = [{'textfield': 'foo'}, {'textfield': 'bar'},
+                {'uid': 1000, 'textfield': 'baz'}]
+        self.assertEqual(model.copy_in(rows), 3)
+        res = model.order_by(model.textfield.asc()).select()
+        self.assertListEqual([x.textfield.value for x in res],
+                             ['bar', 'baz', 'foo'])
+        self.assertEqual(res[1].uid.value, 1000)
+        self.assertIsNotNone(res[0].uid.value)
+        self.assertIsNotNone(res[2].uid.value)
+        res = model.copy_in([{'textfield': 'qux'}], returning=True)
+        self.assertIsNotNone(res[0].uid.value)
+        model.where(True).delete()
+
+    def test_copy_in_returning(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        rows = ((1234567 + x, None) for x in range(10))
+        res = model.copy_in(rows, returning=True)
+        self.assertEqual(len(res), 10)
+        for i, x in enumerate(res):
+            self.assertIsInstance(x, model.__class__)
+            self.assertEqual(x.uid.value, 1234567 + i)
+            self.assertIsNone(x.textfield.value)
+        with self.assertRaises(QueryError):
+            model.copy_in(((x.uid.value, 'bar') for x in res),
+                          returning=True)
+        model.where(True).delete()
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_to_columns(self):
+        self.fill(5)
+        model = self.model.copy()
+        columns = model.where(model.uid > 1234568).to_columns(model.uid)
+        self.assertListEqual(list(columns), ['uid'])
+        self.assertEqual(columns['uid'].dtype, np.int32)
+        self.assertListEqual(sorted(columns['uid'].tolist()),
+                             [1234569, 1234570, 1234571])
+        self.assertFalse(model.state.has('WHERE'))
+        columns = model.to_columns()
+        self.assertListEqual(list(columns), list(model.field_names))
+        self.assertListEqual(columns['textfield'].tolist(), ['bar'] * 5)
+
+    def test_copy_out(self):
+        self.fill(5)
+        model = self.model.copy()
+        f = io.StringIO()
+        model.where(model.uid > 1234569).order_by(model.uid.asc())
+        self.assertEqual(model.copy_out(f, model.uid, format='json'), 2)
+        self.assertListEqual(list(map(json.loads, f.getvalue().splitlines())),
+                             [{'uid': 1234570}, {'uid': 1234571}])
+        self.assertFalse(model.state.has('WHERE'))
+        f = io.BytesIO()
+        self.assertEqual(model.copy_out(f, format='binary'), 5)
+        self.assertTrue(f.getvalue().startswith(b'PGCOPY\n'))
+
+    def test_copy_in_binary(self):
+        self.model.where(True).delete()
+        rows = ((1234567 + x, 'bar\t%s\n' % x) for x in range(1000))
+        self.assertEqual(self.model.copy_in(rows, chunk_size=256, binary=True),
+                         1000)
+        self.assertEqual(len(self.model.select()), 1000)
+        for x in self.model.naked().where(self.model.uid < 1234570).select():
+            self.assertEqual(self._gres(x, 'textfield'),
+                             'bar\t%s\n' % (self._gres(x, 'uid') - 1234567))
+        rows = [{'uid': 1}, {'uid': 2, 'textfield': 'foo'}]
+        self.assertEqual(self.model.copy_in(rows, binary=True), 2)
+        res = self.model.naked().where(self.model.uid < 3).select()
+        self.assertEqual(len(res), 2)
+        self.model.where(True).delete()
+
+    def test_insert_many(self):
+        self.model.where(True).delete()
+        rows = ({'uid': 1234567 + x, 'textfield': 'bar%s' % x}
+                for x in range(250))
+        self.assertEqual(self.model.insert_many(rows, page_size=100), 250)
+        self.assertEqual(len(self.model.select()), 250)
+        rows = [(1, 'foo'), (2, None)]
+        self.assertEqual(self.model.insert_many(rows), 2)
+        res = self.model.naked().where(self.model.uid < 3).select()
+        self.assertEqual(len(res), 2)
+        with self.assertRaises(QueryError):
+            self.model.insert_many([(1, 'foo')])
+        self.model.where(True).delete()
+
+    def test_insert_many_returning(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        rows = [{'uid': 1234567 + x} for x in range(10)]
+        res = model.insert_many(rows, returning=True, page_size=3)
+        self.assertEqual(len(res), 10)
+        for i, x in enumerate(res):
+            self.assertIsInstance(x, model.__class__)
+            self.assertEqual(x.uid.value, 1234567 + i)
+            self.assertIsNone(x.textfield.value)
+        model.where(True).delete()
+
+    def test_update_many(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        model.insert_many((1234567 + x, 'foo') for x in range(10))
+        rows = [{'uid': 1234567 + x, 'textfield': 'bar%s' % x}
+                for x in range(5)]
+        model.update_many(rows, page_size=2)
+        res = model.naked().where(model.textfield != 'foo').select()
+        self.assertEqual(len(res), 5)
+        for x in res:
+            self.assertEqual(self._gres(x, 'textfield'),
+                             'bar%s' % (self._gres(x, 'uid') - 1234567))
+        #: Missing values leave the column unchanged
+        model.update_many([{'uid': 1234567}])
+        model.where(model.uid == 1234567)
+        self.assertEqual(self._gres(model.naked().get(), 'textfield'), 'bar0')
+        with self.assertRaises(ORMIndexError):
+            model.update_many([{'textfield': 'bar'}])
+        model.where(True).delete()
+
+    def test_bulk_update(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        models = model.insert_many(((1234567 + x, 'foo') for x in range(10)),
+                                   returning=True)
+        for x in models:
+            x['textfield'] = 'bar%s' % (x.uid.value - 1234567)
+        self.assertListEqual(model.bulk_update(models, chunk_size=4),
+                             [4, 4, 2])
+        res = model.naked().where(model.textfield != 'foo').select()
+        self.assertEqual(len(res), 10)
+        for x in res:
+            self.assertEqual(self._gres(x, 'textfield'),
+                             'bar%s' % (self._gres(x, 'uid') - 1234567))
+        rows = [{'uid': 1234567, 'textfield': None},
+                {'uid': 1, 'textfield': 'x'}]
+        self.assertListEqual(model.bulk_update(rows, model.textfield), [1])
+        with self.assertRaises(ValueError):
+            model.bulk_update([{'uid': 1234567}, {'uid': 1, 'textfield': 'x'}])
+        self.assertListEqual(model.bulk_update([{'uid': 1234567}]), [0])
+        model.where(True).delete()
+
+    def test_bulk_update_pool(self):
+        pool = PostgresPool(1, 4)
+        model = Foo(client=pool)
+        model.where(True).delete()
+        model.insert_many((1234567 + x, 'foo') for x in range(100))
+        rows = ({'uid': 1234567 + x, 'textfield': 'bar'} for x in range(100))
+        self.assertListEqual(model.bulk_update(rows, chunk_size=10, workers=4),
+                             [10] * 10)
+        self.assertEqual(len(model.where(model.textfield == 'bar').select()),
+                         100)
+        model.where(True).delete()
+        pool.close()
+
+    def test_bulk_update_pool_lazy(self):
+        pool = PostgresPool(1, 2)
+        model = Foo(client=pool)
+        model.where(True).delete()
+        model.insert_many((1234567 + x, 'foo') for x in range(1000))
+        execute = model.execute
+        updated, ahead = [], []
+
+        def counted_execute(*args, **kwargs):
+            result = execute(*args, **kwargs)
+            updated.append(1)
+            return result
+        model.execute = counted_execute
+
+        def rows():
+            for x in range(1000):
+                ahead.append(x - len(updated) * 10)
+                yield {'uid': 1234567 + x, 'textfield': 'bar'}
+        self.assertListEqual(model.bulk_update(rows(), chunk_size=10,
+                                               workers=2),
+                             [10] * 100)
+        #: At most workers * 2 chunks in flight, plus the one being read
+        self.assertLessEqual(max(ahead), 50)
+        del model.execute
+        model.where(True).delete()
+        pool.close()
+
+    def test_bulk_upsert(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        model.insert_many((1234567 + x, 'foo') for x in range(5))
+        rows = ({'uid': 1234567 + x, 'textfield': 'bar'} for x in range(10))
+        self.assertTupleEqual(model.bulk_upsert(rows, chunk_size=3), (5, 5))
+        self.assertEqual(len(model.where(model.textfield == 'bar').select()),
+                         10)
+        rows = [(1234567, 'foo'), (1, 'foo')]
+        self.assertTupleEqual(
+            model.bulk_upsert(rows, conflict_field=model.uid,
+                              update_fields=()),
+            (1, 0))
+        self.assertEqual(len(model.where(model.textfield == 'foo').select()),
+                         1)
+        with self.assertRaises(QueryError):
+            model.bulk_upsert([(1, 'foo'), (1, 'bar')])
+        model.where(True).delete()
+
+    def test_bulk_upsert_copy(self):
+        model = self.model.copy()
+        model.where(True).delete()
+        model.insert_many((1234567 + x, 'foo') for x in range(5))
+        rows = ((1234567 + x, 'bar') for x in range(10))
+        self.assertTupleEqual(model.bulk_upsert(rows, copy_threshold=10),
+                              (5, 5))
+        self.assertEqual(len(model.where(model.textfield == 'bar').select()),
+                         10)
+        with self.assertRaises(QueryError):
+            model.bulk_upsert([(1, 'foo'), (1, 'bar')], copy_threshold=0)
+        self.assertEqual(len(model.where(True).select()), 10)
+        model.where(True).delete()
+
+    def test_bulk_upsert_autocommit(self):
+        client = Postgres(autocommit=True)
+        model = self.model.copy()
+        model.where(True).delete()
+        model = model.__class__(client=client)
+        rows = [(1, 'foo'), (2, 'foo'), (2, 'bar'), (2, 'baz')]
+        for copy_threshold in (None, 0):
+            with self.assertRaises(QueryError):
+                model.bulk_upsert(rows, chunk_size=2,
+                                  copy_threshold=copy_threshold)
+            #: Nothing is committed and the staging table is dropped
+            self.assertListEqual(model.where(True).select(), [])
+            cursor = client.cursor()
+            cursor.execute("SELECT count(*) FROM pg_tables "
+                           "WHERE tablename LIKE 'cargo_upsert_%%'")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertTupleEqual(model.bulk_upsert(rows[:2], copy_threshold=0),
+                              (2, 0))
+        self.assertEqual(len(model.where(True).select()), 2)
+        model.where(True).delete()
+        client.close()
+
+    def test_bulk_upsert_missing_fields(self):
+        results = []
+        for copy_threshold in (None, 0):
+            model = self.model.copy()
+            model.where(True).delete()
+            model.insert_many((x, 'foo') for x in range(1, 4))
+            rows = [{'uid': 1}, {'uid': 2, 'textfield': 'bar'}, {'uid': 10}]
+            self.assertTupleEqual(
+                model.bulk_upsert(rows, copy_threshold=copy_threshold),
+                (1, 1))
+            model.naked().order_by(model.uid.asc())
+            results.append([(self._gres(x, 'uid'), self._gres(x, 'textfield'))
+                            for x in model.select()])
+            model.where(True).delete()
+        self.assertListEqual(results[0],
+                             [(1, 'foo'), (2, 'bar'), (3, 'foo'), (10, None)])
+        self.assertListEqual(results[0], results[1])
+        model = FooSerial()
+        model.where(True).delete()
+        for copy_threshold in (None, 0):
+            self.assertTupleEqual(
+                model.bulk_upsert([{'textfield': 'foo'}],
+                                  copy_threshold=copy_threshold),
+                (1, 0))
+        self.assertEqual(len(model.where(model.textfield == 'foo').select()),
+                         2)
+        model.where(True).delete()
+
     def test_reset_fields(self):
         rds = {
             'textfield': randkey(48),
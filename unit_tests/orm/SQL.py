@@ -6,13 +6,22 @@
    2016 Jared Lunde © The MIT License (MIT)
    http://github.com/jaredlunde
 """
+import io
 import copy
+import gzip
+import json
 import types
+import unittest
 import pickle
 import random
 import psycopg2.extras
 from cnamedtuple import namedtuple
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from cargo import *
 from cargo.orm import ORM, QueryState
 
@@ -416,6 +425,27 @@ class TestORM(configure.BaseTestCase):
                 clause.string % clause.params, 'OFFSET {}'.format(offset))
             self.orm.reset()
 
+    def test_seek(self):
+        f1, f2 = new_field('int'), new_field('text')
+        s = self.orm.seek((f1, f2), (1, 'foo'), 10)
+        self.assertIs(s, self.orm)
+        where = self.orm.state.get('WHERE')
+        self.assertEqual(where.string % where.params,
+                         "WHERE (%s, %s) > (1, foo)" % (f1.name, f2.name))
+        order_by = self.orm.state.get('ORDER BY')
+        self.assertEqual(order_by.string, "ORDER BY %s ASC, %s ASC" %
+                         (f1.name, f2.name))
+        self.orm.reset()
+        self.orm.seek((f1,), (1,), reverse=True)
+        where = self.orm.state.get('WHERE')
+        self.assertEqual(where.string % where.params,
+                         "WHERE (%s) < (1)" % f1.name)
+        self.orm.reset()
+        self.orm.seek((f1,), limit=None)
+        self.assertFalse(self.orm.state.has('WHERE'))
+        self.assertFalse(self.orm.state.has('LIMIT'))
+        self.orm.reset()
+
     def test_having(self):
         field = new_field('int')
         for f in (
@@ -574,6 +604,39 @@ class TestORM(configure.BaseTestCase):
         result = self.orm.use('foo').dry().get()
         self.assertIsInstance(result, Query)
 
+    def test_record_cache(self):
+        orm = ORM(cursor_factory=CNamedTupleCursor, schema='cargo_tests')
+        a = orm.execute('SELECT 1 AS uid, 2 AS textfield').fetchall()
+        b = orm.execute('SELECT 3 AS uid, 4 AS textfield').fetchone()
+        c = orm.execute('SELECT 5 AS uid, 6 AS other').fetchone()
+        self.assertIs(a[0].__class__, b.__class__)
+        self.assertIsNot(a[0].__class__, c.__class__)
+        self.assertIs(a[0].__class__, make_record(('uid', 'textfield')))
+        self.assertEqual(b.textfield, 4)
+        self.assertEqual(c.other, 6)
+        orm.close()
+
+    def test_row_cursor(self):
+        orm = ORM(cursor_factory=RowCursor, schema='cargo_tests')
+        row = orm.execute('SELECT 1 AS uid, 2 AS textfield').fetchone()
+        self.assertIsInstance(row, tuple)
+        self.assertEqual(row, (1, 2))
+        self.assertEqual(row.textfield, 2)
+        self.assertEqual(row['textfield'], 2)
+        self.assertEqual(row[-1], 2)
+        self.assertTupleEqual(row.keys(), ('uid', 'textfield'))
+        self.assertEqual(pickle.loads(pickle.dumps(row)), row)
+        with self.assertRaises(KeyError):
+            row['foo']
+        with self.assertRaises(AttributeError):
+            row.foo
+        rows = orm.execute('SELECT 3 AS uid, 4 AS textfield').fetchall()
+        self.assertIs(rows[0].__class__, row.__class__)
+        self.assertListEqual(
+            list(orm.execute('SELECT generate_series(1, 3) AS uid')),
+            [(1,), (2,), (3,)])
+        orm.close()
+
     def test_select_cursor_factories(self):
         self.populate()
         orm = ORM(cursor_factory=CNamedTupleCursor, schema='cargo_tests')
@@ -747,6 +810,135 @@ class TestORM(configure.BaseTestCase):
         with self.assertRaises(QueryError):
             self.orm.execute('SELECT ORDER').fetchall()
 
+    def test_execute_search_path(self):
+        orm = ORM(client=Postgres(), schema='cargo_tests')
+        stats = orm.db.search_path_stats
+        orm.execute('SELECT 1')
+        orm.execute('SELECT 2')
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.hits, 1)
+        orm.set_schema('public')
+        orm.execute('SELECT 3')
+        self.assertEqual(stats.misses, 2)
+        with self.assertRaises(QueryError):
+            orm.execute('SELECT ORDER')
+        orm.execute('SELECT 4')
+        self.assertEqual(stats.misses, 3)
+        orm.close()
+
+    def test_execute_paramstyle(self):
+        for paramstyle in ('named', 'positional', None):
+            self.orm.set_paramstyle(paramstyle)
+            cursor = self.orm.execute('SELECT %(a)s, %(b)s, %(a)s',
+                                      {'a': 1, 'b': 2})
+            self.assertEqual(cursor.query.decode(), 'SELECT 1, 2, 1')
+        self.orm.set_paramstyle('named')
+
+    def test_copy_in(self):
+        f1 = new_field('int', name='uid', table='foo')
+        f2 = new_field('text', name='textfield', table='foo')
+        rows = ((x, 'bar\\%s' % x) for x in range(100))
+        self.assertEqual(self.orm.copy_in(rows, f1, 'textfield', table='foo'),
+                         100)
+        res = self.orm.use('foo').where(f1 < 2).select(f1, f2)
+        self.assertEqual(len(res), 2)
+        res = self.orm.copy_in([(100, None)], f1, f2, table='foo',
+                               returning=True)
+        self.assertEqual(len(res), 1)
+        with self.assertRaises(QueryError):
+            self.orm.copy_in([(1, 'bar')], f1, f2, table='foo')
+        with self.assertRaises(TypeError):
+            self.orm.copy_in([(1, 'bar')], f1, f2, table='foo',
+                             encoders=(None, None))
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_fetch_columns(self):
+        self.populate()
+        orm = ORM(schema='cargo_tests')
+        columns = orm.fetch_columns(
+            'SELECT uid, textfield, uid > 3 AS big, NULL::int AS nothing '
+            'FROM foo ORDER BY uid', chunk_size=2)
+        self.assertListEqual(list(columns),
+                             ['uid', 'textfield', 'big', 'nothing'])
+        self.assertEqual(columns['uid'].dtype, np.int32)
+        self.assertEqual(columns['big'].dtype, np.bool_)
+        self.assertEqual(columns['textfield'].dtype, object)
+        self.assertEqual(columns['nothing'].dtype, np.float64)
+        self.assertEqual(len(columns['uid']), len(columns['textfield']))
+        self.assertTrue(np.isnan(columns['nothing']).all())
+        columns = orm.fetch_columns('SELECT uid FROM foo WHERE false')
+        self.assertEqual(len(columns['uid']), 0)
+        orm.close()
+
+    def test_copy_out(self):
+        self.populate()
+        q = 'SELECT uid, textfield FROM foo WHERE uid > %s ORDER BY uid'
+        f = io.StringIO()
+        self.assertEqual(self.orm.copy_out(f, q, (12345,), header=True), 2)
+        self.assertEqual(f.getvalue(),
+                         'uid,textfield\n123456,bar\n1234567,bar\n')
+        f = io.StringIO()
+        self.orm.copy_out(f, q, (12345,), format='text')
+        self.assertEqual(f.getvalue(), '123456\tbar\n1234567\tbar\n')
+        f = io.BytesIO()
+        self.orm.copy_out(f, 'SELECT \'"a\\b"\' AS t', format='json',
+                          compress=True)
+        self.assertEqual(json.loads(gzip.decompress(f.getvalue()).decode()),
+                         {'t': '"a\\b"'})
+        with self.assertRaises(QueryError):
+            self.orm.copy_out(f, 'SELECT * FROM foo_does_not_exist')
+        with self.assertRaises(ValueError):
+            self.orm.copy_out(f, q, (12345,), format='json', header=True)
+
+    def test_copy_in_binary(self):
+        f1 = new_field('int', name='uid', table='foo')
+        f2 = new_field('text', name='textfield', table='foo')
+        rows = ((x, 'bar\\%s' % x) for x in range(100))
+        self.assertEqual(self.orm.copy_in(rows, f1, f2, table='foo',
+                                          binary=True),
+                         100)
+        res = self.orm.use('foo').where(f1 < 2).select(f1, f2)
+        self.assertEqual(len(res), 2)
+        res = self.orm.copy_in([(100, None)], f1, f2, table='foo',
+                               returning=True, binary=True)
+        self.assertEqual(len(res), 1)
+        with self.assertRaises(QueryError):
+            self.orm.copy_in([(1, 'bar')], f1, f2, table='foo', binary=True)
+        with self.assertRaises(TypeError):
+            self.orm.copy_in([(1, 'bar')], f1, 'textfield', table='foo',
+                             binary=True)
+
+    def test_execute_values(self):
+        f1 = new_field('int', name='uid', table='foo')
+        rows = ((x, 'bar%s' % x) for x in range(100))
+        self.assertIsNone(
+            self.orm.execute_values(
+                'INSERT INTO foo (uid, textfield) VALUES %s', rows,
+                page_size=30))
+        res = self.orm.use('foo').where(f1 < 2).select(f1)
+        self.assertEqual(len(res), 2)
+        res = self.orm.execute_values(
+            'INSERT INTO foo (uid, textfield) VALUES %s RETURNING uid',
+            [(100, None), (101, None)], template='(%s, %s)', fetch=True)
+        self.assertEqual(len(res), 2)
+        with self.assertRaises(QueryError):
+            self.orm.execute_values(
+                'INSERT INTO foo (uid, textfield) VALUES %s', [(1, 'bar')])
+
+    def test_execute_batch(self):
+        f1 = new_field('int', name='uid', table='foo')
+        f2 = new_field('text', name='textfield', table='foo')
+        self.orm.execute_values('INSERT INTO foo (uid) VALUES %s',
+                                [(x,) for x in range(10)])
+        self.orm.execute_batch(
+            'UPDATE foo SET textfield = %(text)s WHERE uid = %(uid)s',
+            ({'uid': x, 'text': 'bar%s' % x} for x in range(10)),
+            page_size=3)
+        res = self.orm.use('foo').where(f2.like('bar%')).select(f1, f2)
+        self.assertEqual(len(res), 10)
+        res = self.orm.use('foo').where(f1 == 3, f2 == 'bar3').select(f1)
+        self.assertEqual(len(res), 1)
+
     def test_multi(self):
         orm = self.orm
         orm.multi()
@@ -9,8 +9,10 @@
 import copy
 import pickle
 import unittest
+import uuid
 
-from cargo import Model, UID, RelationshipImportError, Field
+from cargo import Model, UID, UUID, Int, Text, RelationshipImportError, \
+                  Field
 from cargo.relationships import Relationship, ForeignKey
 
 from unit_tests import configure
@@ -36,6 +38,31 @@ class FooD(Model):
     owner = ForeignKey('Foo.uids')
 
 
+class Company(Model):
+    schema = 'cargo_tests'
+    uid = Int(primary=True)
+    name = Text()
+
+
+class Author(Model):
+    schema = 'cargo_tests'
+    uid = Int(primary=True)
+    name = Text()
+    company = ForeignKey('Company.uid')
+
+
+class Team(Model):
+    schema = 'cargo_tests'
+    uid = UUID(primary=True)
+    players = Relationship('Player.team')
+
+
+class Player(Model):
+    schema = 'cargo_tests'
+    uid = Int(primary=True)
+    team = ForeignKey('Team.uid')
+
+
 class TestForeignKey(unittest.TestCase):
 
     def test___init__(self):
@@ -79,6 +106,34 @@ class TestForeignKey(unittest.TestCase):
                 self.assertIs(s, model)
                 self.assertEqual(str(clause), validate.format(clause.clause))
 
+    def test_pull_prefetched(self):
+        model, modelb = FooB(), FooB()
+        model['owner'] = 6719
+        modelb['owner'] = 6719
+        owner = Foo(uid=6719)
+        model.owner.ref = model.owner.ref.with_prefetched(6719, owner)
+        self.assertIs(model.owner.pull(), owner)
+        self.assertIsNone(modelb.owner.ref.prefetched)
+        q = model.owner.pull(dry=True)
+        self.assertEqual(q.query % q.params,
+                         'SELECT * FROM foo WHERE foo.uid = 6719')
+        model['owner'] = 6720
+        q = model.owner.pull(dry=True)
+        self.assertEqual(q.query % q.params,
+                         'SELECT * FROM foo WHERE foo.uid = 6720')
+
+    def test_select_related(self):
+        model = FooB()
+        q = model.select_related('owner').where(True).dry().select()
+        self.assertIn('_owner.uid AS "_owner.uid"', q.query)
+        self.assertIn('LEFT JOIN foo _owner ON foo_b.owner = _owner.uid',
+                      q.query)
+        model.reset()
+        with self.assertRaises(ValueError):
+            model.select_related('uid')
+        with self.assertRaises(ValueError):
+            model.select_related('owner.uid')
+
     def test_copy(self):
         model = FooB()
         modelb = FooB()
@@ -104,6 +159,76 @@ class TestForeignKey(unittest.TestCase):
         self.assertEqual(b.owner.ref.model.table, model.owner.ref.model.table)
 
 
+class TestSelectRelated(unittest.TestCase):
+
+    @staticmethod
+    def setUpClass():
+        configure.setup()
+        configure.Plan(Company()).execute()
+        configure.Plan(Author()).execute()
+        Company().insert_many([{'uid': 1, 'name': 'Acme'}])
+        Author().insert_many([{'uid': 1, 'name': 'foo', 'company': 1},
+                              {'uid': 2, 'name': 'bar', 'company': None}])
+
+    @staticmethod
+    def tearDownClass():
+        configure.cleanup()
+
+    def test_select_related(self):
+        model = Author()
+        model.select_related('company').order_by(model.uid.asc())
+        foo, bar = model.where(True).select()
+        self.assertNotIn('_related', model.__dict__)
+        company = foo.company.ref.model
+        self.assertIsInstance(company, Company)
+        self.assertEqual(company.uid.value, 1)
+        self.assertEqual(company.name.value, 'Acme')
+        self.assertTupleEqual(company.changed_fields, tuple())
+        self.assertTupleEqual(foo.changed_fields, tuple())
+        self.assertIs(foo.company.pull(), company)
+        # The LEFT JOIN found no company
+        self.assertIsNone(bar.company.value)
+        self.assertIsNone(bar.company.ref.prefetched)
+        self.assertIsNot(bar.company.ref.model, company)
+        self.assertIs(bar.company.ref.model.uid.value, Field.empty)
+        author = model.select_related('company').where(
+            model.uid == 1).get()
+        self.assertEqual(author.company.ref.model.name.value, 'Acme')
+
+
+class TestPrefetch(unittest.TestCase):
+
+    @staticmethod
+    def setUpClass():
+        configure.setup()
+        configure.Plan(Team()).execute()
+        configure.Plan(Player()).execute()
+
+    @staticmethod
+    def tearDownClass():
+        configure.cleanup()
+
+    def test_prefetch_uuid(self):
+        a, b = (str(uuid.uuid4()) for _ in range(2))
+        rows = [{'uid': 1, 'team': a},
+                {'uid': 2, 'team': a},
+                {'uid': 3, 'team': b}]
+        Team().insert_many([{'uid': a}, {'uid': b}])
+        Player().insert_many(rows)
+        #: Keys assigned as strings are cast to the type of the column
+        players = [Player().fill(**row) for row in rows]
+        Player().prefetch(players, 'team')
+        for player in players:
+            prefetched = player.team.ref.prefetched
+            self.assertIsNotNone(prefetched[1])
+            self.assertEqual(str(prefetched[1].uid.value),
+                             player.team.value)
+        teams = [Team().fill(uid=a), Team().fill(uid=b)]
+        Team().prefetch(teams, 'players')
+        self.assertListEqual([len(team.players.pull()) for team in teams],
+                             [2, 1])
+
 if __name__ == '__main__':
     # Unit test
-    configure.run_tests(TestForeignKey, failfast=True, verbosity=2)
+    configure.run_tests(TestForeignKey, TestSelectRelated, TestPrefetch,
+                        failfast=True, verbosity=2)
@@ -95,6 +95,22 @@ class TestRelationship(unittest.TestCase):
         with self.assertRaises(PullError):
             model.b.pull_one(dry=True)
 
+    def test_pull_prefetched(self):
+        model = Foo()
+        model['uid'] = 6719
+        results = [FooB(uid=1, owner=6719)]
+        model.b._prefetched = (6719, results)
+        self.assertIs(model.b.pull(), results)
+        q = model.b.pull(model.b.uid, dry=True)
+        self.assertEqual(
+            q.string % q.params,
+            'SELECT foo_b.uid FROM foo_b WHERE foo_b.owner = 6719')
+        model['uid'] = 6720
+        q = model.b.pull(dry=True)
+        self.assertEqual(
+            q.string % q.params,
+            'SELECT * FROM foo_b WHERE foo_b.owner = 6720')
+
     def test_pull_all(self):
         model = Foo()
         model['uid'] = 6719